@@ -1,7 +1,14 @@
 from ProbPy.rand_var import *
 from ProbPy.event import *
+from ProbPy.layout import *
+from ProbPy.contraction import *
+from ProbPy.operations import *
 from ProbPy.factor import *
 from ProbPy.par_factor import *
+from ProbPy.log_factor import *
+from ProbPy.sparse_factor import *
+from ProbPy.lazy import *
+from ProbPy.dataset import *
 from ProbPy.bn import *
 from ProbPy.mn import *
 from ProbPy.tmn import *
@@ -4,6 +4,7 @@ Implementation of a Bayesian Network with some algorithms
 
 
 from ProbPy import Factor, Event
+from ProbPy.dataset import Dataset
 
 import copy
 import random
@@ -25,6 +26,8 @@ class BayesianNetworkNode:
                     variable in this node
     """
 
+    __slots__ = ("node", "factor", "parents", "visited", "parent_vars")
+
     def __init__(self, node, factor):
         # Attributes of network node
         self.node = node
@@ -33,7 +36,7 @@ class BayesianNetworkNode:
 
         # Used in the construction of the Bayesian Network class
         self.visited = TS_Unvisited
-        self.parent_vars = [i for i in factor.rand_vars if i.name != node.name]
+        self.parent_vars = [i for i in factor.rand_vars if i.id != node.id]
 
 
 class BayesianNetwork:
@@ -69,6 +72,9 @@ class BayesianNetwork:
         W_factor -- P(W | Y, Z)
     """
 
+    # Number of samples kept at a time by rejectionSample
+    sample_chunk = 4096
+
     def __init__(self, network=[]):
         # Will have nodes after they are topologically sorted
         self.network = []
@@ -92,7 +98,7 @@ class BayesianNetwork:
                 # Find node that connects with this one and visit them
                 for i in unsorted_net:
                     for j in i.parent_vars:
-                        if cnode.node.name == j.name:
+                        if cnode.node.id == j.id:
                             # Add current node to parents of found node and
                             # visit it
                             i.parents.append(cnode)
@@ -112,7 +118,7 @@ class BayesianNetwork:
 
         # Look for the node
         for i in self.network:
-            if node.name == i.node.name:
+            if node.id == i.node.id:
                 return i
 
         # If the node was not found, return None
@@ -168,9 +174,7 @@ class BayesianNetwork:
                 factors = self.sumOut(i.node, factors)
 
         # Calculate the product of every last factor
-        prod = factors[0]
-        for i in factors[1:]:
-            prod = prod.mult(i)
+        prod = Factor.product(factors)
 
         # Normalize and return
         res = prod.normalize(query_var)
@@ -207,12 +211,12 @@ class BayesianNetwork:
         """
 
         # If it is the query variable
-        if var.name == query_var.name:
+        if var.id == query_var.id:
             return False
 
         # If it is observed
         for i in observed:
-            if var.name == i[0].name:
+            if var.id == i[0].id:
                 return False
 
         return True
@@ -226,19 +230,19 @@ class BayesianNetwork:
         :param arg_factors: Factors which will have var summed out
         """
 
-        # Calculate the product of factors
-        prod = arg_factors[0]
-        for i in arg_factors[1:]:
-            prod = prod.mult(i)
-
         # Get variables for marginal
         marg_vars = []
-        for i in prod.rand_vars:
-            if i.name != var.name:
-                marg_vars.append(i)
-
-        # Return the final factor in the form of a list
-        return [prod.marginal(marg_vars)]
+        marg_ids = {var.id}
+        for i in arg_factors:
+            for j in i.rand_vars:
+                if j.id not in marg_ids:
+                    marg_vars.append(j)
+                    marg_ids.add(j.id)
+
+        # Multiply the factors in the order that keeps the intermediate
+        # factors small, summing var out. Return the final factor in the form
+        # of a list
+        return [Factor.product(arg_factors, keep=marg_vars)]
 
     def sample(self, pre_inst=None):
         """
@@ -254,22 +258,125 @@ class BayesianNetwork:
                          sample instead of leaving it to random chance.
         """
 
-        net = self.network[:]
-        inst_vars = Event()
+        fixed = {}
+        if pre_inst is not None:
+            for var, val in pre_inst:
+                if var.id not in fixed:
+                    fixed[var.id] = var.index(val)
 
-        for i in net:
-            insted = i.factor.instVar(inst_vars)
+        # Index of the value of each variable of the sample. The distribution
+        # of a variable given its parents is read from the values of its
+        # factor with the strides of the variables
+        indexes = {}
+        for i in self.network:
             var = i.node
+            if var.id in fixed:
+                indexes[var.id] = fixed[var.id]
+                continue
+
+            factor = i.factor
+            offset = 0
+            for j in i.parent_vars:
+                offset += indexes[j.id] * factor.var_strides[factor.var_pos[j.id]]
+
+            stride = factor.var_strides[factor.var_pos[var.id]]
+            end = offset + stride * len(var.domain)
+            dist = factor.values[offset:end:stride]
+            indexes[var.id] = self.pickRandomIndex(dist, random.random())
+
+        return Event(
+            [(i.node, i.node.domain[indexes[i.node.id]]) for i in self.network]
+        )
+
+    def sampleDataset(self, samples_num, pre_inst=None):
+        """
+        Takes many random samples of the network and returns them in a
+        Dataset, which keeps the index of the value of each variable in a
+        column instead of making an Event for each sample.
+
+        :param samples_num: Number of samples
+        :param pre_inst:    Default=None. Event or list of tuples with values
+                            of variables that are used in every sample, see
+                            sample()
+        :returns:           Dataset with the variables of the network
+
+        Examples:
+            >>> # Estimate of P(X | Y="T")
+            >>> data = BN.sampleDataset(10000)
+            >>> data.filter([(Y, "T")]).count(X).normalize(X)
+        """
+
+        return self.samplePlanned(self.samplePlans(pre_inst), samples_num)
+
+    def samplePlans(self, pre_inst=None):
+        """
+        Makes the plans used by samplePlanned() to sample each node of the
+        network. The factor of each node is reordered so its variable is the
+        first one. The distribution of the variable given the values of its
+        parents in a sample is then a contiguous slice of the values of the
+        factor, found with the strides of the parents.
+
+        :param pre_inst: Default=None. Event or list of tuples with values of
+                         variables that are used in every sample, see sample()
+        :returns:        List with a plan for each node
+        """
+
+        net = self.network
+        node_pos = {j.node.id: i for i, j in enumerate(net)}
+
+        fixed = {}
+        if pre_inst is not None:
+            for var, val in pre_inst:
+                if var.id in node_pos and node_pos[var.id] not in fixed:
+                    fixed[node_pos[var.id]] = var.index(val)
+
+        # For each node, the values of its factor with its variable first,
+        # the size of its domain, the position and stride of each parent, and
+        # the index of its value if it is fixed
+        plans = []
+        for pos, i in enumerate(net):
+            factor = i.factor.reorder([i.node] + i.parent_vars)
+            dim = len(i.node.domain)
 
-            if pre_inst is not None:
-                val = pre_inst.value(i.node)
+            parents = []
+            stride = dim
+            for j in i.parent_vars:
+                parents.append((node_pos[j.id], stride))
+                stride *= len(j.domain)
 
-            if pre_inst is None or val is None:
-                val = self.pickRandomValue(var.domain, insted.values, random.random())
+            plans.append((list(factor.values), dim, parents, fixed.get(pos)))
 
-            inst_vars.setValue(var, val)
+        return plans
 
-        return inst_vars
+    def samplePlanned(self, plans, samples_num):
+        """
+        Takes many random samples of the network with the plans made by
+        samplePlans() and returns them in a Dataset
+
+        :param plans:       List with a plan for each node
+        :param samples_num: Number of samples
+        :returns:           Dataset with the variables of the network
+        """
+
+        data = Dataset([i.node for i in self.network])
+        sample = [0] * len(plans)
+
+        for k in range(samples_num):
+            for pos, (values, dim, parents, fixed) in enumerate(plans):
+                if fixed is not None:
+                    sample[pos] = fixed
+                    continue
+
+                offset = 0
+                for parent_pos, stride in parents:
+                    offset += sample[parent_pos] * stride
+
+                dist = values[offset : offset + dim]
+                sample[pos] = self.pickRandomIndex(dist, random.random())
+
+            data.appendIndexes(sample)
+
+        return data
 
     def pickRandomValue(self, domain, values, prob):
         """
@@ -277,13 +384,21 @@ class BayesianNetwork:
         of a random variable given it's parameters.
         """
 
+        return domain[self.pickRandomIndex(values, prob)]
+
+    def pickRandomIndex(self, values, prob):
+        """
+        Same as pickRandomValue, but returns the index of the element of the
+        domain
+        """
+
         value = values[0]
-        for i, dom in enumerate(domain):
+        for i in range(len(values)):
             if value > prob:
-                return dom
+                return i
             value += values[i]
 
-        return domain[-1]
+        return len(values) - 1
 
     def rejectionSample(self, query_var, observed, samples_num):
         """
@@ -300,37 +415,18 @@ class BayesianNetwork:
                             calculate the estimative
         """
 
-        # List of counts for each value of the domain. Initialized with 0
-        count = {i: 0 for i in query_var.domain}
+        # Take the samples in chunks, reject the ones that don't agree with
+        # the observations and add up the counts of the query variable, so
+        # only one chunk of samples is kept at a time
+        plans = self.samplePlans()
+        counts = Factor([query_var], [0] * len(query_var.domain))
 
-        # The samples_num of samples
-        for i in range(samples_num):
-            # Take a sample
-            sample = self.sample()
-
-            # Check if it should be rejected
-            rejected = False
-            for j in observed:
-                for k in sample:
-                    # If the value of the sampled variable is different from
-                    # the value of the observed one, rejected
-                    if j[0].name == k[0].name and j[1] != k[1]:
-                        rejected = True
-                        break
-
-                # If the sample was already rejected, get out of the cycle
-                if rejected:
-                    break
-
-            # If the sample is not rejected, increment the counts
-            if not rejected:
-                for j in sample:
-                    if j[0].name == query_var.name:
-                        count[j[1]] += 1
-
-        # Make resulting factor
-        values = [count[i] for i in query_var.domain]
-        return Factor([query_var], values).normalize(query_var)
+        for i in range(0, samples_num, self.sample_chunk):
+            chunk = min(self.sample_chunk, samples_num - i)
+            data = self.samplePlanned(plans, chunk).filter(observed)
+            counts = counts + data.count([query_var])
+
+        return counts.normalize(query_var)
 
     def markovBlanket(self, node):
         """
@@ -364,7 +460,7 @@ class BayesianNetwork:
     def gibbsAsk(self, query_var, observed, samples_num):
         # Result is a list of counts for each value in the domain of the query
         # variable. Initialized with 0
-        res = {i: 0 for i in query_var.domain}
+        res = [0] * len(query_var.domain)
 
         # Assure the observed argument is an Event
         if type(observed) != Event:
@@ -377,7 +473,7 @@ class BayesianNetwork:
         # Get markov blankets for each non evidence variable
         mbs = dict()
         for i in non_evidence_vars:
-            mbs[i.node.name] = self.markovBlanket(i)
+            mbs[i.node.id] = self.markovBlanket(i)
 
         # Make an initial sample
         sample = self.sample(observed)
@@ -386,8 +482,8 @@ class BayesianNetwork:
         for i in range(samples_num):
             for j in non_evidence_vars:
                 # Get distribution P(j | mb(j))
-                dist = j.factor
-                for k in mbs[j.node.name]:
+                dist = j.factor.copy()
+                for k in mbs[j.node.id]:
                     dist *= k.factor
 
                 # Instantiate with previous sample, except for current j
@@ -402,11 +498,10 @@ class BayesianNetwork:
                 sample.setValue(j.node, rvalue)
 
                 # Increment count
-                res[rvalue] += 1
+                res[query_var.index(rvalue)] += 1
 
         # Return the count list normalized
-        values = [res[i] for i in query_var.domain]
-        return Factor(query_var, values).normalize(query_var)
+        return Factor(query_var, res).normalize(query_var)
 
     def instNode(self, event):
         """
@@ -0,0 +1,322 @@
+"""
+File that implements the planning of products of many factors.
+
+The product of a list of factors can be calculated by multiplying pairs of
+factors in any order, and a variable that isn't kept can be summed out as soon
+as no other remaining factor has it. The order in which the pairs are
+multiplied doesn't change the result, but it changes the size of the
+intermediate factors, and so the memory and the time needed. A
+ContractionPlan picks that order.
+"""
+
+
+class ContractionPlan:
+    """
+    Plan for the product of a list of factors, followed by the marginal for
+    the variables in keep. Each step of the plan multiplies two factors and
+    sums out every variable that isn't kept and isn't in any other remaining
+    factor.
+
+    :param factors:  List of factors to multiply
+    :param keep:     List of variables, or a single variable, that are kept in
+                     the result. Every other variable is summed out. If None,
+                     every variable is kept
+    :param optimize: Either "greedy", which multiplies the pair with the
+                     smallest result at each step, or "optimal", which
+                     searches every order for the one with the smallest
+                     largest intermediate factor. The search is exponential in
+                     the number of factors and should only be used with a few
+                     factors
+
+    The plan has the following attributes:
+
+        * steps - List of steps. Each step is a tuple (i, j, var_ids), where
+          i and j are the ids of the multiplied factors and var_ids are the
+          ids of the variables of the result. The factors in the argument
+          have ids 0 to n - 1 and the result of each step gets the next id.
+          If j is None, the step is the marginal of a single factor.
+        * flops - Estimated number of operations, one multiplication for each
+          value of each product and one addition for each value summed out.
+        * max_size - Number of values of the largest intermediate factor.
+
+    Examples:
+        >>> plan = ContractionPlan([fXY, fYZ, fZW], keep=X)
+        >>> plan.flops, plan.max_size
+        >>> res = plan.execute([fXY, fYZ, fZW])
+    """
+
+    def __init__(self, factors, keep=None, optimize="greedy"):
+        # Sizes of the variables and variables of each factor
+        self.sizes = {}
+        self.operands = []
+
+        for i in factors:
+            for j in i.rand_vars:
+                self.sizes[j.id] = len(j.domain)
+            self.operands.append(frozenset(i.var_ids))
+
+        # Ids of the kept variables
+        if keep is None:
+            self.keep = frozenset(self.sizes)
+        elif type(keep) != list:
+            self.keep = frozenset([keep.id])
+        else:
+            self.keep = frozenset(i.id for i in keep)
+
+        self.steps = []
+        self.flops = 0
+        self.max_size = 0
+
+        if optimize == "greedy":
+            self.planGreedy()
+        elif optimize == "optimal":
+            self.planOptimal()
+        else:
+            raise ContractionPlanEx(optimize)
+
+    def size(self, var_ids):
+        """
+        Number of values of a factor with the variables in var_ids
+        """
+
+        res = 1
+        for i in var_ids:
+            res *= self.sizes[i]
+        return res
+
+    def addStep(self, i, j, var_ids, joint):
+        """
+        Adds a step to the plan, updating the estimated flops and max size
+
+        :param i:       Id of the first factor
+        :param j:       Id of the second factor, or None for a marginal
+        :param var_ids: Ids of the variables of the result of the step
+        :param joint:   Ids of the variables of the product before summing
+                        out
+        """
+
+        joint_size = self.size(joint)
+        res_size = self.size(var_ids)
+
+        if j is not None:
+            self.flops += joint_size
+        if res_size != joint_size:
+            self.flops += joint_size
+
+        self.max_size = max(self.max_size, res_size)
+        self.steps.append((i, j, var_ids))
+
+    def reduceOperands(self):
+        """
+        Makes the first steps of the plan, which sum out of each factor the
+        variables that are only in that factor and aren't kept
+
+        :returns: Dictionary from the ids of the factors to their variables
+        """
+
+        current = {}
+
+        for i, var_ids in enumerate(self.operands):
+            others = set()
+            for j, other in enumerate(self.operands):
+                if i != j:
+                    others |= other
+
+            res = frozenset(k for k in var_ids if k in self.keep or k in others)
+            current[i] = res
+
+            if res != var_ids:
+                self.addStep(i, None, res, var_ids)
+                current[len(self.operands) + len(self.steps) - 1] = current.pop(i)
+
+        return current
+
+    def contract(self, current, i, j):
+        """
+        Variables of the product of factors i and j of current, with the
+        variables summed out that are not kept and not in other factors
+
+        :returns: Tuple with the variables before and after summing out
+        """
+
+        joint = current[i] | current[j]
+
+        others = set()
+        for k, var_ids in current.items():
+            if k != i and k != j:
+                others |= var_ids
+
+        res = frozenset(k for k in joint if k in self.keep or k in others)
+        return joint, res
+
+    def planGreedy(self):
+        """
+        Plans the product by multiplying, at each step, the pair of factors
+        with the smallest result
+        """
+
+        current = self.reduceOperands()
+        next_id = len(self.operands) + len(self.steps)
+
+        while len(current) > 1:
+            best = None
+            ids = sorted(current)
+
+            for a, i in enumerate(ids):
+                for j in ids[a + 1 :]:
+                    joint, res = self.contract(current, i, j)
+                    cost = (self.size(res), self.size(joint))
+
+                    if best is None or cost < best[0]:
+                        best = (cost, i, j, joint, res)
+
+            _, i, j, joint, res = best
+            self.addStep(i, j, res, joint)
+
+            del current[i]
+            del current[j]
+            current[next_id] = res
+            next_id += 1
+
+    def planOptimal(self):
+        """
+        Plans the product by searching every way of splitting the factors in
+        pairs, using dynamic programming over the subsets of factors. The plan
+        found has the smallest largest intermediate factor and, between those,
+        the smallest number of flops
+        """
+
+        current = self.reduceOperands()
+        ids = sorted(current)
+        num = len(ids)
+        full = (1 << num) - 1
+
+        # Variables of the factors in each subset, and the variables left
+        # after summing out the ones that are not needed outside the subset
+        union = {0: frozenset()}
+        for mask in range(1, full + 1):
+            low = mask & -mask
+            union[mask] = union[mask ^ low] | current[ids[low.bit_length() - 1]]
+
+        def resIds(mask):
+            outside = union[full ^ mask]
+            return frozenset(k for k in union[mask] if k in self.keep or k in outside)
+
+        # Best (max size, flops, split) for every subset
+        best = {}
+        for i in range(num):
+            best[1 << i] = (0, 0, None)
+
+        for mask in range(1, full + 1):
+            if mask in best:
+                continue
+
+            res = resIds(mask)
+            res_size = self.size(res)
+
+            # Go through every split of mask in two non empty subsets
+            sub = (mask - 1) & mask
+            while sub > 0:
+                other = mask ^ sub
+                if sub < other:
+                    joint = resIds(sub) | resIds(other)
+                    joint_size = self.size(joint)
+                    flops = joint_size if joint_size == res_size else 2 * joint_size
+
+                    left = best[sub]
+                    right = best[other]
+                    cost = (
+                        max(left[0], right[0], res_size),
+                        left[1] + right[1] + flops,
+                        (sub, other),
+                    )
+
+                    if mask not in best or cost[:2] < best[mask][:2]:
+                        best[mask] = cost
+
+                sub = (sub - 1) & mask
+
+        # Make the steps of the best plan, children before parents
+        def makeSteps(mask):
+            split = best[mask][2]
+            if split is None:
+                return ids[mask.bit_length() - 1]
+
+            i = makeSteps(split[0])
+            j = makeSteps(split[1])
+            joint = resIds(split[0]) | resIds(split[1])
+            self.addStep(i, j, resIds(mask), joint)
+            return len(self.operands) + len(self.steps) - 1
+
+        if num > 0:
+            makeSteps(full)
+
+    def execute(self, factors):
+        """
+        Executes the plan with the factors, which must have the same variables
+        as the factors used to make the plan
+
+        :param factors: List of factors to multiply
+        :returns:       Product of the factors, with the variables in keep.
+                        The variables are in the same order as in the product
+                        of the factors from left to right
+        """
+
+        results = list(factors)
+
+        for i, j, var_ids in self.steps:
+            fac = results[i]
+            rand_vars = [k for k in self.varsOf(factors) if k.id in var_ids]
+
+            if j is None:
+                results.append(fac.marginal(rand_vars))
+            elif var_ids == self.contractJoint(results[i], results[j]):
+                results.append(fac.mult(results[j]))
+            else:
+                results.append(fac.multMarginal(results[j], rand_vars))
+
+        # Order the variables of the result like in the product from left
+        # to right
+        res_rand_vars = [k for k in self.varsOf(factors) if k.id in self.keep]
+        return results[-1].reorder(res_rand_vars)
+
+    def varsOf(self, factors):
+        """
+        Returns every variable of the factors, in order of appearance
+        """
+
+        res = []
+        ids = set()
+        for i in factors:
+            for j in i.rand_vars:
+                if j.id not in ids:
+                    ids.add(j.id)
+                    res.append(j)
+
+        return res
+
+    def contractJoint(self, fac1, fac2):
+        """
+        Returns the ids of the variables of the product of two factors
+        """
+
+        return frozenset(fac1.var_ids + fac2.var_ids)
+
+    def __repr__(self):
+        return "{ContractionPlan: %s steps, %s flops, max size %s}" % (
+            len(self.steps),
+            self.flops,
+            self.max_size,
+        )
+
+
+class ContractionPlanEx(Exception):
+    """
+    Exception used if the optimization method of a plan is unknown
+    """
+
+    def __init__(self, bad_optimize):
+        self.bad_optimize = bad_optimize
+
+    def __str__(self):
+        return "Unknown contraction optimization: %s" % repr(self.bad_optimize)
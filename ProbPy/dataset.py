@@ -0,0 +1,225 @@
+"""
+File that implements the Dataset class, a columnar container of samples or
+observations of random variables.
+"""
+
+
+from ProbPy import Event
+from ProbPy.factor import Factor
+
+import array
+import itertools
+import operator
+
+
+class Dataset:
+    """
+    Container of assignments of a list of variables, like the samples of a
+    Bayesian Network. Instead of an Event for each assignment, the dataset
+    keeps a column for each variable, an array with the index in the domain
+    of the variable of its value in each assignment. Events are only made when
+    the assignments are iterated or indexed.
+
+    :param rand_vars: List of random variables
+    :param columns:   Optional list with a column for each variable, with
+                      indexes of values of the domain of the variable. The
+                      columns are kept in arrays of integers, or in NumPy
+                      arrays if they are given as such
+
+    Examples:
+        >>> # Assuming X and Y are binary variables with domain ["T", "F"]
+        >>> data = Dataset([X, Y], [[0, 1, 1], [0, 0, 1]])
+        >>> data.append([(X, "T"), (Y, "F")])
+        >>> len(data)
+        4
+        >>> data.filter([(X, "F")]).count([Y])
+        >>> # Would yield the factor f(Y) with values [1, 1]
+        >>> data[3]
+        >>> # Would yield the Event (X="T", Y="F")
+    """
+
+    def __init__(self, rand_vars, columns=None):
+        if type(rand_vars) != list:
+            rand_vars = [rand_vars]
+
+        if columns is None:
+            columns = [[] for i in rand_vars]
+        elif len(columns) != len(rand_vars):
+            raise DatasetEx("one column is needed for each variable")
+
+        self.rand_vars = rand_vars
+        self.var_pos = {j.id: i for i, j in enumerate(rand_vars)}
+        self.columns = [self.makeColumn(i) for i in columns]
+
+        if len({len(i) for i in self.columns}) > 1:
+            raise DatasetEx("every column should have the same length")
+
+    @classmethod
+    def fromEvents(cls, rand_vars, events):
+        """
+        Makes a dataset from Event objects, or lists of pairs between a
+        variable and its value, with every variable of rand_vars
+
+        :param rand_vars: List of random variables
+        :param events:    Iterable of events
+        :returns:         New Dataset object
+        """
+
+        res = cls(rand_vars)
+        for i in events:
+            res.append(i)
+
+        return res
+
+    def makeColumn(self, indexes):
+        """
+        Returns an array of integers with indexes, unless they are already in
+        an array or in a NumPy array
+        """
+
+        if isinstance(indexes, array.array) or hasattr(indexes, "dtype"):
+            return indexes
+
+        return array.array("l", indexes)
+
+    def append(self, event):
+        """
+        Appends an assignment to the dataset
+
+        :param event: Event object, or list of pairs between a variable and
+                      its value, with every variable of the dataset
+        """
+
+        values = {i[0].id: i[1] for i in event}
+
+        try:
+            indexes = [i.index(values[i.id]) for i in self.rand_vars]
+        except KeyError:
+            raise DatasetEx("every variable of the dataset needs a value")
+
+        self.appendIndexes(indexes)
+
+    def appendIndexes(self, indexes):
+        """
+        Appends an assignment given by the index of the value of each variable
+        in its domain, in the order of the variables of the dataset
+
+        :param indexes: Sequence with an index for each variable
+        """
+
+        for column, index in zip(self.columns, indexes):
+            column.append(index)
+
+    def column(self, rand_var):
+        """
+        Returns the column of a variable
+
+        :param rand_var: Variable of the dataset
+        :returns:        Array with the index of the value of the variable in
+                         each assignment
+        """
+
+        pos = self.var_pos.get(rand_var.id)
+        if pos is None:
+            raise DatasetEx("variable %s is not in the dataset" % rand_var)
+
+        return self.columns[pos]
+
+    def filter(self, evidence):
+        """
+        Returns the assignments that agree with some evidence. Variables of
+        the evidence that are not in the dataset are ignored
+
+        :param evidence: Event object or list of pairs between a variable and
+                         a value
+        :returns:        New Dataset object with the same variables
+
+        Examples:
+            >>> # Samples where X is "T" and Y is "F"
+            >>> data.filter([(X, "T"), (Y, "F")])
+        """
+
+        keep = None
+        for rand_var, value in evidence:
+            if rand_var.id not in self.var_pos:
+                continue
+
+            index = itertools.repeat(rand_var.index(value))
+            matches = map(operator.eq, self.column(rand_var), index)
+            keep = matches if keep is None else map(operator.and_, keep, matches)
+
+        if keep is None:
+            return Dataset(self.rand_vars, [i[:] for i in self.columns])
+
+        keep = list(keep)
+        columns = [self.makeColumn(itertools.compress(i, keep)) for i in self.columns]
+        return Dataset(self.rand_vars, columns)
+
+    def count(self, rand_vars=None):
+        """
+        Counts the assignments of some variables of the dataset
+
+        :param rand_vars: List of variables, or a single variable. If None,
+                          every variable of the dataset is used
+        :returns:         Factor with the number of assignments with each
+                          combination of values of rand_vars
+
+        Examples:
+            >>> # Estimate of P(X | Y="F") from samples
+            >>> data.filter([(Y, "F")]).count(X).normalize(X)
+        """
+
+        if rand_vars is None:
+            rand_vars = self.rand_vars
+        elif type(rand_vars) != list:
+            rand_vars = [rand_vars]
+
+        columns = [self.column(i) for i in rand_vars]
+        return Factor.fromCounts(rand_vars, columns)
+
+    def events(self):
+        """
+        Iterator that makes an Event for each assignment, only when it is
+        needed
+        """
+
+        for indexes in zip(*self.columns):
+            yield self.makeEvent(indexes)
+
+    def makeEvent(self, indexes):
+        """
+        Returns the Event with the values with indexes in the domains of the
+        variables
+        """
+
+        return Event([(i, i.domain[j]) for i, j in zip(self.rand_vars, indexes)])
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+
+        return len(self.columns[0])
+
+    def __iter__(self):
+        return self.events()
+
+    def __getitem__(self, index):
+        return self.makeEvent([i[index] for i in self.columns])
+
+    def __repr__(self):
+        return "{Dataset %s: %d assignments}" % (
+            [i.name for i in self.rand_vars],
+            len(self),
+        )
+
+
+class DatasetEx(Exception):
+    """
+    Exception used for bad columns or variables of a Dataset
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+
+    def __str__(self):
+        return "Bad dataset: %s" % self.problem
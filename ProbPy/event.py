@@ -54,6 +54,8 @@ class Event:
     In this example the event will be: (var1=nval, var2=val2)
     """
 
+    __slots__ = ("event",)
+
     def __init__(self, tlist=None, var=None, val=None):
         if tlist is not None and type(tlist) is list:
             self.event = {i[0]: i[1] for i in tlist}
@@ -3,10 +3,24 @@ File that implements the Factor class
 """
 
 
-from ProbPy import RandVar, Event
-
+from ProbPy import RandVar, RandVarValueEx, Event
+from ProbPy.rand_var import slotsState, setSlotsState
+from ProbPy.layout import factor_op_layouts, layoutStrides, stridedIndexes, VarLayout
+from ProbPy.contraction import ContractionPlan
+from ProbPy.operations import resolveOperation, sqDiff
+
+import array
+import collections
 import copy
+import itertools
 import math
+import operator
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class Factor:
@@ -18,6 +32,10 @@ class Factor:
     :param rand_vars: List of Random Variables of this factor, or a single
                       variable
     :param values:    Values of the factor
+    :param storage:   How the values are stored. Either "list", the default,
+                      "numpy", which keeps the values in a NumPy ndarray,
+                      "array", which keeps them in an array.array of doubles,
+                      or "array32", an array.array of single precision floats
 
     Examples:
         >>> # Assuming X, Y, Z, A, B are variables
@@ -40,9 +58,39 @@ class Factor:
 
     Lastly, if the factor is a scalar factor, like the last example, the values
     may have a single integer.
+
+    If NumPy is installed the values may also be stored in an ndarray, either
+    by giving an ndarray as values or by using the storage argument:
+        >>> XY_factor = Factor([X, Y], [0.2, 0.3, 0.1, 0.4], storage="numpy")
+
+    Operations between factors with NumPy storage are done by aligning the
+    axes of both factors and using NumPy's broadcasting, and their results
+    are also factors with NumPy storage. The order of the variables and of the
+    values is the same as with the list storage.
+
+    A list of floats uses about 32 bytes for each value, counting the float
+    objects. The "array" and "array32" storages keep the values in a
+    contiguous buffer of 8 or 4 bytes for each value, without needing NumPy.
+    The results of operations of a factor with these storages have the same
+    storage. The nbytes attribute has the memory used by the values:
+        >>> XY_factor = Factor([X, Y], [0.2, 0.3, 0.1, 0.4], storage="array")
+        >>> XY_factor.nbytes
+
+    The storage of the values given as lists may also be selected for every
+    factor with the default_storage class attribute:
+        >>> Factor.default_storage = "array32"
     """
 
-    def __init__(self, rand_vars, values=None):
+    # Storage of the values given as lists, when no storage is given
+    default_storage = None
+
+    # Type codes of the array.array storages
+    array_typecodes = {"array": "d", "array32": "f"}
+
+    # Attributes of every factor, without a __dict__ for each one
+    __slots__ = ("rand_vars", "values", "var_ids", "var_pos", "var_strides")
+
+    def __init__(self, rand_vars, values=None, storage=None):
         # Assure the rand_vars argument is always a list
         if type(rand_vars) != list:
             rand_vars = [rand_vars]
@@ -54,6 +102,7 @@ class Factor:
 
         # Store variables
         self.rand_vars = rand_vars
+        self.indexRandVars()
 
         # Check the types of the values
         if type(values) == list:
@@ -67,6 +116,12 @@ class Factor:
 
                 self.values = values
 
+        elif numpy is not None and isinstance(values, numpy.ndarray):
+            self.values = values.ravel()
+
+        elif isinstance(values, array.array):
+            self.values = values
+
         elif type(values) == int:
             self.values = [values]
 
@@ -90,6 +145,294 @@ class Factor:
         if size != len(self.values):
             raise FactorValuesEx(rand_vars)
 
+        # Store the values with the requested storage
+        if storage is None and type(self.values) == list:
+            storage = self.default_storage
+
+        if storage is not None:
+            self.values = self.convertValues(self.values, storage)
+
+    def indexRandVars(self):
+        """
+        Stores the ids of the variables of the factor in var_ids, the
+        position of each id in var_pos and the stride of each variable in the
+        values in var_strides. They are used to find variables in the factor
+        without comparing their names, and values without going through them.
+        """
+
+        self.var_ids = tuple(i.id for i in self.rand_vars)
+        self.var_pos = {j: i for i, j in enumerate(self.var_ids)}
+
+        strides = []
+        stride = 1
+        for i in self.rand_vars:
+            strides.append(stride)
+            stride *= len(i.domain)
+        self.var_strides = tuple(strides)
+
+    def convertValues(self, values, storage):
+        """
+        Converts a flat sequence of values to the given storage.
+
+        :param values:  Flat list, ndarray or array.array of values
+        :param storage: Either "list", "numpy", "array" or "array32"
+        :returns:       The values stored as requested
+        """
+
+        if storage == "list":
+            if type(values) == list:
+                return values
+            return values.tolist()
+
+        elif storage == "numpy":
+            if numpy is None:
+                raise FactorStorageEx(storage)
+            return numpy.asarray(values)
+
+        elif storage in self.array_typecodes:
+            typecode = self.array_typecodes[storage]
+            if isinstance(values, array.array) and values.typecode == typecode:
+                return values
+            if type(values) != list:
+                values = values.tolist()
+            return array.array(typecode, values)
+
+        raise FactorStorageEx(storage)
+
+    def getStorage(self):
+        """
+        Returns the storage used for the values of this factor, which is
+        either "list", "numpy", "array" or "array32"
+        """
+
+        if numpy is not None and isinstance(self.values, numpy.ndarray):
+            return "numpy"
+        if isinstance(self.values, array.array):
+            return "array" if self.values.typecode == "d" else "array32"
+        return "list"
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes used by the values of the factor. For lists this
+        counts the list and every distinct value object in it
+        """
+
+        if self.getStorage() == "numpy":
+            return self.values.nbytes
+        if self.getStorage() != "list":
+            return sys.getsizeof(self.values)
+
+        objects = {id(i): i for i in self.values}
+        return sys.getsizeof(self.values) + sum(
+            sys.getsizeof(i) for i in objects.values()
+        )
+
+    def isSparse(self):
+        """
+        Returns True if only the non zero values of the factor are stored,
+        like in a SparseFactor
+        """
+
+        return False
+
+    def isLogSpace(self):
+        """
+        Returns True if the factor stores the logarithm of its values, like a
+        LogFactor
+        """
+
+        return False
+
+    def checkSpace(self, factor):
+        """
+        Raises LogFactorEx if factor stores its values in log space and self
+        doesn't, since values in log space can't be used in the operations of
+        a factor in linear space
+
+        :param factor: The other factor used in an operation, or a scalar
+        """
+
+        if isinstance(factor, Factor) and factor.isLogSpace():
+            if not self.isLogSpace():
+                raise LogFactorEx(self)
+
+    def toStorage(self, storage):
+        """
+        Returns a factor equal to self but with its values in another storage.
+
+        :param storage: Either "list", "numpy", "array" or "array32"
+        :returns:       Factor with the values stored as requested
+
+        Examples:
+            >>> np_factor = XY_factor.toStorage("numpy")
+            >>> list_factor = np_factor.toStorage("list")
+        """
+
+        values = self.convertValues(self.values, storage)
+        if values is self.values:
+            values = copy.copy(values)
+
+        # Set the values after making the factor, so they aren't converted to
+        # the storage of self or to the default storage
+        res = self.newFactor(self.rand_vars, values)
+        res.values = values
+        return res
+
+    @classmethod
+    def fromTrusted(cls, rand_vars, values):
+        """
+        Makes a factor from variables and values that are known to be valid,
+        without the checks of the constructor. Used for the results of the
+        operations, whose values are made by the library. The list of
+        variables and the values are used as they are, without copies.
+
+        :param rand_vars: List of Random Variables of the factor
+        :param values:    Flat list, ndarray or array.array with the values,
+                          with the size of the domains of rand_vars
+        :returns:         New factor
+
+        Examples:
+            >>> XY_factor = Factor.fromTrusted([X, Y], [0.2, 0.3, 0.1, 0.4])
+        """
+
+        res = cls.__new__(cls)
+        res.rand_vars = rand_vars
+        res.indexRandVars()
+        res.values = values
+        return res
+
+    @staticmethod
+    def fromCounts(rand_vars, columns, weights=None, pseudo_count=0, storage=None):
+        """
+        Makes the factor with the joint counts of a batch of assignments of
+        rand_vars. The assignments are encoded into indexes of the values of
+        the factor, and counted in a single pass, with numpy.bincount if NumPy
+        is installed.
+
+        :param rand_vars:    List of Random Variables, or a single variable
+        :param columns:      One sequence for each variable with the index in
+                             its domain of its value in each assignment
+        :param weights:      Optional sequence with the weight of each
+                             assignment, which is added to its count instead
+                             of 1
+        :param pseudo_count: Count added to every value, like a Dirichlet
+                             prior or Laplace smoothing
+        :param storage:      Storage of the values, see Factor
+        :returns:            Factor with the counts
+
+        Examples:
+            >>> # Assuming X and Y are binary variables
+            >>> Factor.fromCounts([X, Y], [[0, 1, 1], [0, 0, 1]])
+            >>> # Would yield the factor f(X, Y) with values [1, 1, 0, 1]
+            >>> Factor.fromCounts(X, [[0, 1, 1]], pseudo_count=1).normalize()
+        """
+
+        if type(rand_vars) != list:
+            rand_vars = [rand_vars]
+
+        # Check the indexes of each column
+        for var, column in zip(rand_vars, columns):
+            if len(column) > 0 and (min(column) < 0 or max(column) >= len(var.domain)):
+                raise FactorValuesEx(rand_vars)
+
+        layout = VarLayout(rand_vars)
+        if rand_vars:
+            num = len(columns[0])
+        else:
+            num = 0 if weights is None else len(weights)
+        indexes = layout.encode(columns, num)
+
+        # There must be a weight for each assignment
+        if weights is not None and len(weights) != num:
+            raise FactorValuesEx(weights)
+
+        if numpy is not None:
+            indexes = numpy.asarray(indexes, dtype=int)
+            counts = numpy.bincount(indexes, weights=weights, minlength=layout.size)
+            if pseudo_count:
+                counts = counts + pseudo_count
+            if storage != "numpy":
+                counts = counts.tolist()
+
+        elif weights is None:
+            counts = [pseudo_count] * layout.size
+            for i, count in collections.Counter(indexes).items():
+                counts[i] += count
+
+        else:
+            counts = [pseudo_count] * layout.size
+            for i, weight in zip(indexes, weights):
+                counts[i] += weight
+
+        return Factor(rand_vars, counts, storage=storage)
+
+    @staticmethod
+    def fromSamples(rand_vars, samples, weights=None, pseudo_count=0, storage=None):
+        """
+        Same as fromCounts, but with samples given as a Dataset or as Event
+        objects
+
+        :param rand_vars:    List of Random Variables, or a single variable
+        :param samples:      Dataset with the variables, or iterable of Event
+                             objects or lists of pairs between a variable and
+                             its value
+        :param weights:      Optional weight of each sample
+        :param pseudo_count: Count added to every value
+        :param storage:      Storage of the values, see Factor
+        :returns:            Factor with the counts
+
+        Examples:
+            >>> # Empirical distribution of X and Y in samples of a network
+            >>> Factor.fromSamples([X, Y], BN.sampleDataset(1000)).normalize()
+        """
+
+        if type(rand_vars) != list:
+            rand_vars = [rand_vars]
+
+        # A Dataset already has the columns
+        if hasattr(samples, "column"):
+            columns = [samples.column(i) for i in rand_vars]
+            return Factor.fromCounts(rand_vars, columns, weights, pseudo_count, storage)
+
+        columns = [[] for i in rand_vars]
+        for event in samples:
+            values = {i[0].id: i[1] for i in event}
+            for var, column in zip(rand_vars, columns):
+                if var.id not in values:
+                    raise FactorRandVarsEx(rand_vars)
+                column.append(var.index(values[var.id]))
+
+        return Factor.fromCounts(rand_vars, columns, weights, pseudo_count, storage)
+
+    def newFactor(self, rand_vars, values):
+        """
+        Makes the factor returned by an operation of this factor. Subclasses
+        that must keep their class in the results of the operations override
+        this method.
+
+        :param rand_vars: Variables of the resulting factor
+        :param values:    Values of the resulting factor
+        :returns:         New factor
+        """
+
+        return Factor.fromTrusted(rand_vars, self.keepStorage(values))
+
+    def keepStorage(self, values):
+        """
+        Converts the list of values of the result of an operation to the
+        storage of self, if self uses an array.array storage. Other values are
+        returned as they are
+
+        :param values: Values of the result of an operation
+        :returns:      The values in the storage of the result
+        """
+
+        storage = self.getStorage()
+        if type(values) == list and storage in self.array_typecodes:
+            return self.convertValues(values, storage)
+        return values
+
     def flattenList(self, values):
         """
         Receives a list of lists and produces returns its flatten version.
@@ -156,7 +499,11 @@ class Factor:
         :returns: Result of operation
         """
 
-        return self.factorOp(factor, lambda x, y: x * y)
+        # Products with a sparse factor only go through its non zero values
+        if isinstance(factor, Factor) and factor.isSparse():
+            return factor.rmult(self)
+
+        return self.factorOp(factor, operator.mul)
 
     def div(self, factor):
         """
@@ -166,7 +513,7 @@ class Factor:
         :returns:      Result of operation
         """
 
-        return self.factorOp(factor, lambda x, y: x / y)
+        return self.factorOp(factor, operator.truediv)
 
     def add(self, factor):
         """
@@ -176,7 +523,7 @@ class Factor:
         :returns:      Result of operation
         """
 
-        return self.factorOp(factor, lambda x, y: x + y)
+        return self.factorOp(factor, operator.add)
 
     def sub(self, factor):
         """
@@ -186,7 +533,7 @@ class Factor:
         :returns:      Result of operation
         """
 
-        return self.factorOp(factor, lambda x, y: x - y)
+        return self.factorOp(factor, operator.sub)
 
     def factorOp(self, factor, fun):
         """
@@ -194,83 +541,121 @@ class Factor:
         and another factor.
 
         :param factor: The other factor used for this operation
-        :param fun:    Operation used between each element of the values
+        :param fun:    Operation used between each element of the values, or
+                       the name of a registered operation
         :returns:      Result of operation between self and factor using fun
         """
 
-        res_rand_vars = []
-        res_values = []
+        fun = resolveOperation(fun)
+        self.checkSpace(factor)
 
         # If this is just scalar operation
         if type(factor) == int or type(factor) == float:
             return self.scalar(factor, fun)
+        elif factor.rand_vars == [] and factor.getStorage() == "numpy":
+            if self.getStorage() == "list":
+                return self.toStorage("numpy").scalar(factor.values[0], fun)
+            return self.scalar(factor.values[0], fun)
         elif factor.rand_vars == []:
             return self.scalar(factor.values[0], fun)
 
-        # Res will have every variable in self
-        for i in self.rand_vars:
-            res_rand_vars.append(i)
-
-        # And the variables in factor that are not in self
-        for i in factor.rand_vars:
-            var_in_self = True
-            for j in self.rand_vars:
-                if i.name == j.name:
-                    var_in_self = False
-                    break
-
-            if var_in_self:
-                res_rand_vars.append(i)
-
-        # Calculate mult list
-        mult = []
-        c_mult = 1
-
-        for i in factor.rand_vars:
-            mult.append(c_mult)
-            c_mult *= len(i.domain)
-
-        # Calculate div list
-        div = []
+        # Get the layout of the operation, which is cached for the variables
+        # of both factors
+        layout = factor_op_layouts.get(self.rand_vars, factor.rand_vars)
 
-        for i in factor.rand_vars:
-            c_div = 1
+        # Res will have every variable in self and the variables in factor
+        # that are not in self
+        res_rand_vars = layout.resRandVars(self.rand_vars, factor.rand_vars)
 
-            for j in res_rand_vars:
-                if i.name == j.name:
-                    break
+        # If either factor uses NumPy, broadcast the operation
+        if self.getStorage() == "numpy" or factor.getStorage() == "numpy":
+            return self.factorOpNumpy(factor, layout, res_rand_vars, fun)
 
-                c_div *= len(j.domain)
+        # Calculate resulting factor and return it
+        res_values = list(self.combineValues(factor, layout, fun))
+        return self.newFactor(res_rand_vars, res_values)
 
-            div.append(c_div)
+    def combineValues(self, factor, layout, fun):
+        """
+        Applies fun to the values of self and factor for every value of the
+        result of an operation between them. The common kinds of layouts,
+        where the variables are the same, where the variables of one factor
+        are the first variables of the other, or where the factors have no
+        variables in common, are combined by repeating the values, without
+        calculating an index for each value of the result.
 
-        # Calculate dim list
-        dim = []
+        :param factor: The other factor used for this operation
+        :param layout: FactorOpLayout of the operation
+        :param fun:    Operation used between each element of the values
+        :returns:      Iterable with the values of the result
+        """
 
-        for i in factor.rand_vars:
-            dim.append(len(i.domain))
+        values1 = self.values
+        values2 = factor.values
+
+        if layout.kind == "same":
+            return map(fun, values1, values2)
+        elif layout.kind == "prefix":
+            return map(fun, values1, itertools.cycle(values2))
+        elif layout.kind == "extend":
+            return map(fun, itertools.cycle(values1), values2)
+        elif layout.kind == "disjoint":
+            res_values = []
+            for value2 in values2:
+                res_values.extend(map(fun, values1, itertools.repeat(value2)))
+            return res_values
+
+        # The index of self is the index in the result modulo the size of
+        # self, the index of factor is gathered
+        gather = factor_op_layouts.getGather(layout)
+        values2 = map(factor.values.__getitem__, gather)
+        return map(fun, itertools.cycle(values1), values2)
+
+    def factorOpNumpy(self, factor, layout, res_rand_vars, fun):
+        """
+        Implementation of factorOp used when the values are stored in NumPy
+        arrays. The values of both factors are aligned with the variables of
+        the result and fun is applied to them using broadcasting.
+
+        :param factor:        The other factor used for this operation
+        :param layout:        FactorOpLayout of the operation
+        :param res_rand_vars: Variables of the resulting factor
+        :param fun:           Operation used between each element of the values
+        :returns:             Result of operation between self and factor
+        """
 
-        # Calculate resulting size of factor
-        res_values_size = self.getValuesListSize(res_rand_vars)
+        # With the same variables, the values are already aligned
+        if layout.kind == "same":
+            values1 = numpy.asarray(self.values)
+            values2 = numpy.asarray(factor.values)
+            return self.newFactor(res_rand_vars, numpyApply(fun, values1, values2))
 
-        # Calculate resulting factor
-        index1 = 0
-        len_values = len(self.values)
+        values1 = self.alignValues(layout.align1)
+        values2 = factor.alignValues(layout.align2)
+        res_values = numpyApply(fun, values1, values2)
 
-        for i in range(res_values_size):
-            # Get index 1
-            index1 = i % len_values
+        # Flatten with the first variable changing faster
+        res_values = numpy.broadcast_to(res_values, layout.res_dims)
+        return self.newFactor(res_rand_vars, res_values.ravel(order="F"))
 
-            # Get index 2
-            index2 = 0
-            for j, _ in enumerate(factor.rand_vars):
-                index2 += (int(i / div[j]) % dim[j]) * mult[j]
+    def alignValues(self, alignment):
+        """
+        Returns the values of the factor as an ndarray with one axis for each
+        variable of the result of an operation. Variables of the result that
+        are not in the factor get an axis of length 1, so the array can be
+        broadcast.
+
+        :param alignment: Alignment of the factor, as calculated by
+                          FactorOpLayout.makeAlignment()
+        :returns:         Aligned ndarray of values
+        """
 
-            # Calculate value
-            res_values.append(fun(self.values[index1], factor.values[index2]))
+        shape, axes, aligned_shape = alignment
 
-        # Make Factor object and return
-        return Factor(res_rand_vars, res_values)
+        # Make the multi dimensional array, the first axis is the first var,
+        # order the axes as in the result and add the missing ones
+        values = numpy.asarray(self.values).reshape(shape, order="F")
+        return values.transpose(axes).reshape(aligned_shape)
 
     def scalar(self, scalar_value, fun):
         """
@@ -278,13 +663,112 @@ class Factor:
         used in an operation, defined by fun, with the values of the factor.
 
         :param scalar_value: An int or float value to serve as an operand
-        :param fun:          Function used in the operation, may be a lambda
+        :param fun:          Function used in the operation, may be a lambda or
+                             the name of a registered operation
         :returns:            Result of mapping scalar_value to factor's values
                              using fun
         """
 
+        fun = resolveOperation(fun)
         return self.map(lambda x: fun(x, scalar_value))
 
+    def factorOpInPlace(self, factor, fun):
+        """
+        In place version of factorOp, used by the operators *=, /=, += and -=.
+        If the variables of factor are in self, the result is written in the
+        values of self, without making a new factor or a new list of values.
+        Otherwise the result has more variables than self, and self takes the
+        variables and the values of the result.
+
+        Other references to self see the change, so factors that are used
+        elsewhere should be copied first:
+            >>> msg = XY_factor.copy()
+            >>> msg *= X_factor
+
+        :param factor: The other factor used for this operation
+        :param fun:    Operation used between each element of the values, or
+                       the name of a registered operation
+        :returns:      Self, with the result of the operation
+        """
+
+        fun = resolveOperation(fun)
+        self.checkSpace(factor)
+
+        # If this is just scalar operation
+        if type(factor) == int or type(factor) == float:
+            return self.mapInPlace(lambda x: fun(x, factor))
+
+        # If the result doesn't fit in self, or if the storage changes
+        layout = factor_op_layouts.get(self.rand_vars, factor.rand_vars)
+        storage = self.getStorage()
+        if layout.extra or (storage != "numpy" and factor.getStorage() == "numpy"):
+            return self.assign(self.factorOp(factor, fun))
+
+        if factor.rand_vars == []:
+            scalar_value = factor.values[0]
+            return self.mapInPlace(lambda x: fun(x, scalar_value))
+
+        if storage == "numpy":
+            values1 = self.values.reshape(layout.align1[0], order="F")
+            values2 = factor.alignValues(layout.align2)
+            return self.writeValues(numpyApply(fun, values1, values2))
+
+        return self.writeValues(self.combineValues(factor, layout, fun))
+
+    def writeValues(self, values):
+        """
+        Writes values in the list, array or ndarray of values of self. If an
+        ndarray can't hold the new values, like floats in an array of ints, it
+        is replaced
+
+        :param values: Iterable or ndarray with the new values, in order
+        :returns:      Self
+        """
+
+        storage = self.getStorage()
+
+        if storage == "numpy":
+            values = numpy.asarray(values)
+            writeable = self.values.flags.writeable
+            if writeable and numpy.can_cast(
+                values.dtype, self.values.dtype, casting="same_kind"
+            ):
+                self.values.reshape(values.shape, order="F")[...] = values
+            else:
+                self.values = numpy.array(values).ravel(order="F")
+
+        elif storage in self.array_typecodes:
+            self.values[:] = array.array(self.values.typecode, values)
+
+        else:
+            self.values[:] = values
+
+        return self
+
+    def assign(self, factor):
+        """
+        Makes self take the variables and the values of factor. Used by the
+        in place operations whose result doesn't fit in self
+
+        :param factor: Factor with the new variables and values
+        :returns:      Self
+        """
+
+        self.rand_vars = factor.rand_vars
+        self.indexRandVars()
+        self.values = factor.values
+        return self
+
+    def copy(self):
+        """
+        Returns a copy of the factor with its own values, which can be changed
+        by in place operations without changing self
+        """
+
+        res = copy.copy(self)
+        res.values = copy.copy(self.values)
+        return res
+
     def log(self, base):
         """
         Applies the logarithm function to the whole factor. The actual
@@ -295,6 +779,9 @@ class Factor:
                      to the values of self
         """
 
+        if self.getStorage() == "numpy":
+            return self.map(lambda x: numpy.log(x) / math.log(base))
+
         return self.map(lambda x: math.log(x, base))
 
     def pow(self, p):
@@ -319,6 +806,8 @@ class Factor:
 
         def fun(x):
             if base is None:
+                if self.getStorage() == "numpy":
+                    return numpy.exp(x)
                 return math.exp(x)
             return base ** x
 
@@ -329,12 +818,41 @@ class Factor:
         Returns the result of applying a function the factor. Used in the
         implementation of the log function, exp and power
 
-        :param fun: Function used in the mapping
+        :param fun: Function used in the mapping, or the name of a registered
+                    operation
         :returns:   Result of applying fun to the factors values
         """
 
+        fun = resolveOperation(fun)
+
+        if self.getStorage() == "numpy":
+            map_res = numpyApply(fun, self.values)
+            if map_res is self.values or map_res.shape != self.values.shape:
+                map_res = numpy.broadcast_to(map_res, self.values.shape).copy()
+            return self.newFactor(self.rand_vars, map_res)
+
         map_res = map(fun, self.values)
-        return Factor(self.rand_vars, list(map_res))
+        return self.newFactor(self.rand_vars, list(map_res))
+
+    def mapInPlace(self, fun):
+        """
+        In place version of map, which writes the results in the values of
+        self
+
+        :param fun: Function used in the mapping, or the name of a registered
+                    operation
+        :returns:   Self, with fun applied to its values
+        """
+
+        fun = resolveOperation(fun)
+
+        if self.getStorage() == "numpy":
+            map_res = numpy.broadcast_to(
+                numpyApply(fun, self.values), self.values.shape
+            )
+            return self.writeValues(map_res)
+
+        return self.writeValues(map(fun, self.values))
 
     def marginal(self, arg_rand_vars):
         """
@@ -354,8 +872,6 @@ class Factor:
             >>> X_factor # Will yield marginal P(X)
         """
 
-        res_rand_vars = []
-
         # If the argument is a single variable
         if type(arg_rand_vars) != list:
             rand_vars = [arg_rand_vars]
@@ -363,16 +879,12 @@ class Factor:
             rand_vars = arg_rand_vars
 
         # Get resulting variables
-        for i in self.rand_vars:
-            var_in_self = False
+        ids = {i.id for i in rand_vars}
+        res_rand_vars = [i for i in self.rand_vars if i.id in ids]
 
-            for j in rand_vars:
-                if i.name == j.name:
-                    var_in_self = True
-                    break
-
-            if var_in_self:
-                res_rand_vars.append(i)
+        # With NumPy, sum the axes of the variables that are not in the result
+        if self.getStorage() == "numpy":
+            return self.marginalNumpy(res_rand_vars)
 
         # Calculate resulting size of factor
         res_values_size = self.getValuesListSize(res_rand_vars)
@@ -380,25 +892,230 @@ class Factor:
         # Initialized Resulting factor
         res_values = [0] * res_values_size
 
+        # Calculate the index in the result of every value. Variables that are
+        # not in the result have stride 0
+        res_strides = layoutStrides(res_rand_vars)
+        dims = [len(i.domain) for i in self.rand_vars]
+        strides = [res_strides.get(i.id, 0) for i in self.rand_vars]
+        indexes = stridedIndexes(dims, strides)
+
         # Calculate marginal
-        for i, value in enumerate(self.values):
-            index = 0
-            div = 1
-            mult = 1
-            k = 0
+        for index, value in zip(indexes, self.values):
+            res_values[index] += value
 
-            for j in self.rand_vars:
-                if k < len(res_rand_vars) and j.name == res_rand_vars[k].name:
-                    index += (int(i / div) % len(res_rand_vars[k].domain)) * mult
-                    mult *= len(res_rand_vars[k].domain)
-                    k += 1
+        # Make Factor object and return
+        return self.newFactor(res_rand_vars, res_values)
 
-                div *= len(j.domain)
+    def marginalNumpy(self, res_rand_vars):
+        """
+        Implementation of marginal used when the values are stored in NumPy
+        arrays. Every variable not in res_rand_vars is summed out in a single
+        reduction over its axis.
 
-            res_values[index] += value
+        :param res_rand_vars: Variables of the resulting factor, in the same
+                              order as in self
+        :returns:             Marginal factor
+        """
+
+        res_ids = {i.id for i in res_rand_vars}
+        shape = [len(i.domain) for i in self.rand_vars]
+        axes = tuple(i for i, j in enumerate(self.var_ids) if j not in res_ids)
+
+        values = self.values.reshape(shape, order="F")
+        res_values = values.sum(axis=axes).ravel(order="F")
+
+        return self.newFactor(res_rand_vars, res_values)
+
+    def multMarginal(self, factor, arg_rand_vars):
+        """
+        Calculates the product of self and factor and the marginal of that
+        product for a list of random variables, without making the full
+        product. The result is the same as:
+            >>> (self * factor).marginal(arg_rand_vars)
+
+        Since the full product is never stored, the memory used is the memory
+        of the operands and of the result. This is useful when summing
+        variables out of big products, like in variable elimination or in the
+        messages of belief propagation.
+
+        :param factor:        The other factor of the product
+        :param arg_rand_vars: List of random variables that will make up the
+                              returning factor
+        :returns:             Marginal of the product
+
+        Examples:
+            >>> # Assuming XY_factor as P(X | Y) and Y_factor as P(Y)
+            >>> X_factor = XY_factor.multMarginal(Y_factor, X)
+            >>> X_factor # Will yield P(X)
+        """
+
+        # If the argument is a single variable
+        if type(arg_rand_vars) != list:
+            rand_vars = [arg_rand_vars]
+        else:
+            rand_vars = arg_rand_vars
+
+        self.checkSpace(factor)
+
+        # If this is just scalar operation
+        if type(factor) == int or type(factor) == float:
+            return self.marginal(rand_vars).mult(factor)
+
+        # The product with a sparse factor is small
+        if factor.isSparse():
+            return self.mult(factor).marginal(rand_vars)
+
+        # Get the variables of the product and split them in the ones that
+        # are kept and the ones that are summed out
+        layout = factor_op_layouts.get(self.rand_vars, factor.rand_vars)
+        prod_rand_vars = layout.resRandVars(self.rand_vars, factor.rand_vars)
+
+        ids = {i.id for i in rand_vars}
+        res_rand_vars = [i for i in prod_rand_vars if i.id in ids]
+        sum_rand_vars = [i for i in prod_rand_vars if i.id not in ids]
+
+        # With NumPy, contract both factors with einsum
+        if self.getStorage() == "numpy" or factor.getStorage() == "numpy":
+            return self.multMarginalNumpy(factor, prod_rand_vars, res_rand_vars)
+
+        # The product is calculated for each assignment of the summed out
+        # variables and added to the result. For each assignment, the values
+        # of each factor are the ones of its kept variables plus an offset
+        strides1 = layoutStrides(self.rand_vars)
+        strides2 = layoutStrides(factor.rand_vars)
+
+        keep1 = [i for i in self.rand_vars if i.id in ids]
+        keep2 = [i for i in factor.rand_vars if i.id in ids]
+
+        base1 = stridedIndexes(
+            [len(i.domain) for i in keep1], [strides1[i.id] for i in keep1]
+        )
+        base2 = stridedIndexes(
+            [len(i.domain) for i in keep2], [strides2[i.id] for i in keep2]
+        )
+
+        sum_dims = [len(i.domain) for i in sum_rand_vars]
+        offsets1 = stridedIndexes(
+            sum_dims, [strides1.get(i.id, 0) for i in sum_rand_vars]
+        )
+        offsets2 = stridedIndexes(
+            sum_dims, [strides2.get(i.id, 0) for i in sum_rand_vars]
+        )
+
+        # Layout of the product between the kept parts of each factor
+        keep_layout = factor_op_layouts.get(keep1, keep2)
+        gather = factor_op_layouts.getGather(keep_layout)
+
+        res_values = [0] * keep_layout.res_size
+        for off1, off2 in zip(offsets1, offsets2):
+            values1 = [self.values[i + off1] for i in base1]
+            values2 = [factor.values[i + off2] for i in base2]
+
+            prod = map(
+                operator.mul, itertools.cycle(values1), map(values2.__getitem__, gather)
+            )
+            res_values = list(map(operator.add, res_values, prod))
 
         # Make Factor object and return
-        return Factor(res_rand_vars, res_values)
+        return self.newFactor(res_rand_vars, res_values)
+
+    def multMarginalNumpy(self, factor, prod_rand_vars, res_rand_vars):
+        """
+        Implementation of multMarginal used when the values are stored in
+        NumPy arrays. The product and the sum are done by numpy.einsum, which
+        doesn't store the full product.
+
+        :param factor:         The other factor of the product
+        :param prod_rand_vars: Variables of the full product
+        :param res_rand_vars:  Variables of the resulting factor
+        :returns:              Marginal of the product
+        """
+
+        # Give a label to each variable of the product
+        labels = {j.id: i for i, j in enumerate(prod_rand_vars)}
+
+        shape1 = [len(i.domain) for i in self.rand_vars]
+        shape2 = [len(i.domain) for i in factor.rand_vars]
+        values1 = numpy.asarray(self.values).reshape(shape1, order="F")
+        values2 = numpy.asarray(factor.values).reshape(shape2, order="F")
+
+        res_values = numpy.einsum(
+            values1,
+            [labels[i.id] for i in self.rand_vars],
+            values2,
+            [labels[i.id] for i in factor.rand_vars],
+            [labels[i.id] for i in res_rand_vars],
+        )
+
+        return self.newFactor(res_rand_vars, res_values.ravel(order="F"))
+
+    @staticmethod
+    def product(factors, keep=None, optimize="greedy"):
+        """
+        Calculates the product of a list of factors and the marginal of that
+        product for the variables in keep. Instead of multiplying the factors
+        from left to right, the pairs of factors are multiplied in the order
+        that keeps the intermediate factors small, and each variable that is
+        not kept is summed out as soon as no other factor has it.
+
+        :param factors:  List of factors
+        :param keep:     List of variables, or single variable, kept in the
+                         result. If None, every variable is kept and the
+                         result is the product of the factors
+        :param optimize: Either "greedy" or "optimal". See ContractionPlan
+        :returns:        Product of the factors. The variables are in the
+                         same order as in the product from left to right.
+                         The product of an empty list is the factor with no
+                         variables and the value 1
+
+        Examples:
+            >>> # Assuming fXY, fYZ and fZW as factors
+            >>> fXYZW = Factor.product([fXY, fYZ, fZW])
+            >>> fX = Factor.product([fXY, fYZ, fZW], keep=X)
+
+        The plan used, with its estimated flops and largest intermediate
+        factor, can be seen with:
+            >>> ContractionPlan([fXY, fYZ, fZW], keep=X)
+        """
+
+        if not factors:
+            return Factor([], [1])
+
+        plan = ContractionPlan(factors, keep, optimize)
+        return plan.execute(factors)
+
+    def reorder(self, rand_vars):
+        """
+        Returns a factor equal to self but with the variables in the order of
+        rand_vars.
+
+        :param rand_vars: List with the same variables of the factor, in the
+                          new order
+        :returns:         Factor with the variables reordered, a copy of self
+                          if the order is the same
+
+        Examples:
+            >>> # Assuming XY_factor as factor f(X, Y)
+            >>> YX_factor = XY_factor.reorder([Y, X])
+        """
+
+        ids = tuple(i.id for i in rand_vars)
+        if ids == self.var_ids:
+            return self.copy()
+
+        if len(ids) != len(self.var_ids) or set(ids) != set(self.var_ids):
+            raise FactorRandVarsEx(rand_vars)
+
+        if self.getStorage() == "numpy":
+            shape = [len(i.domain) for i in self.rand_vars]
+            values = numpy.asarray(self.values).reshape(shape, order="F")
+            values = values.transpose([self.var_pos[i] for i in ids])
+            return self.newFactor(rand_vars, values.ravel(order="F"))
+
+        strides = layoutStrides(self.rand_vars)
+        dims = [len(i.domain) for i in rand_vars]
+        indexes = stridedIndexes(dims, [strides[i] for i in ids])
+        return self.newFactor(rand_vars, [self.values[i] for i in indexes])
 
     def normalize(self, arg_rand_vars=None):
         """
@@ -429,7 +1146,27 @@ class Factor:
             >>> fac.normalize()
         """
 
-        marg_vars = []
+        # Make division
+        return self.div(self.normalizeMarginal(arg_rand_vars))
+
+    def normalizeInPlace(self, arg_rand_vars=None):
+        """
+        In place version of normalize, which writes the normalized values in
+        the values of self
+
+        :param arg_rand_vars: List of random variables to normalize, like in
+                              normalize
+        :returns:             Self, normalized
+        """
+
+        res = self
+        res /= self.normalizeMarginal(arg_rand_vars)
+        return res
+
+    def normalizeMarginal(self, arg_rand_vars):
+        """
+        Marginal used by normalize, of the variables that are not normalized
+        """
 
         # If the argument is a single variable
         if arg_rand_vars is None:
@@ -440,22 +1177,11 @@ class Factor:
             rand_vars = arg_rand_vars
 
         # Get resulting variables for marginal
-        for i in self.rand_vars:
-            var_in_self = True
-
-            for j in rand_vars:
-                if i.name == j.name:
-                    var_in_self = False
-                    break
-
-            if var_in_self:
-                marg_vars.append(i)
+        ids = {i.id for i in rand_vars}
+        marg_vars = [i for i in self.rand_vars if i.id not in ids]
 
         # Get marginal
-        marg = self.marginal(marg_vars)
-
-        # Make division
-        return self.div(marg)
+        return self.marginal(marg_vars)
 
     def instVar(self, arg, value=None):
         """
@@ -495,13 +1221,7 @@ class Factor:
         # Check if this is an instantiation of many variables by using only the
         # first argument as a list
         if type(arg) in [list, Event] and value is None:
-            res = copy.copy(self)
-
-            # Instantiate one variable at a time
-            for i in arg:
-                res = res.instVarSingle(i[0], i[1])
-
-            return res
+            return self.instVarMany(arg)
 
         # If this is actually a single variable instantiation
         else:
@@ -509,8 +1229,7 @@ class Factor:
 
     def instVarSingle(self, *args):
         """
-        Same has instVar, but this method instantiates a single variable and
-        it is the one used in the implementation of instVar.
+        Same has instVar, but this method instantiates a single variable.
 
         :param rand_var: Variable to instantiate
         :param inst:     Value for variable
@@ -521,56 +1240,102 @@ class Factor:
             >>> fX.instVar(X, vx) # Would yield f(X=vx, Y) = f(Y)
         """
 
-        res_rand_vars = []
-        var_index = -1
+        return self.instVarMany([(args[0], args[1])])
 
-        # Get arguments
-        rand_var = args[0]
-        inst = args[1]
+    def instVarMany(self, pairs):
+        """
+        Instantiates many variables in a single pass over the values, which is
+        the implementation of instVar. The values of the result are gathered
+        with the strides of the variables that are left, and the values of the
+        first of those variables, which are contiguous, are copied as slices.
+
+        With NumPy storage, the values of the result are a view of the values
+        of self when possible. Such views are read only, so in place
+        operations on the result replace its values instead of changing self.
+
+        :param pairs: Iterable of pairs between a variable and its value
+        :returns:     Factor with the variables instantiated, a copy of self
+                      if none of the variables is in the factor, or None if a
+                      value is not in the domain of its variable
+        """
 
-        # Get resulting variables and var_index
-        for i, rv in enumerate(self.rand_vars):
-            # Store current index of variable to instantiate and add rest of
-            # variables
-            if rv.name == rand_var.name:
-                var_index = i
-                res_rand_vars += self.rand_vars[i + 1 :]
-                break
-
-            # Add current variable to list
-            res_rand_vars.append(rv)
-
-        # If inst variable not in this factor, return it unchanged
-        if var_index == -1:
-            return self
-
-        # Get div factor
-        div = 1
-        for i in self.rand_vars:
-            if i.name == rand_var.name:
-                break
-            div *= len(i.domain)
-
-        # Get inst index
-        inst_index = -1
-        for i, dom in enumerate(self.rand_vars[var_index].domain):
-            if dom == inst:
-                inst_index = i
-                break
-
-        # If the value for instance couldn't be found, return None
-        if inst_index == -1:
+        insts = self.instIndexes(pairs)
+        if insts is None:
             return None
+        elif not insts:
+            return self.copy()
+
+        # Offset of the instantiated values, and dimension and stride of each
+        # variable left
+        offset = 0
+        stride = 1
+        res_rand_vars = []
+        dims = []
+        strides = []
+        for i, rand_var in enumerate(self.rand_vars):
+            if i in insts:
+                offset += insts[i] * stride
+            else:
+                res_rand_vars.append(rand_var)
+                dims.append(len(rand_var.domain))
+                strides.append(stride)
+            stride *= len(rand_var.domain)
+
+        if self.getStorage() == "numpy":
+            shape = [len(i.domain) for i in self.rand_vars]
+            index = tuple(insts.get(i, slice(None)) for i in range(len(shape)))
+            res_values = self.values.reshape(shape, order="F")[index]
+            res_values = res_values.ravel(order="F")
+
+            if numpy.shares_memory(res_values, self.values):
+                res_values.flags.writeable = False
+
+            return self.newFactor(res_rand_vars, res_values)
+
+        # The first variables that are left are contiguous in the values
+        run = 1
+        first = 0
+        while first < len(self.rand_vars) and first not in insts:
+            run *= dims[first]
+            first += 1
+
+        starts = stridedIndexes(dims[first:], strides[first:])
+
+        # Values of the same type as the values of self, list or array
+        values = self.values
+        res_values = values[:0]
+        if run == 1:
+            res_values.extend(values[offset + i] for i in starts)
+        else:
+            for i in starts:
+                res_values.extend(values[offset + i : offset + i + run])
 
-        # Calculate resulting factor
-        res_values = []
-        len_domain = len(self.rand_vars[var_index].domain)
-        for i, val in enumerate(self.values):
-            if int(i / div) % len_domain == inst_index:
-                res_values.append(val)
+        return self.newFactor(res_rand_vars, res_values)
 
-        # Make Factor object and return
-        return Factor(res_rand_vars, res_values)
+    def instIndexes(self, pairs):
+        """
+        Finds the index of the value of each instantiated variable in its
+        domain. Variables that are not in the factor are ignored, and if a
+        variable appears more than once, only its first value is used.
+
+        :param pairs: Iterable of pairs between a variable and its value
+        :returns:     Dictionary from the position of each variable in the
+                      factor to the index of its value, or None if a value is
+                      not in the domain of its variable
+        """
+
+        insts = {}
+        for rand_var, inst in pairs:
+            pos = self.var_pos.get(rand_var.id)
+            if pos is None or pos in insts:
+                continue
+
+            try:
+                insts[pos] = self.rand_vars[pos].index(inst)
+            except RandVarValueEx:
+                return None
+
+        return insts
 
     def expectedValue(self, fun):
         """
@@ -609,10 +1374,7 @@ class Factor:
         Returns true if the variable rand_var is in the factor's variables
         """
 
-        for i in self.rand_vars:
-            if i.name == rand_var.name:
-                return True
-        return False
+        return rand_var.id in self.var_pos
 
     def getValuesListSize(self, rand_vars):
         """
@@ -632,18 +1394,132 @@ class Factor:
         """
 
         for i, rv in enumerate(self.rand_vars):
-            f = False
-
-            for f_rv in factor.rand_vars[i:]:
-                if rv == f_rv:
-                    f = True
-                    break
+            pos = factor.var_pos.get(rv.id)
 
-            if not f:
+            if pos is None or pos < i or rv != factor.rand_vars[pos]:
                 return False
 
         return True
 
+    def valueIndex(self, assignment):
+        """
+        Calculates the index in the values of the value of an assignment of
+        every variable of the factor, from the strides of the variables and
+        the index of each value in its domain.
+
+        :param assignment: Event or list of pairs between a variable and its
+                           value, with every variable of the factor, or tuple
+                           with a value for each variable, in the order of the
+                           variables of the factor
+        :returns:          Index of the value
+        """
+
+        if type(assignment) == tuple:
+            inst = assignment
+            if len(inst) != len(self.rand_vars):
+                raise FactorRandVarsEx(self.rand_vars)
+        else:
+            by_id = {i[0].id: i[1] for i in assignment}
+            try:
+                inst = [by_id[i] for i in self.var_ids]
+            except KeyError:
+                missing = [i for i in self.rand_vars if i.id not in by_id]
+                raise FactorRandVarsEx(missing)
+
+        index = 0
+        for var, stride, value in zip(self.rand_vars, self.var_strides, inst):
+            index += var.index(value) * stride
+
+        return index
+
+    def valueIndexes(self, assignments):
+        """
+        Batch version of valueIndex. The assignments are encoded by the
+        VarLayout of the factor, one variable at a time.
+
+        :param assignments: Sequence of tuples, each with a value for each
+                            variable, in the order of the variables of the
+                            factor
+        :returns:           List with the index of the value of each tuple
+        """
+
+        assignments = list(assignments)
+        columns = list(zip(*assignments))
+        if not assignments:
+            columns = [()] * len(self.rand_vars)
+        elif len(columns) != len(self.rand_vars):
+            raise FactorRandVarsEx(self.rand_vars)
+
+        columns = [var.indices(i) for var, i in zip(self.rand_vars, columns)]
+        return self.varLayout().encode(columns, len(assignments))
+
+    def varLayout(self):
+        """
+        Returns the VarLayout of the variables of the factor, which encodes
+        batches of assignments into indexes of the values and decodes them
+
+        Examples:
+            >>> # Suppose fXY is the factor f(X, Y), with binary variables
+            >>> fXY.varLayout().decodeValues([0, 3])
+            [[vx1, vx2], [vy1, vy2]]
+        """
+
+        return VarLayout(self.rand_vars)
+
+    def indexEvent(self, index):
+        """
+        Event with the values of the variables at an index of the values
+
+        :param index: Index of the values
+        :returns:     Event object
+        """
+
+        columns = self.varLayout().decodeValues([index])
+        return Event([(var, i[0]) for var, i in zip(self.rand_vars, columns)])
+
+    def valueAt(self, assignment):
+        """
+        Returns the value of an assignment of every variable of the factor,
+        without instantiating the variables. Indexing the factor with a tuple
+        is the same as using this method with the tuple.
+
+        :param assignment: Event or list of pairs between a variable and its
+                           value, or tuple with the value of each variable,
+                           see valueIndex
+        :returns:          Value of the factor
+
+        Examples:
+            >>> # Suppose fXY is the factor f(X, Y)
+            >>> fXY.valueAt(Event([(X, vx), (Y, vy)]))
+            >>> fXY.valueAt([(Y, vy), (X, vx)])
+            >>> fXY[vx, vy]
+        """
+
+        return self.values[self.valueIndex(assignment)]
+
+    def valuesAt(self, assignments):
+        """
+        Returns the values of a batch of assignments of every variable of the
+        factor, see valueIndexes
+
+        :param assignments: Sequence of tuples, each with a value for each
+                            variable, in the order of the variables of the
+                            factor
+        :returns:           List with the values, or ndarray if the values of
+                            the factor are stored with NumPy
+
+        Examples:
+            >>> # Suppose fXY is the factor f(X, Y)
+            >>> fXY.valuesAt([(vx1, vy1), (vx2, vy1), (vx1, vy2)])
+        """
+
+        indexes = self.valueIndexes(assignments)
+
+        if self.getStorage() == "numpy":
+            return self.values[numpy.array(indexes, dtype=int)]
+
+        return list(map(self.values.__getitem__, indexes))
+
     def euclideanDist(self, factor):
         """
         Calculates the euclidean distance between two factors. They need to
@@ -656,7 +1532,7 @@ class Factor:
         if not self.sameVariables(factor):
             return None
 
-        diff = self.factorOp(factor, lambda x, y: (x - y) ** 2)
+        diff = self.factorOp(factor, sqDiff)
         return math.sqrt(sum(diff.values))
 
     def max(self):
@@ -689,16 +1565,7 @@ class Factor:
                 maxval = value
                 index = i - 1
 
-        # Make the event
-        event = []
-        div = 1
-        for i, var in enumerate(self.rand_vars):
-            doml = len(var.domain)
-            val = int(index / div) % doml
-            event.append((var, var.domain[val]))
-            div *= len(var.domain)
-
-        return Event(event)
+        return self.indexEvent(index)
 
     def argmin(self):
         """
@@ -716,16 +1583,7 @@ class Factor:
                 minval = value
                 index = i - 1
 
-        # Make the event
-        event = []
-        div = 1
-        for i, var in enumerate(self.rand_vars):
-            doml = len(var.domain)
-            val = int(index / div) % doml
-            event.append((var, var.domain[val]))
-            div *= len(var.domain)
-
-        return Event(event)
+        return self.indexEvent(index)
 
     def __repr__(self):
         # If this is a scalar factor, meaning that there are no variables and
@@ -761,12 +1619,24 @@ class Factor:
     def __truediv__(self, other):
         return self.div(other)
 
+    def __iadd__(self, other):
+        return self.factorOpInPlace(other, operator.add)
+
+    def __isub__(self, other):
+        return self.factorOpInPlace(other, operator.sub)
+
+    def __imul__(self, other):
+        return self.factorOpInPlace(other, operator.mul)
+
+    def __itruediv__(self, other):
+        return self.factorOpInPlace(other, operator.truediv)
+
     def __eq__(self, other):
         # Check variables
         self.sameVariables(other)
 
         # Check values
-        diff = self.factorOp(other, lambda x, y: x == y)
+        diff = self.factorOp(other, operator.eq)
 
         for i in diff.values:
             if not i:
@@ -778,8 +1648,37 @@ class Factor:
         return not self.__eq__(other)
 
     def __getitem__(self, index):
+        # A tuple has the value of each variable
+        if type(index) == tuple:
+            return self.valueAt(index)
+
         return self.values[index]
 
+    def __getstate__(self):
+        return slotsState(self)
+
+    def __setstate__(self, state):
+        # The ids of the variables may change when they are unpickled
+        setSlotsState(self, state)
+        self.indexRandVars()
+
+
+def numpyApply(fun, *args):
+    """
+    Applies fun to ndarrays. Functions like the ones used with factorOp and
+    map usually work directly with ndarrays, but if fun only works with single
+    values, like math.log, it is vectorized.
+
+    :param fun:  Function to apply
+    :param args: ndarrays used as arguments of fun
+    :returns:    Result of fun
+    """
+
+    try:
+        return numpy.asarray(fun(*args))
+    except (TypeError, ValueError):
+        return numpy.vectorize(fun)(*args)
+
 
 class FactorRandVarsEx(Exception):
     """
@@ -805,3 +1704,29 @@ class FactorValuesEx(Exception):
 
     def __str__(self):
         return "Bad values for factor:" + repr(self.bad_values)
+
+
+class LogFactorEx(Exception):
+    """
+    Exception used if a LogFactor is used in an operation with something that
+    is not a LogFactor or a scalar, like a factor in linear space.
+    """
+
+    def __init__(self, bad_factor):
+        self.bad_factor = bad_factor
+
+    def __str__(self):
+        return "Operation between LogFactor and:" + repr(self.bad_factor)
+
+
+class FactorStorageEx(Exception):
+    """
+    Exception used if the storage of a factor is unknown or not available,
+    like using NumPy storage without NumPy being installed.
+    """
+
+    def __init__(self, bad_storage):
+        self.bad_storage = bad_storage
+
+    def __str__(self):
+        return "Bad or unavailable factor storage:" + repr(self.bad_storage)
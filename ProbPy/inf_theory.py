@@ -7,6 +7,7 @@ import copy
 from math import log
 
 from ProbPy import Factor
+from ProbPy.operations import entropyTerm, kldTerm
 
 
 def entropy(factor, base=2):
@@ -20,10 +21,7 @@ def entropy(factor, base=2):
     :returns:      Returns the entropy
     """
 
-    def ent(x):
-        return x * log(x) / log(base) if x != 0 else 0
-
-    return -sum(factor.map(ent).values)
+    return -sum(factor.map(entropyTerm).values) / log(base)
 
 
 def kullbackLeiblerDistance(fac1, fac2, base=2):
@@ -38,10 +36,7 @@ def kullbackLeiblerDistance(fac1, fac2, base=2):
     :returns:    The Kullback-Leibler Distance
     """
 
-    def kld(f1, f2):
-        return f1 * log(f1 / f2) / log(base)
-
-    return sum(Factor.factorOp(fac1, fac2, kld).values)
+    return sum(Factor.factorOp(fac1, fac2, kldTerm).values) / log(base)
 
 
 def mutualInformation(joint, fac1, fac2, base=2):
@@ -0,0 +1,540 @@
+"""
+File that implements the layouts of variables used by the operations between
+factors, and a cache for them.
+
+The values of a factor are stored with the first variable changing faster.
+The layout of an operation between two factors says which variables the
+result has and where each value of the operands goes in the result. It only
+depends on the ids and on the sizes of the domains of the variables, so it
+can be computed once and reused every time two factors with the same layouts
+are combined.
+"""
+
+
+from collections import OrderedDict
+
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def layoutSignature(rand_vars):
+    """
+    Returns a hashable signature of a list of variables, made of their ids
+    and the sizes of their domains
+
+    :param rand_vars: List of random variables
+    :returns:         Tuple with a pair (id, domain size) for each variable
+    """
+
+    return tuple((i.id, len(i.domain)) for i in rand_vars)
+
+
+def layoutStrides(rand_vars):
+    """
+    Returns the stride of each variable in the values of a factor with the
+    variables rand_vars. The first variable has stride 1.
+
+    :param rand_vars: List of random variables
+    :returns:         Dictionary from the id of each variable to its stride
+    """
+
+    strides = {}
+    stride = 1
+    for i in rand_vars:
+        strides[i.id] = stride
+        stride *= len(i.domain)
+
+    return strides
+
+
+def stridedIndexes(dims, strides):
+    """
+    Returns the indexes visited when going through every value of a list of
+    dimensions, with the first dimension changing faster, in values where each
+    dimension has the given stride. A stride of 0 repeats the indexes.
+
+    The list is built one dimension at a time. Since the first dimension
+    changes faster, the indexes of the previous dimensions are repeated for
+    every value of the current dimension.
+
+    :param dims:    Size of each dimension
+    :param strides: Stride of each dimension
+    :returns:       List of indexes
+
+    Examples:
+        >>> stridedIndexes([2, 3], [3, 1])
+        [0, 3, 1, 4, 2, 5]
+        >>> stridedIndexes([2, 2], [1, 0])
+        [0, 1, 0, 1]
+    """
+
+    indexes = [0]
+    for dim, stride in zip(dims, strides):
+        if stride == 0:
+            indexes = indexes * dim
+        else:
+            indexes = [k + l * stride for l in range(dim) for k in indexes]
+
+    return indexes
+
+
+def stridedSlice(dims, strides, begin, end):
+    """
+    Returns stridedIndexes(dims, strides)[begin:end] without making every
+    index. The indexes of the first dimensions that fit in the slice are
+    made once and repeated with the offset of the remaining dimensions.
+
+    :param dims:    Size of each dimension
+    :param strides: Stride of each dimension
+    :param begin:   First position of the slice
+    :param end:     Position after the last one of the slice
+    :returns:       List of indexes
+
+    Examples:
+        >>> stridedSlice([2, 3], [3, 1], 1, 4)
+        [3, 1, 4]
+    """
+
+    # First dimensions whose indexes fit in the slice
+    split = 0
+    block = 1
+    while split < len(dims) and block * dims[split] <= max(end - begin, 1):
+        block *= dims[split]
+        split += 1
+
+    inner = stridedIndexes(dims[:split], strides[:split])
+
+    indexes = []
+    for i in range(begin // block, (end + block - 1) // block):
+        # Offset of the values of the remaining dimensions
+        offset = 0
+        rest = i
+        for dim, stride in zip(dims[split:], strides[split:]):
+            rest, digit = divmod(rest, dim)
+            offset += digit * stride
+
+        part = inner[max(begin - i * block, 0) : end - i * block]
+        indexes.extend(map(offset.__add__, part) if offset else part)
+
+    return indexes
+
+
+class VarLayout:
+    """
+    Layout of the values of a factor with a list of variables. It encodes
+    batches of assignments of the variables into indexes of the values of the
+    factor, and decodes indexes back into assignments.
+
+    A batch of assignments is given in columns, one for each variable, with
+    the index in the domain of the variable of each assignment. The encoding
+    and decoding go through each column once, instead of through each
+    variable of each assignment. If the columns or the indexes are NumPy
+    arrays, the result is also made of NumPy arrays.
+
+    :param rand_vars: List of random variables, the first changes faster
+
+    Examples:
+        >>> # Assuming X with a domain of size 2 and Y of size 3
+        >>> layout = VarLayout([X, Y])
+        >>> layout.encode([[0, 1, 1], [0, 0, 2]])
+        [0, 1, 5]
+        >>> layout.decode([0, 1, 5])
+        [[0, 1, 1], [0, 0, 2]]
+
+    The encodeValues and decodeValues methods do the same with the values of
+    the domains instead of their indexes.
+    """
+
+    def __init__(self, rand_vars):
+        self.rand_vars = rand_vars
+        self.dims = [len(i.domain) for i in rand_vars]
+
+        self.strides = []
+        self.size = 1
+        for i in self.dims:
+            self.strides.append(self.size)
+            self.size *= i
+
+    def encode(self, columns, num=None):
+        """
+        Converts columns of indexes in the domains of the variables into
+        indexes in the values
+
+        :param columns: One sequence for each variable with the index of the
+                        value of the variable in each assignment
+        :param num:     Number of assignments. Only needed if there are no
+                        variables, otherwise it is the size of the columns
+        :returns:       List with the index of each assignment, or ndarray if
+                        the columns are ndarrays
+        """
+
+        if len(columns) != len(self.rand_vars):
+            raise VarLayoutEx(len(self.rand_vars), len(columns))
+
+        lengths = [len(i) for i in columns]
+        if len(set(lengths)) > 1:
+            raise VarLayoutLengthEx(lengths)
+
+        if numpy is not None and any(isinstance(i, numpy.ndarray) for i in columns):
+            res = numpy.zeros(len(columns[0]) if columns else num, dtype=int)
+            for column, stride in zip(columns, self.strides):
+                res += numpy.asarray(column) * stride
+            return res
+
+        if num is None:
+            num = len(columns[0]) if columns else 0
+
+        res = [0] * num
+        for column, stride in zip(columns, self.strides):
+            if stride != 1:
+                column = map(stride.__mul__, column)
+            res = list(map(operator.add, res, column))
+
+        return res
+
+    def decode(self, indexes):
+        """
+        Converts indexes in the values into columns of indexes in the domains
+        of the variables
+
+        :param indexes: Sequence of indexes in the values
+        :returns:       List with one column for each variable, lists or
+                        ndarrays if the indexes are an ndarray
+        """
+
+        if numpy is not None and isinstance(indexes, numpy.ndarray):
+            return [
+                indexes // stride % dim for dim, stride in zip(self.dims, self.strides)
+            ]
+
+        columns = []
+        for dim, stride in zip(self.dims, self.strides):
+            column = indexes
+            if stride != 1:
+                column = map(stride.__rfloordiv__, column)
+            columns.append(list(map(dim.__rmod__, column)))
+
+        return columns
+
+    def encodeValues(self, columns):
+        """
+        Same as encode, but with columns of values of the domains of the
+        variables
+
+        :param columns: One sequence for each variable with its values
+        :returns:       List with the index of each assignment
+        """
+
+        if len(columns) != len(self.rand_vars):
+            raise VarLayoutEx(len(self.rand_vars), len(columns))
+
+        columns = [var.indices(i) for var, i in zip(self.rand_vars, columns)]
+        return self.encode(columns)
+
+    def decodeValues(self, indexes):
+        """
+        Same as decode, but returns columns with values of the domains of the
+        variables
+
+        :param indexes: Sequence of indexes in the values
+        :returns:       List with one list of values for each variable
+        """
+
+        columns = self.decode(indexes)
+        return [
+            list(map(var.domain.__getitem__, i))
+            for var, i in zip(self.rand_vars, columns)
+        ]
+
+
+class FactorOpLayout:
+    """
+    Precomputed layout of an operation between two factors. The result of the
+    operation has every variable of the first factor, followed by the
+    variables of the second factor that are not in the first.
+
+    :param rand_vars1: Variables of the first factor
+    :param rand_vars2: Variables of the second factor
+
+    The layout has the positions of the variables of the second factor which
+    are added to the result, the size of the result, the alignment of both
+    factors with the result, used for NumPy broadcasting, and the gather
+    indexes, which are the index of the value of the second factor used for
+    each value of the result.
+
+    The kind of the layout says how the values of both factors are combined,
+    so the common cases don't need the gather indexes:
+        "same":     Both factors have the same variables in the same order
+        "prefix":   The variables of the second factor are the first
+                    variables of the first factor, so its values are repeated
+        "extend":   The variables of the first factor are the first variables
+                    of the second factor, which has the variables of the
+                    result, so the values of the first factor are repeated
+        "disjoint": The factors have no variables in common, so the result is
+                    their outer product
+        "general":  Any other case, which uses the gather indexes
+    """
+
+    def __init__(self, rand_vars1, rand_vars2):
+        ids1 = {i.id for i in rand_vars1}
+
+        # Positions of the variables of the second factor added to the result
+        self.extra = [i for i, var in enumerate(rand_vars2) if var.id not in ids1]
+        res_rand_vars = self.resRandVars(rand_vars1, rand_vars2)
+
+        # Size of the result and of its dimensions
+        self.res_dims = [len(i.domain) for i in res_rand_vars]
+        self.res_size = 1
+        for i in self.res_dims:
+            self.res_size *= i
+
+        # Alignment of each factor with the result
+        self.align1 = self.makeAlignment(rand_vars1, res_rand_vars)
+        self.align2 = self.makeAlignment(rand_vars2, res_rand_vars)
+
+        # Stride of each variable of the result in the second factor, or 0 if
+        # the variable is not in the second factor
+        strides2 = layoutStrides(rand_vars2)
+        self.gather_strides = [strides2.get(i.id, 0) for i in res_rand_vars]
+        self.gather = None
+
+        self.kind = self.makeKind(rand_vars1, rand_vars2)
+
+    def makeKind(self, rand_vars1, rand_vars2):
+        """
+        Classifies the layout, see the description of the class
+
+        :param rand_vars1: Variables of the first factor
+        :param rand_vars2: Variables of the second factor
+        :returns:          "same", "prefix", "extend", "disjoint" or "general"
+        """
+
+        ids1 = [i.id for i in rand_vars1]
+        ids2 = [i.id for i in rand_vars2]
+
+        if ids1 == ids2:
+            return "same"
+        elif ids2 == ids1[: len(ids2)]:
+            return "prefix"
+        elif ids1 == ids2[: len(ids1)]:
+            return "extend"
+        elif len(self.extra) == len(ids2):
+            return "disjoint"
+
+        return "general"
+
+    def resRandVars(self, rand_vars1, rand_vars2):
+        """
+        Returns the variables of the result for the actual variables of the
+        operands
+
+        :param rand_vars1: Variables of the first factor
+        :param rand_vars2: Variables of the second factor
+        :returns:          Variables of the result
+        """
+
+        return rand_vars1 + [rand_vars2[i] for i in self.extra]
+
+    def makeAlignment(self, rand_vars, res_rand_vars):
+        """
+        Calculates how to align the values of a factor with the result. The
+        values are reshaped to the shape of the factor, their axes are
+        transposed to the order of the result and then reshaped to the aligned
+        shape, in which the variables missing from the factor have length 1.
+
+        :param rand_vars:     Variables of the factor
+        :param res_rand_vars: Variables of the result
+        :returns:             Tuple with shape, axes and aligned shape
+        """
+
+        res_pos = {j.id: i for i, j in enumerate(res_rand_vars)}
+        pos = [res_pos[i.id] for i in rand_vars]
+
+        shape = [len(i.domain) for i in rand_vars]
+        axes = sorted(range(len(pos)), key=lambda i: pos[i])
+
+        aligned_shape = [1] * len(res_rand_vars)
+        for i, var in zip(pos, rand_vars):
+            aligned_shape[i] = len(var.domain)
+
+        return shape, axes, aligned_shape
+
+    def getGather(self, max_gather_size=None):
+        """
+        Returns the gather indexes of the layout, the index in the values of
+        the second factor for every value of the result. The index in the
+        values of the first factor is simply the index of the result modulo
+        the size of the first factor.
+
+        :param max_gather_size: The indexes are only kept in the layout if the
+                                result has at most this number of values. If
+                                None, they are always kept
+        :returns:               List of indexes
+        """
+
+        if self.gather is not None:
+            return self.gather
+
+        gather = stridedIndexes(self.res_dims, self.gather_strides)
+
+        if max_gather_size is None or self.res_size <= max_gather_size:
+            self.gather = gather
+
+        return gather
+
+
+class LayoutCache:
+    """
+    Bounded least recently used cache of FactorOpLayout objects, keyed on the
+    signatures of the variables of both factors of an operation.
+
+    :param max_size:         Maximum number of layouts kept in the cache
+    :param max_gather_size:  Gather indexes are only kept for results with at
+                             most this number of values, so the cache doesn't
+                             keep very big lists alive
+    :param max_gather_total: Maximum number of gather indexes kept by all the
+                             layouts of the cache. The indexes of the least
+                             recently used layouts are dropped to stay under
+                             it
+
+    Examples:
+        >>> from ProbPy.layout import factor_op_layouts
+        >>> factor_op_layouts.setMaxSize(1024)
+        >>> factor_op_layouts.clear()
+    """
+
+    def __init__(self, max_size=128, max_gather_size=2 ** 18, max_gather_total=2 ** 20):
+        self.max_size = max_size
+        self.max_gather_size = max_gather_size
+        self.max_gather_total = max_gather_total
+        self.layouts = OrderedDict()
+
+    def get(self, rand_vars1, rand_vars2):
+        """
+        Returns the layout of the operation between factors with the
+        variables rand_vars1 and rand_vars2, computing it if it isn't cached
+
+        :param rand_vars1: Variables of the first factor
+        :param rand_vars2: Variables of the second factor
+        :returns:          FactorOpLayout of the operation
+        """
+
+        key = (layoutSignature(rand_vars1), layoutSignature(rand_vars2))
+
+        layout = self.layouts.get(key)
+        if layout is not None:
+            self.layouts.move_to_end(key)
+            return layout
+
+        layout = FactorOpLayout(rand_vars1, rand_vars2)
+
+        if self.max_size > 0:
+            self.layouts[key] = layout
+            while len(self.layouts) > self.max_size:
+                self.layouts.popitem(last=False)
+
+        return layout
+
+    def getGather(self, layout):
+        """
+        Returns the gather indexes of a layout, see FactorOpLayout.getGather.
+        The indexes are kept in the layout if its result has at most
+        max_gather_size values, and the indexes of the least recently used
+        layouts are dropped if the cache keeps more than max_gather_total
+
+        :param layout: FactorOpLayout, usually from this cache
+        :returns:      List of indexes
+        """
+
+        if layout.gather is not None:
+            return layout.gather
+
+        gather = layout.getGather(min(self.max_gather_size, self.max_gather_total))
+        if layout.gather is not None:
+            self.trimGathers(layout)
+
+        return gather
+
+    def trimGathers(self, keep=None):
+        """
+        Drops the gather indexes of the least recently used layouts until the
+        cache keeps at most max_gather_total indexes
+
+        :param keep: Layout whose indexes are dropped last
+        """
+
+        total = self.gatherTotal()
+        for layout in self.layouts.values():
+            if total <= self.max_gather_total:
+                return
+
+            if layout.gather is not None and layout is not keep:
+                layout.gather = None
+                total -= layout.res_size
+
+        if total > self.max_gather_total and keep is not None:
+            keep.gather = None
+
+    def gatherTotal(self):
+        """
+        Returns the number of gather indexes kept by the layouts of the cache
+        """
+
+        return sum(i.res_size for i in self.layouts.values() if i.gather is not None)
+
+    def setMaxSize(self, new_max_size):
+        """
+        Sets the maximum number of layouts kept in the cache, removing the
+        least recently used layouts if needed
+
+        :param new_max_size: New maximum size. If 0, nothing is cached
+        """
+
+        self.max_size = new_max_size
+        while len(self.layouts) > self.max_size:
+            self.layouts.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every layout from the cache
+        """
+
+        self.layouts.clear()
+
+    def __len__(self):
+        return len(self.layouts)
+
+
+# Cache used by the operations between factors
+factor_op_layouts = LayoutCache()
+
+
+class VarLayoutEx(Exception):
+    """
+    Exception used when the number of columns of a batch of assignments is
+    not the number of variables of the layout
+    """
+
+    def __init__(self, num_vars, num_columns):
+        self.num_vars = num_vars
+        self.num_columns = num_columns
+
+    def __str__(self):
+        return "Expected %d columns, got %d" % (self.num_vars, self.num_columns)
+
+
+class VarLayoutLengthEx(Exception):
+    """
+    Exception used when the columns of a batch of assignments have different
+    lengths
+    """
+
+    def __init__(self, lengths):
+        self.lengths = lengths
+
+    def __str__(self):
+        return "Columns of different lengths: %s" % self.lengths
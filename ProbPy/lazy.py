@@ -0,0 +1,392 @@
+"""
+File that implements lazy factors, which build an expression graph of
+operations between factors and evaluate it with fused operations.
+
+Each eager operation between factors goes through every value of its operands
+and makes a new factor with its result. In a chain of operations like:
+    >>> (Channel * l).marginal(Input).exp(2)
+
+the product is made only to be summed by the marginal. A LazyFactor records
+the operations instead. When the expression is evaluated, every chain of
+element wise operations, which are products, divisions, additions,
+subtractions, logarithms, exponentials, powers and maps, is compiled into a
+single function of the values of its operands. That function is applied in
+a single pass over the result, and a marginal of such a chain adds the values
+of the function directly to its result, without making the chain's factor.
+"""
+
+
+from ProbPy.factor import Factor
+from ProbPy.layout import layoutStrides, stridedIndexes
+
+import itertools
+import math
+import operator
+
+
+class LazyFactor:
+    """
+    Node of an expression graph of operations between factors. The graph is
+    only evaluated when evaluate() is called, and the result is the same as if
+    the operations had been made between factors.
+
+    :param factor: Factor used as a leaf of the graph
+
+    Examples:
+        >>> # Assuming Channel, l and p as factors
+        >>> cj = (LazyFactor(Channel) * l).marginal(Input).exp(2).evaluate()
+        >>> expr = (LazyFactor(p) * Channel).normalize(Input)
+        >>> res = expr.evaluate()
+
+    Operations can have factors, lazy factors or scalars as operands. A node
+    used more than once in the graph, like the operand of normalize, is
+    evaluated only once. Element wise operations are only fused when their
+    operands are Factor objects with list or array storage. The operations of
+    other factors, like factors with NumPy storage or subclasses of Factor,
+    are made with the methods of those factors.
+    """
+
+    def __init__(self, factor=None, op="leaf", args=None, rand_vars=None):
+        self.op = op
+        self.factor = factor
+        self.args = [] if args is None else args
+
+        if op == "leaf":
+            self.rand_vars = factor.rand_vars
+        else:
+            self.rand_vars = rand_vars
+
+    """
+    Building the graph
+    """
+
+    def binaryOp(self, op, other):
+        """
+        Node for a binary operation between self and other. The variables are
+        the ones of self followed by the ones of other that are not in self,
+        like in Factor.factorOp
+
+        :param op:    Name of the operation, "mult", "div", "add" or "sub"
+        :param other: Factor, LazyFactor or scalar
+        :returns:     New node
+        """
+
+        if type(other) == int or type(other) == float:
+            return LazyFactor(op=op, args=[self, other], rand_vars=self.rand_vars)
+
+        if isinstance(other, Factor):
+            other = LazyFactor(other)
+
+        ids = {i.id for i in self.rand_vars}
+        rand_vars = self.rand_vars + [i for i in other.rand_vars if i.id not in ids]
+        return LazyFactor(op=op, args=[self, other], rand_vars=rand_vars)
+
+    def mult(self, factor):
+        return self.binaryOp("mult", factor)
+
+    def div(self, factor):
+        return self.binaryOp("div", factor)
+
+    def add(self, factor):
+        return self.binaryOp("add", factor)
+
+    def sub(self, factor):
+        return self.binaryOp("sub", factor)
+
+    def unaryOp(self, op, arg):
+        """
+        Node for an element wise function of the values of self
+
+        :param op:  Name of the Factor method, "log", "exp", "pow" or "map"
+        :param arg: Argument of the method
+        :returns:   New node
+        """
+
+        return LazyFactor(op=op, args=[self, arg], rand_vars=self.rand_vars)
+
+    def log(self, base):
+        return self.unaryOp("log", base)
+
+    def exp(self, base=None):
+        return self.unaryOp("exp", base)
+
+    def pow(self, p):
+        return self.unaryOp("pow", p)
+
+    def map(self, fun):
+        return self.unaryOp("map", fun)
+
+    def marginal(self, arg_rand_vars):
+        """
+        Node for the marginal of self, see Factor.marginal
+        """
+
+        # If the argument is a single variable
+        if type(arg_rand_vars) != list:
+            rand_vars = [arg_rand_vars]
+        else:
+            rand_vars = arg_rand_vars
+
+        ids = {i.id for i in rand_vars}
+        res_rand_vars = [i for i in self.rand_vars if i.id in ids]
+        return LazyFactor(op="marginal", args=[self], rand_vars=res_rand_vars)
+
+    def normalize(self, arg_rand_vars=None):
+        """
+        Node for the normalization of self, see Factor.normalize. Self is
+        used twice, divided by its marginal, but only evaluated once
+        """
+
+        # If the argument is a single variable
+        if arg_rand_vars is None:
+            rand_vars = self.rand_vars
+        elif type(arg_rand_vars) != list:
+            rand_vars = [arg_rand_vars]
+        else:
+            rand_vars = arg_rand_vars
+
+        ids = {i.id for i in rand_vars}
+        marg_vars = [i for i in self.rand_vars if i.id not in ids]
+        return self.div(self.marginal(marg_vars))
+
+    """
+    Evaluation
+    """
+
+    def evaluate(self):
+        """
+        Evaluates the expression graph
+
+        :returns: Factor with the result of the expression
+        """
+
+        # Number of parents of every node, nodes with more than one parent
+        # are evaluated only once
+        parents = {}
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            for i in node.args:
+                if isinstance(i, LazyFactor):
+                    parents[id(i)] = parents.get(id(i), 0) + 1
+                    if parents[id(i)] == 1:
+                        stack.append(i)
+
+        return LazyEvaluation(parents).evaluate(self)
+
+    def __add__(self, other):
+        return self.add(other)
+
+    def __sub__(self, other):
+        return self.sub(other)
+
+    def __mul__(self, other):
+        return self.mult(other)
+
+    def __truediv__(self, other):
+        return self.div(other)
+
+    def __repr__(self):
+        return "{LazyFactor %s: %s}" % (self.op, [i.name for i in self.rand_vars])
+
+
+class LazyEvaluation:
+    """
+    Evaluation of an expression graph. Every node is evaluated at most once.
+
+    :param parents: Dictionary from the id() of each node to its number of
+                    parents
+    """
+
+    # Element wise operations
+    binary_ops = {
+        "mult": operator.mul,
+        "div": operator.truediv,
+        "add": operator.add,
+        "sub": operator.sub,
+    }
+    unary_ops = ["log", "exp", "pow", "map"]
+
+    def __init__(self, parents):
+        self.parents = parents
+        self.results = {}
+
+    def evaluate(self, node):
+        """
+        Returns the factor of a node, evaluating it if needed
+        """
+
+        res = self.results.get(id(node))
+        if res is not None:
+            return res
+
+        if node.op == "leaf":
+            res = node.factor
+        elif node.op == "marginal":
+            res = self.evaluateMarginal(node)
+        else:
+            res = self.evaluateElementWise(node)
+
+        self.results[id(node)] = res
+        return res
+
+    def isElementWise(self, node):
+        """
+        Checks if a node is an element wise operation that can be fused in the
+        function of its parent, which is the case if it has only one parent
+        """
+
+        return (
+            isinstance(node, LazyFactor)
+            and (node.op in self.binary_ops or node.op in self.unary_ops)
+            and self.parents.get(id(node), 0) == 1
+            and id(node) not in self.results
+        )
+
+    def evaluateMarginal(self, node):
+        """
+        Evaluates a marginal. If its operand is an element wise operation, the
+        values of the fused function are added to the result directly
+        """
+
+        child = node.args[0]
+        if not self.isElementWise(child):
+            return self.evaluate(child).marginal(node.rand_vars)
+
+        kernel = self.compile(child)
+        if kernel is None:
+            return self.evaluate(child).marginal(node.rand_vars)
+
+        fun, inputs = kernel
+
+        # Index in the result of every value of the operand
+        res_strides = layoutStrides(node.rand_vars)
+        dims = [len(i.domain) for i in child.rand_vars]
+        strides = [res_strides.get(i.id, 0) for i in child.rand_vars]
+        indexes = stridedIndexes(dims, strides)
+
+        res_size = 1
+        for i in node.rand_vars:
+            res_size *= len(i.domain)
+
+        res_values = [0] * res_size
+        for index, value in zip(indexes, self.apply(fun, inputs, child)):
+            res_values[index] += value
+
+        return inputs[0].newFactor(node.rand_vars, res_values)
+
+    def evaluateElementWise(self, node):
+        """
+        Evaluates an element wise operation, fusing it with the element wise
+        operations of its operands
+        """
+
+        kernel = self.compile(node)
+        if kernel is None:
+            return self.evaluateEager(node)
+
+        fun, inputs = kernel
+        res_values = list(self.apply(fun, inputs, node))
+        return inputs[0].newFactor(node.rand_vars, res_values)
+
+    def evaluateEager(self, node):
+        """
+        Evaluates an element wise operation with the methods of the factors of
+        its operands
+        """
+
+        args = [self.evaluate(i) if isinstance(i, LazyFactor) else i for i in node.args]
+        return getattr(args[0], node.op)(*args[1:])
+
+    def compile(self, node):
+        """
+        Compiles an element wise operation, and the element wise operations of
+        its operands that can be fused, into a single function. The function
+        is composed of closures over the functions of the operations, and
+        takes a tuple with a value of each input
+
+        :param node: Element wise node
+        :returns:    Tuple with the function and the list of factors with its
+                     arguments, or None if the operation can't be fused
+        """
+
+        inputs = []
+        fun = self.compose(node, node, inputs)
+
+        # Only factors with values in lists or arrays are fused
+        for i in inputs:
+            if type(i) != Factor or i.getStorage() not in ["list", "array", "array32"]:
+                return None
+
+        return fun, inputs
+
+    def compose(self, arg, node, inputs):
+        """
+        Makes the function of an operand of a fused operation
+
+        :param arg:    Operand, a node or a constant
+        :param node:   Node of the fused operation
+        :param inputs: List of factors with the arguments of the function, to
+                       which the operands evaluated as factors are added
+        :returns:      Function of a tuple with a value of each input
+        """
+
+        # Constant operand
+        if not isinstance(arg, LazyFactor):
+            return lambda values: arg
+
+        # Operand evaluated as a factor
+        if arg is not node and not self.isElementWise(arg):
+            inputs.append(self.evaluate(arg))
+            return operator.itemgetter(len(inputs) - 1)
+
+        if arg.op in self.binary_ops:
+            op = self.binary_ops[arg.op]
+            left = self.compose(arg.args[0], node, inputs)
+            right = self.compose(arg.args[1], node, inputs)
+            return lambda values: op(left(values), right(values))
+
+        operand = self.compose(arg.args[0], node, inputs)
+        param = arg.args[1]
+
+        if arg.op == "log":
+            return lambda values: math.log(operand(values), param)
+        elif arg.op == "exp" and param is None:
+            return lambda values: math.exp(operand(values))
+        elif arg.op == "exp":
+            return lambda values: param ** operand(values)
+        elif arg.op == "pow":
+            return lambda values: operand(values) ** param
+        return lambda values: param(operand(values))
+
+    def apply(self, fun, inputs, node):
+        """
+        Iterator over the values of fun for every value of the result of node.
+        The value of each input is gathered with the strides of its variables
+
+        :param fun:    Compiled function
+        :param inputs: Factors with the arguments of fun
+        :param node:   Node with the variables of the result
+        :returns:      Iterator with the values
+        """
+
+        dims = [len(i.domain) for i in node.rand_vars]
+        ids = [i.id for i in node.rand_vars]
+
+        size = 1
+        for i in dims:
+            size *= i
+
+        streams = []
+        for fac in inputs:
+            # If the variables of the input are the first variables of the
+            # result, its values are simply repeated
+            if list(fac.var_ids) == ids[: len(fac.var_ids)]:
+                streams.append(itertools.cycle(fac.values))
+                continue
+
+            strides = layoutStrides(fac.rand_vars)
+            gather = stridedIndexes(dims, [strides.get(i, 0) for i in ids])
+            streams.append(map(fac.values.__getitem__, gather))
+
+        return itertools.islice(map(fun, zip(*streams)), size)
@@ -0,0 +1,356 @@
+"""
+Implements the Log Factor class, a factor with its values in log space.
+"""
+
+
+from ProbPy import Factor
+from ProbPy.factor import numpy, LogFactorEx
+from ProbPy.layout import layoutStrides, stridedIndexes
+
+import math
+import operator
+
+
+class LogFactor(Factor):
+    """
+    Factor that stores the natural logarithm of its values. Long products of
+    factors with small values, like the ones in variable elimination, HMMs or
+    belief propagation, may underflow to 0.0. In log space the product is a
+    sum of logarithms, so they don't underflow and don't need to be normalized
+    after every step.
+
+    The operations of this class are the same as the ones of the Factor class,
+    but done in log space. Multiplication adds the values, division subtracts
+    them, and the marginal is a log-sum-exp, which doesn't underflow. The
+    values attribute has the logarithms. Conversion to and from linear space
+    is explicit, a LogFactor and a Factor can't be used in the same operation.
+
+    :param rand_vars: List of Random Variables of this factor, or single
+                      variable
+    :param values:    Logarithm of the values of the factor
+    :param factor:    Factor in linear space. The new factor will have the
+                      logarithm of its values
+    :param storage:   Storage of the values, as in Factor
+
+    Examples:
+        >>> # Assuming X and Y are variables
+        >>> XY_factor = Factor([X, Y], [0.2, 0.3, 0.1, 0.4])
+        >>> XY_log = LogFactor(factor=XY_factor)
+        >>> X_log = (XY_log * XY_log).marginal(X)
+        >>> X_factor = X_log.toFactor()
+
+    Scalars used in operations are in linear space, so XY_log * 2 doubles the
+    values of the factor.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, rand_vars=None, values=None, factor=None, storage=None):
+        if factor is not None:
+            super().__init__(factor.rand_vars[:], logValues(factor.values))
+        else:
+            super().__init__(rand_vars, values)
+
+        if storage is not None:
+            self.values = self.convertValues(self.values, storage)
+
+    def newFactor(self, rand_vars, values):
+        return LogFactor.fromTrusted(rand_vars, self.keepStorage(values))
+
+    def isLogSpace(self):
+        return True
+
+    def toFactor(self):
+        """
+        Converts the factor to linear space
+
+        :returns: Factor with the exponential of the values of self
+        """
+
+        return Factor.fromTrusted(self.rand_vars, self.values).exp()
+
+    def logOp(self, factor, fun, numpy_fun):
+        """
+        Operation between self and another LogFactor, or a scalar in linear
+        space
+
+        :param factor:    The other factor used for this operation
+        :param fun:       Operation between values in log space
+        :param numpy_fun: Same operation for NumPy arrays
+        :returns:         Result of the operation
+        """
+
+        if type(factor) == int or type(factor) == float:
+            factor = LogFactor([], [logValue(factor)])
+
+        if not isinstance(factor, LogFactor):
+            raise LogFactorEx(factor)
+
+        if self.getStorage() == "numpy" or factor.getStorage() == "numpy":
+            return self.factorOp(factor, numpy_fun)
+
+        return self.factorOp(factor, fun)
+
+    def logOpInPlace(self, factor, fun, numpy_fun):
+        """
+        In place version of logOp, see Factor.factorOpInPlace
+
+        :param factor:    The other factor used for this operation
+        :param fun:       Operation between values in log space
+        :param numpy_fun: Same operation for NumPy arrays
+        :returns:         Self, with the result of the operation
+        """
+
+        if type(factor) == int or type(factor) == float:
+            factor = LogFactor([], [logValue(factor)])
+
+        if not isinstance(factor, LogFactor):
+            raise LogFactorEx(factor)
+
+        if self.getStorage() == "numpy" or factor.getStorage() == "numpy":
+            return self.factorOpInPlace(factor, numpy_fun)
+
+        return self.factorOpInPlace(factor, fun)
+
+    def mult(self, factor):
+        """
+        Multiplication, which adds the logarithms
+
+        :param factor: Other factor in operation
+        :returns:      Result of operation
+        """
+
+        return self.logOp(factor, operator.add, operator.add)
+
+    def div(self, factor):
+        """
+        Division, which subtracts the logarithms
+
+        :param factor: Other factor in operation
+        :returns:      Result of operation
+        """
+
+        return self.logOp(factor, operator.sub, operator.sub)
+
+    def add(self, factor):
+        """
+        Addition, done with log-add-exp
+
+        :param factor: Other factor in operation
+        :returns:      Result of operation
+        """
+
+        return self.logOp(factor, logAddExp, numpyLogAddExp)
+
+    def sub(self, factor):
+        """
+        Subtraction, done with log-sub-exp. The values of self must not be
+        smaller than the values of factor
+
+        :param factor: Other factor in operation
+        :returns:      Result of operation
+        """
+
+        return self.logOp(factor, logSubExp, numpyLogSubExp)
+
+    def log(self, base):
+        """
+        Logarithm of the values of the factor in linear space
+
+        :param base: Base of the logarithm
+        :returns:    Factor in linear space with the logarithms
+        """
+
+        return Factor.fromTrusted(self.rand_vars, self.values).mult(1 / math.log(base))
+
+    def exp(self, base=None):
+        """
+        Exp of the values of the factor in linear space. The result is a
+        LogFactor
+
+        :param base: Base of the exp. If None, e is used
+        :returns:    LogFactor with the exp of the values
+        """
+
+        # The logarithm of base ** x is x * log(base)
+        scale = 1 if base is None else math.log(base)
+        return self.newFactor(self.rand_vars, self.toFactor().mult(scale).values)
+
+    def pow(self, p):
+        """
+        Power of the values of the factor, which multiplies the logarithms
+
+        :param p: Values of power used
+        :returns: Power of the elements in the factor by p
+        """
+
+        return self.map(lambda x: x * p)
+
+    def marginal(self, arg_rand_vars):
+        """
+        Marginal of the factor, calculated with log-sum-exp. For each value of
+        the result, the maximum of the summed values is subtracted before the
+        exponentials are calculated, so the sum doesn't underflow.
+
+        :param arg_rand_vars: List of random variables that will make up the
+                              returning factor
+        :returns:             Marginal factor
+        """
+
+        # If the argument is a single variable
+        if type(arg_rand_vars) != list:
+            rand_vars = [arg_rand_vars]
+        else:
+            rand_vars = arg_rand_vars
+
+        ids = {i.id for i in rand_vars}
+        res_rand_vars = [i for i in self.rand_vars if i.id in ids]
+
+        if self.getStorage() == "numpy":
+            return self.marginalNumpy(res_rand_vars)
+
+        # Index in the result of every value
+        res_strides = layoutStrides(res_rand_vars)
+        dims = [len(i.domain) for i in self.rand_vars]
+        strides = [res_strides.get(i.id, 0) for i in self.rand_vars]
+        indexes = stridedIndexes(dims, strides)
+
+        # Maximum of the values summed into each value of the result
+        res_size = self.getValuesListSize(res_rand_vars)
+        maxs = [-math.inf] * res_size
+        for index, value in zip(indexes, self.values):
+            if value > maxs[index]:
+                maxs[index] = value
+
+        shifts = [i if math.isfinite(i) else 0 for i in maxs]
+
+        # Sum the exponentials
+        sums = [0] * res_size
+        for index, value in zip(indexes, self.values):
+            sums[index] += math.exp(value - shifts[index])
+
+        res_values = [logValue(j) + shifts[i] for i, j in enumerate(sums)]
+        return self.newFactor(res_rand_vars, res_values)
+
+    def marginalNumpy(self, res_rand_vars):
+        """
+        Implementation of marginal used when the values are stored in NumPy
+        arrays
+
+        :param res_rand_vars: Variables of the resulting factor
+        :returns:             Marginal factor
+        """
+
+        ids = {i.id for i in res_rand_vars}
+        shape = [len(i.domain) for i in self.rand_vars]
+        axes = tuple(i for i, j in enumerate(self.var_ids) if j not in ids)
+
+        values = self.values.reshape(shape, order="F")
+        maxs = values.max(axis=axes, keepdims=True)
+        maxs[~numpy.isfinite(maxs)] = 0
+
+        with numpy.errstate(divide="ignore"):
+            sums = numpy.exp(values - maxs).sum(axis=axes)
+            res_values = numpy.log(sums) + maxs.reshape(sums.shape)
+
+        return self.newFactor(res_rand_vars, res_values.ravel(order="F"))
+
+    def multMarginal(self, factor, arg_rand_vars):
+        """
+        Marginal of the product of self and factor, in log space
+
+        :param factor:        The other factor of the product
+        :param arg_rand_vars: List of random variables that will make up the
+                              returning factor
+        :returns:             Marginal of the product
+        """
+
+        return self.mult(factor).marginal(arg_rand_vars)
+
+    def expectedValue(self, fun):
+        """
+        Expected value of a function, given by a factor in linear space, for
+        the distribution represented by this factor
+
+        :param fun: A factor in linear space with the function
+        :returns:   Expected value of factor
+        """
+
+        return self.toFactor().expectedValue(fun)
+
+    def __iadd__(self, other):
+        return self.logOpInPlace(other, logAddExp, numpyLogAddExp)
+
+    def __isub__(self, other):
+        return self.logOpInPlace(other, logSubExp, numpyLogSubExp)
+
+    def __imul__(self, other):
+        return self.logOpInPlace(other, operator.add, operator.add)
+
+    def __itruediv__(self, other):
+        return self.logOpInPlace(other, operator.sub, operator.sub)
+
+
+def logValue(value):
+    """
+    Natural logarithm of a value, which is -inf for 0
+    """
+
+    if value == 0:
+        return -math.inf
+    return math.log(value)
+
+
+def logValues(values):
+    """
+    Natural logarithm of a list or ndarray of values, which is -inf for 0
+    """
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        with numpy.errstate(divide="ignore"):
+            return numpy.log(values)
+
+    return [logValue(i) for i in values]
+
+
+def logAddExp(x, y):
+    """
+    Returns log(exp(x) + exp(y)) without underflow
+    """
+
+    if x == -math.inf:
+        return y
+    if y == -math.inf:
+        return x
+
+    big = max(x, y)
+    return big + math.log1p(math.exp(-abs(x - y)))
+
+
+def logSubExp(x, y):
+    """
+    Returns log(exp(x) - exp(y)) without underflow. x must not be smaller
+    than y
+    """
+
+    if x == y:
+        return -math.inf
+
+    return x + math.log1p(-math.exp(y - x))
+
+
+def numpyLogAddExp(x, y):
+    """
+    Same as logAddExp, for NumPy arrays
+    """
+
+    return numpy.logaddexp(x, y)
+
+
+def numpyLogSubExp(x, y):
+    """
+    Same as logSubExp, for NumPy arrays
+    """
+
+    with numpy.errstate(divide="ignore"):
+        return x + numpy.log1p(-numpy.exp(y - x))
@@ -14,8 +14,13 @@ class BPMsg:
     :param sender:   Id of sender node
     :param receiver: If of receiving node
     :param cycle:    Algorithm cycle from which this message was made
+
+    Belief Propagation makes many messages, so the attributes of messages and
+    nodes are kept in __slots__ instead of a __dict__ for each object.
     """
 
+    __slots__ = ("factor", "sender", "receiver", "cycle")
+
     def __init__(self, factor, sender, receiver, cycle=0):
         self.factor = factor
         self.sender = sender
@@ -45,6 +50,8 @@ class MarkovNode:
     :param node_id: The id of this node.
     """
 
+    __slots__ = ("node_id", "neighbors", "in_msgs", "out_msgs")
+
     def __init__(self, node_id):
         self.node_id = node_id
         self.neighbors = []
@@ -93,6 +100,8 @@ class MarkovNetVar(MarkovNode):
     :param node_id: Id of this node
     """
 
+    __slots__ = ("var", "last_out_msgs", "marginal")
+
     def __init__(self, var, node_id=0):
         super().__init__(node_id)
 
@@ -150,7 +159,7 @@ class MarkovNetVar(MarkovNode):
                     continue
 
                 # Take message from j, multiply it with all messages k
-                msg = self.in_msgs[j].factor
+                msg = self.in_msgs[j].factor.copy()
                 for k, nei_k in enumerate(self.neighbors):
                     if i == k or j == k:
                         continue
@@ -262,6 +271,8 @@ class MarkovNetFactor(MarkovNode):
     :param node_id: Id of this node
     """
 
+    __slots__ = ("factor", "visited_in_update", "new")
+
     def __init__(self, factor, node_id=0):
         super().__init__(node_id)
 
@@ -329,7 +340,7 @@ class MarkovNetFactor(MarkovNode):
                         continue
 
                     # Take message from j, multiply it with all messages k
-                    msg = self.in_msgs[j].factor
+                    msg = self.in_msgs[j].factor.copy()
                     for k, nei_k in enumerate(self.neighbors):
                         if i == k or j == k:
                             continue
@@ -340,7 +351,7 @@ class MarkovNetFactor(MarkovNode):
                         msg *= self.in_msgs[k].factor
 
                     # Send message to i, and go to next i
-                    msg = (self.factor * msg).marginal(nei_i.var)
+                    msg = self.factor.multMarginal(msg, nei_i.var)
                     self.out_msgs[i] = BPMsg(msg, self.node_id, nei_i.node_id, cycle)
                     nei_i.putIn(self.out_msgs[i], self.node_id)
                     break
@@ -611,7 +622,7 @@ class MarkovNetwork:
         for i in self.var_nodes:
             var = self.var_nodes[i]
 
-            msg = var.in_msgs[0].factor
+            msg = var.in_msgs[0].factor.copy()
             for j in var.in_msgs[1:]:
                 msg *= j.factor
 
@@ -0,0 +1,170 @@
+"""
+File that implements the registry of named elementwise operations used
+between the values of factors.
+
+The workers of a ParPool run in other processes. Functions are sent to them
+pickled, which only works for functions that can be imported by name, so
+lambdas and nested functions can't be used with the spawn and forkserver
+start methods. The operations of the registry are sent to the workers by
+their name instead, and the workers find them in their own registry.
+"""
+
+
+import math
+import operator
+
+
+def registerOperation(name, fun):
+    """
+    Registers an elementwise operation under a name. Operations on ParFactor
+    objects that use fun send its name to the workers of the pool.
+
+    The operations registered when a pool starts are passed to its workers,
+    and the workers of a pool are restarted when an operation is registered
+    later. With the spawn and forkserver start methods, the operations are
+    pickled to be passed, so fun must be a module level function. Other
+    functions, like lambdas, should be registered both in this process and in
+    each worker, by the initializer of the pool, see ParPool.
+
+    :param name: Name of the operation
+    :param fun:  Function of the operation
+
+    Examples:
+        >>> def hellinger(x, y):
+        ...     return (math.sqrt(x) - math.sqrt(y)) ** 2
+        >>> registerOperation("hellinger", hellinger)
+        >>> P_par.factorOp(Q_par, "hellinger")
+    """
+
+    global operations_version
+
+    old_fun = operation_funs.get(name)
+    if old_fun is not None and operation_names.get(old_fun) == name:
+        del operation_names[old_fun]
+
+    operation_funs[name] = fun
+    operation_names.setdefault(fun, name)
+    operations_version += 1
+
+    if name not in user_operations:
+        user_operations.append(name)
+
+
+def getOperation(name):
+    """
+    Returns the function of an operation
+
+    :param name: Name of the operation
+    :returns:    Function of the operation
+    """
+
+    fun = operation_funs.get(name)
+    if fun is None:
+        raise OperationEx(name)
+
+    return fun
+
+
+def resolveOperation(fun):
+    """
+    Returns the function of an operation if fun is its name, or fun if it is
+    already a function
+    """
+
+    if type(fun) == str:
+        return getOperation(fun)
+
+    return fun
+
+
+def operationName(fun):
+    """
+    Returns the name under which a function is registered, or None if it is
+    not registered
+    """
+
+    try:
+        return operation_names.get(fun)
+    except TypeError:
+        # Functions that can't be hashed can't be registered
+        return None
+
+
+def userOperations():
+    """
+    Returns a dictionary with the operations registered by the user
+    """
+
+    return {i: operation_funs[i] for i in user_operations}
+
+
+def setOperations(user_ops):
+    """
+    Registers the operations of a dictionary from names to functions. Used to
+    pass the operations registered by the user to the workers of a pool
+    """
+
+    for name, fun in user_ops.items():
+        registerOperation(name, fun)
+
+
+def sqDiff(x, y):
+    """
+    Squared difference, used by the euclidean distance
+    """
+
+    return (x - y) ** 2
+
+
+def kldTerm(x, y):
+    """
+    Term of the Kullback-Leibler Distance, in nats
+    """
+
+    return x * math.log(x / y)
+
+
+def entropyTerm(x):
+    """
+    Term of the entropy, in nats, with the term of 0 being 0
+    """
+
+    return x * math.log(x) if x != 0 else 0
+
+
+# Registered operations, from their name to their function, and from their
+# function to their name. The operations of the library are registered here
+operation_funs = {
+    "mul": operator.mul,
+    "div": operator.truediv,
+    "add": operator.add,
+    "sub": operator.sub,
+    "eq": operator.eq,
+    "sq_diff": sqDiff,
+    "kld_term": kldTerm,
+    "entropy_term": entropyTerm,
+    "log": math.log,
+    "exp": math.exp,
+    "pow": operator.pow,
+}
+operation_names = {j: i for i, j in operation_funs.items()}
+
+# Names of the operations registered by the user, which are passed to the
+# workers when a pool starts
+user_operations = []
+
+# Incremented when an operation is registered, so the pools can tell if their
+# workers have every operation
+operations_version = 0
+
+
+class OperationEx(Exception):
+    """
+    Exception used when an operation is not registered
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return "Operation not registered: %s" % self.name
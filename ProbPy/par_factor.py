@@ -1,11 +1,492 @@
 """
-Implements the Parallel Factor class.
+Implements the Parallel Factor class, the pool of worker processes used by
+its operations and the shared memory segments through which the workers get
+the values.
 """
 
 
-from ProbPy import RandVar, Factor, Event
+from ProbPy import Factor
+from ProbPy.factor import FactorRandVarsEx
+from ProbPy.operations import operationName, resolveOperation, sqDiff
+from ProbPy.operations import setOperations, userOperations
+from ProbPy import operations
+from ProbPy.layout import factor_op_layouts, layoutStrides, stridedSlice
+
+import array
+import atexit
+import functools
+import itertools
+import math
+import multiprocessing
+import operator
+import os
+import pickle
+import weakref
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Shared memory needs Python 3.8, without it ParFactor works like Factor
+    resource_tracker = shared_memory = None
+
+
+class ParPool:
+    """
+    Pool of worker processes used by the operations of ParFactor. The workers
+    are started once, the first time they are needed or when start() or
+    warmUp() are called, and are reused by every operation until shutdown()
+    is called. Operations send their work to the workers instead of starting
+    new processes.
+
+    :param processes:  Number of worker processes. If None, the number of
+                       CPUs
+    :param min_size:   Operations whose result has fewer values than
+                       min_size are done in the calling process, since sending
+                       them to the workers would take longer than doing them
+    :param chunk_size: Target number of values of each task. The values of an
+                       operation are divided in chunks of at most chunk_size
+                       values, and in at least one chunk for each worker
+    :param context:    Start method of the workers, "fork", "spawn" or
+                       "forkserver". If None, the default of multiprocessing
+    :param initializer: Function executed by each worker when it starts, with
+                       the arguments of initargs. It may register operations
+                       that can't be pickled, see registerOperation
+    :param initargs:   Arguments of initializer
+
+    Examples:
+        >>> with ParPool(processes=4) as pool:
+        ...     XY_par = ParFactor(factor=XY_factor, pool=pool)
+        ...     res = XY_par * XZ_par
+
+    ParFactor objects without a pool use default_pool, which is shut down
+    when the program exits. Its workers may be started before the first
+    operation, so that the operation doesn't wait for them:
+
+        >>> default_pool.warmUp()
+
+    Functions are sent to the workers pickled, which doesn't work for lambdas
+    and nested functions. The operations of the registry of operations, like
+    the ones used by mult, div, add and sub, are sent by their name, so they
+    work with every start method:
+
+        >>> with ParPool(context="spawn") as pool:
+        ...     P_par = ParFactor(factor=P_factor, pool=pool)
+        ...     res = P_par.factorOp(Q_par, "kld_term")
+    """
+
+    def __init__(
+        self,
+        processes=None,
+        min_size=4096,
+        chunk_size=2 ** 16,
+        context=None,
+        initializer=None,
+        initargs=(),
+    ):
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.min_size = min_size
+        self.chunk_size = chunk_size
+        self.context = context
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pool = None
+        self.operations_version = None
+        self.worker_operations = set()
+
+    def start(self):
+        """
+        Starts the worker processes, if they are not running. If operations
+        were registered since the workers started, they are restarted, so they
+        have every operation
+        """
+
+        if self.operations_version != operations.operations_version:
+            self.shutdown()
+
+        if self.pool is None:
+            ctx = multiprocessing.get_context(self.context)
+            user_ops = userOperations()
+
+            # Without fork, the operations are pickled to reach the workers,
+            # and the ones that can't be pickled are left out
+            if ctx.get_start_method() != "fork":
+                user_ops = {i: j for i, j in user_ops.items() if picklable(j)}
+            missing = set(operations.user_operations) - set(user_ops)
+
+            # The workers share the resource tracker of this process, which
+            # removes the shared memory segments if this process dies
+            if resource_tracker is not None:
+                resource_tracker.ensure_running()
+
+            initargs = (user_ops, self.initializer, self.initargs)
+            self.pool = ctx.Pool(self.processes, initWorker, initargs)
+            self.operations_version = operations.operations_version
+
+            # Names of the operations the workers have. The initializer may
+            # register the ones that were left out, so the workers are asked
+            self.worker_operations = set(operations.operation_funs) - missing
+            if missing and self.initializer is not None:
+                self.worker_operations = set(self.pool.apply(workerOperations))
+
+    def warmUp(self):
+        """
+        Starts the worker processes and waits until every one of them has
+        done a task
+        """
+
+        self.start()
+        self.pool.map(warmUpTask, range(self.processes), chunksize=1)
+
+    def shutdown(self):
+        """
+        Stops the worker processes after they finish their work. The pool can
+        still be used, its workers are started again when needed
+        """
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def running(self):
+        """
+        Returns True if the worker processes are running
+        """
+
+        return self.pool is not None
+
+    def useWorkers(self, size, fun=None):
+        """
+        Checks if an operation should be sent to the workers
+
+        :param size: Number of values of the result of the operation
+        :param fun:  Function of the operation. It is sent to the workers by
+                     its name if it is registered and the workers have it,
+                     otherwise it must be picklable, which lambdas are not
+        :returns:    True if the operation should be sent to the workers
+        """
+
+        if size < self.min_size:
+            return False
+        if fun is None:
+            return True
+
+        fun = sendable(fun)
+        if type(fun) != str:
+            return picklable(fun)
+
+        return self.hasOperation(fun)
+
+    def hasOperation(self, name):
+        """
+        Checks if the workers have a registered operation. Without fork, the
+        operations that can't be pickled only reach the workers if the
+        initializer registers them. The workers are started if needed
+
+        :param name: Name of the operation
+        :returns:    True if the workers have the operation
+        """
+
+        self.start()
+        return name in self.worker_operations
+
+    def numChunks(self, size):
+        """
+        Number of chunks in which the values of an operation are divided, at
+        least one for each worker and enough for chunks of at most chunk_size
+        values, but never more than the number of values
+
+        :param size: Number of values
+        :returns:    Number of chunks
+        """
+
+        chunks = max(self.processes, -(-size // self.chunk_size))
+        return max(min(chunks, size), 1)
+
+    def starmap(self, fun, args):
+        """
+        Executes fun with each tuple of arguments of args in the workers
+
+        :param fun:  Module level function
+        :param args: List of tuples of arguments
+        :returns:    List with the results, in the order of args
+        """
+
+        self.start()
+        return self.pool.starmap(fun, args, chunksize=1)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def __getstate__(self):
+        # The worker processes belong to the process that started them
+        return {
+            "processes": self.processes,
+            "min_size": self.min_size,
+            "chunk_size": self.chunk_size,
+            "context": self.context,
+            "initializer": self.initializer,
+            "initargs": self.initargs,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def initWorker(user_ops, initializer, initargs):
+    """
+    Initializer of the workers of a ParPool. Registers the operations that
+    the user registered in the parent and executes the initializer of the
+    pool
+    """
+
+    setOperations(user_ops)
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def workerOperations():
+    """
+    Returns the names of the operations registered in a worker
+    """
+
+    return list(operations.operation_funs)
+
+
+def picklable(fun):
+    """
+    Returns True if fun can be pickled
+    """
+
+    try:
+        pickle.dumps(fun)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+
+    return True
+
+
+def sendable(fun):
+    """
+    Returns the name of fun if it is a registered operation, which is sent to
+    the workers instead of the function, otherwise fun
+    """
+
+    name = operationName(fun)
+    return fun if name is None else name
+
+
+# Pool used by the ParFactor objects that are not given one
+default_pool = ParPool()
+atexit.register(default_pool.shutdown)
+
+
+class SharedValues:
+    """
+    Values of a factor kept in a shared memory segment, as doubles or as 64
+    bit integers. The segment is made by the process that creates the object
+    and is removed when the object is closed or collected. Only the name of
+    the segment is pickled, so a worker that receives the object maps the
+    same segment, without copying the values.
+
+    :param size:     Number of values
+    :param name:     Name of an existing segment. If None, a new segment is
+                     made
+    :param typecode: Type of the values, "d" for doubles or "q" for integers,
+                     as in the array module
+
+    Examples:
+        >>> with SharedValues.fromValues([0.2, 0.8]) as shared:
+        ...     pool.starmap(task, [(shared, 0, 1), (shared, 1, 2)])
+        ...     shared.tolist()
+    """
+
+    def __init__(self, size, name=None, typecode="d"):
+        self.size = size
+        self.typecode = typecode
+
+        if name is None:
+            nbytes = max(size, 1) * array.array(typecode).itemsize
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.finalizer = weakref.finalize(self, closeShared, self.shm, name is None)
+
+    @classmethod
+    def fromValues(cls, values, typecode="d"):
+        """
+        Makes a segment with a copy of values
+
+        :param values:   List, array or ndarray of numbers
+        :param typecode: Type of the values in the segment, see SharedValues
+        :returns:        New SharedValues object
+        """
+
+        res = cls(len(values), typecode=typecode)
+        try:
+            res.write(0, values)
+        except (TypeError, OverflowError):
+            res.close()
+            raise
+
+        return res
+
+    def view(self):
+        """
+        Returns a memoryview of the values, which should be released before
+        the object is closed
+        """
+
+        return self.shm.buf.cast(self.typecode)[: self.size]
+
+    def write(self, begin, values):
+        """
+        Writes values in the segment, starting at index begin
+
+        :param begin:  Index of the first value written
+        :param values: Iterable with numbers
+        """
 
-from multiprocessing import Process, Queue
+        values = array.array(self.typecode, values)
+        with self.view() as view:
+            view[begin : begin + len(values)] = values
+
+    def writeExact(self, begin, values):
+        """
+        Writes values in the segment, like write, if they can be kept exactly
+        with the typecode of the segment
+
+        :param begin:  Index of the first value written
+        :param values: Iterable with numbers
+        :returns:      True if the values were written
+        """
+
+        if type(values) != list:
+            values = list(values)
+        if not exactValues(values, self.typecode):
+            return False
+
+        try:
+            self.write(begin, values)
+        except OverflowError:
+            return False
+
+        return True
+
+    def tolist(self):
+        """
+        Returns a list with the values
+        """
+
+        with self.view() as view:
+            return view.tolist()
+
+    def close(self):
+        """
+        Unmaps the segment, and removes it if this object made it
+        """
+
+        self.finalizer()
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        return {"size": self.size, "name": self.shm.name, "typecode": self.typecode}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def closeShared(shm, unlink):
+    """
+    Closes a shared memory segment and, if unlink, removes it
+    """
+
+    shm.close()
+    if unlink:
+        shm.unlink()
+
+
+def valueTypecode(value):
+    """
+    Returns the typecode of a segment for values of the type of value, "q"
+    for integers, "d" for floats, or None for other types
+    """
+
+    if type(value) == int:
+        return "q"
+    elif type(value) == float:
+        return "d"
+
+    return None
+
+
+def valuesTypecode(values):
+    """
+    Returns the typecode of a segment that keeps values exactly, "q" if they
+    are integers, "d" if they are floats or floats and integers of at most 53
+    bits, or None if they can't be kept exactly
+    """
+
+    if isinstance(values, array.array):
+        return "d" if values.typecode in "df" else None
+
+    types = set(map(type, values))
+    if types == {int}:
+        return "q"
+    elif exactValues(values, "d"):
+        return "d"
+
+    return None
+
+
+def shareExact(values):
+    """
+    Makes a SharedValues object with a copy of values, with the typecode that
+    keeps them exactly, see valuesTypecode
+
+    :param values: List or array of numbers
+    :returns:      New SharedValues object
+    :raises:       TypeError if the values can't be kept exactly
+    """
+
+    typecode = valuesTypecode(values)
+    if typecode is None:
+        raise TypeError("values of different types")
+
+    return SharedValues.fromValues(values, typecode)
+
+
+def exactValues(values, typecode):
+    """
+    Returns True if values are kept exactly in a segment with typecode. Only
+    integers are kept with "q", and floats and integers of at most 53 bits
+    with "d"
+    """
+
+    # The types are found first, so only mixed values are checked one by one
+    types = set(map(type, values))
+    if typecode == "q":
+        return types <= {int}
+    elif types <= {float}:
+        return True
+    elif not types <= {float, int}:
+        return False
+
+    return all(type(i) == float or abs(i) <= 2 ** 53 for i in values)
 
 
 class ParFactor(Factor):
@@ -20,8 +501,10 @@ class ParFactor(Factor):
     :param rand_vars: List of Random Variables of this factor, or single
                       variable
     :param values:    Values of the factor
-    :param max_depth: Maximum recursion depth to which the algorithms can keep
-                      creating processes
+    :param max_depth: Kept for compatibility, the work of an operation is
+                      divided in chunks by the pool, see ParPool
+    :param pool:      ParPool with the worker processes. If None, default_pool
+                      is used
 
     Examples:
         >>> # Assuming X and Y are variables
@@ -34,41 +517,245 @@ class ParFactor(Factor):
         >>> XY_factor = ParFactor([X, Y], [0.2, 0.3, 0.1, 0.4])
 
     The new factor will execute in parallel.
+
+    The values of the result of an operation are divided in chunks of about
+    the same size, which are calculated by the workers of the pool. The
+    results are ParFactor objects with the same pool and max_depth as self,
+    so the operations on them execute in parallel as well. Operations with
+    small results, with functions that can't be pickled, like lambdas, or on
+    NumPy values, are done in the calling process, like in Factor. Before
+    Python 3.8 there is no shared memory, and every operation is done in the
+    calling process.
+
+    The workers get the values of the factors from SharedValues segments,
+    and write the values of the result in another segment, so no values are
+    pickled. Integers are kept as 64 bit integers and floats as doubles, and
+    the values of a result have the type of its first value. Operations with
+    values that can't be kept exactly that way, like integers of more than
+    64 bits, are done in the calling process. In values that mix floats and
+    integers, the integers become floats.
+
+    Each factor keeps its values in its own segment, which is made the first
+    time the workers need them, or is the result segment of the operation
+    that made the factor, so the values are not copied again by every
+    operation. The in place operations drop the segment. Values changed
+    directly, without the in place operations, should be given to the factor
+    as a new list, or the factor should be copied.
     """
 
-    def __init__(self, rand_vars=None, values=None, factor=None, max_depth=0):
+    __slots__ = ("max_depth", "pool", "shared")
+
+    def __init__(
+        self, rand_vars=None, values=None, factor=None, max_depth=0, pool=None
+    ):
         if factor is not None:
             super().__init__(factor.rand_vars[:], factor.values[:])
         else:
             super().__init__(rand_vars, values)
 
         self.max_depth = max_depth
+        self.pool = pool
+        self.shared = None
+
+    @classmethod
+    def fromTrusted(cls, rand_vars, values, max_depth=0, pool=None):
+        """
+        Makes a factor from variables and values that are known to be valid,
+        see Factor.fromTrusted
+        """
+
+        res = super().fromTrusted(rand_vars, values)
+        res.max_depth = max_depth
+        res.pool = pool
+        res.shared = None
+        return res
+
+    def newFactor(self, rand_vars, values):
+        return ParFactor.fromTrusted(
+            rand_vars, self.keepStorage(values), self.max_depth, self.pool
+        )
+
+    def newSharedFactor(self, rand_vars, shared):
+        """
+        Only used internally. Makes a factor with the values of the result
+        segment of an operation, which becomes the segment of the factor
+
+        :param rand_vars: Variables of the resulting factor
+        :param shared:    SharedValues object with the values of the result
+        :returns:         New factor
+        """
+
+        res = self.newFactor(rand_vars, shared.tolist())
+
+        # Values converted to float32 are not the values of the segment
+        if res.getStorage() in ["list", "array"]:
+            res.shared = (res.values, shared)
+        else:
+            shared.close()
+
+        return res
 
     def setMaxDepth(self, new_max_depth):
         """
-        Maximum recursion depth to which the algorithms can keep creating
-        processes
+        Kept for compatibility, the work of an operation is divided in chunks
+        by the pool, see ParPool
 
         :param new_max_depth: new maximum depth
         """
 
         self.max_depth = new_max_depth
 
+    def setPool(self, new_pool):
+        """
+        Pool of worker processes used by the operations of this factor
+
+        :param new_pool: ParPool object, or None to use default_pool
+        """
+
+        self.pool = new_pool
+
+    def getPool(self):
+        """
+        Returns the pool used by the operations of this factor
+        """
+
+        return default_pool if self.pool is None else self.pool
+
+    def useWorkers(self, size, fun=None):
+        """
+        Checks if an operation should be sent to the workers of the pool, see
+        ParPool.useWorkers. Operations on NumPy values are done by NumPy
+
+        :param size: Number of values of the result of the operation
+        :param fun:  Function of the operation, or None
+        :returns:    True if the operation should be sent to the workers
+        """
+
+        if self.getStorage() == "numpy" or shared_memory is None:
+            return False
+
+        return self.getPool().useWorkers(size, fun)
+
+    def sharedValues(self):
+        """
+        Only used internally. Returns the SharedValues object with the values
+        of this factor, which is made the first time it is needed and kept
+        until the values are replaced or written in place
+
+        :returns: SharedValues object, or None if the values can't be kept
+                  exactly
+        """
+
+        # The segment is dropped if the values were replaced
+        if self.shared is not None and self.shared[0] is self.values:
+            return self.shared[1]
+
+        try:
+            shared = shareExact(self.values)
+        except (TypeError, OverflowError):
+            shared = None
+
+        self.shared = (self.values, shared)
+        return shared
+
+    def shareValues(self, values_list):
+        """
+        Only used internally. Gets a SharedValues object for each factor of
+        values_list, and makes an empty one for each pair with a size and a
+        typecode. A ParFactor keeps its values in its own segment, see
+        sharedValues, and the values of other factors are copied to a new
+        segment. A typecode of None is the typecode of the first segment
+
+        :param values_list: List with factors and pairs
+        :returns:           Pair with the list of SharedValues objects and the
+                            list of the ones that were made, which the caller
+                            closes, or None if some values can't be kept
+                            exactly or if there is no shared memory
+        """
+
+        if shared_memory is None:
+            return None
+
+        res = []
+        made = []
+        try:
+            for i in values_list:
+                if type(i) == tuple:
+                    size, typecode = i
+                    typecode = typecode or res[0].typecode
+                    made.append(SharedValues(size, typecode=typecode))
+                    res.append(made[-1])
+                elif isinstance(i, ParFactor):
+                    res.append(i.sharedValues())
+                    if res[-1] is None:
+                        raise TypeError("values of different types")
+                else:
+                    made.append(shareExact(i.values))
+                    res.append(made[-1])
+        except (TypeError, OverflowError):
+            for i in made:
+                i.close()
+            return None
+
+        return res, made
+
+    def runChunks(self, task, values_list, size, args):
+        """
+        Only used internally. Divides range(size) in chunks and executes task
+        for each chunk in the workers, with the arguments:
+            task(shared, *args, begin, end)
+
+        :param task:        Module level function
+        :param values_list: Factors whose values are used by the tasks and,
+                            last, the size and typecode of the result segment,
+                            see shareValues
+        :param size:        Number of values divided in chunks
+        :param args:        Tuple with the other arguments of task
+        :returns:           Pair with the results of the tasks and the result
+                            segment, which the caller keeps or closes, or None
+                            if the values can't be shared or if a task
+                            returned False, because the values it calculated
+                            can't be kept exactly
+        """
+
+        pool = self.getPool()
+
+        shared = self.shareValues(values_list)
+        if shared is None:
+            return None
+
+        shared, made = shared
+        try:
+            tasks = []
+            for begin, end in splitRange(size, pool.numChunks(size)):
+                tasks.append((shared,) + args + (begin, end))
+
+            res = pool.starmap(task, tasks)
+            if any(i is False for i in res):
+                return None
+
+            return res, made.pop()
+        finally:
+            for i in made:
+                i.close()
+
     """
     Factor Op Stuff
     """
 
     def factorOp(self, factor, fun):
         """
-        Same as factorOp() in Factor class, but implemented using Python's
-        multiprocessing library
+        Same as factorOp() in Factor class, but the values of the result are
+        divided in chunks, which are calculated by the workers of the pool
 
         :param factor: The other factor used for this operation
-        :param fun:    Operation used between each element of the values
+        :param fun:    Operation used between each element of the values, or
+                       the name of a registered operation
         :returns:      Result of operation between self and factor using fun
         """
 
-        res_rand_vars = []
+        fun = resolveOperation(fun)
+        self.checkSpace(factor)
 
         # If this is just scalar operation
         if type(factor) == int or type(factor) == float:
@@ -76,181 +763,155 @@ class ParFactor(Factor):
         elif factor.rand_vars == []:
             return self.scalar(factor.values[0], fun)
 
-        # Res will have every variable in self
-        for i in self.rand_vars:
-            res_rand_vars.append(i)
+        # Res will have every variable in self and the variables in factor
+        # that are not in self
+        layout = factor_op_layouts.get(self.rand_vars, factor.rand_vars)
+        res_rand_vars = layout.resRandVars(self.rand_vars, factor.rand_vars)
+        res_values_size = layout.res_size
 
-        # And the variables in factor that are not in self
-        for i in factor.rand_vars:
-            var_in_self = True
-            for j in self.rand_vars:
-                if i.name == j.name:
-                    var_in_self = False
-                    break
+        # Small operations are faster without the workers
+        if not self.useWorkers(res_values_size, fun) or factor.isSparse():
+            return Factor.factorOp(self, factor, fun)
 
-            if var_in_self:
-                res_rand_vars.append(i)
+        # The type of the values of the result is the type of the first one
+        typecode = valueTypecode(fun(self.values[0], factor.values[0]))
+        if typecode is None:
+            return Factor.factorOp(self, factor, fun)
 
-        # Calculate mult and div list
-        mult, div, dim = self.getAuxLists(factor.rand_vars, res_rand_vars)
+        # The tasks read the segments of both factors and write the values of
+        # the result in a shared result segment, which the result keeps
+        args = (layout.kind, layout.res_dims, layout.gather_strides, sendable(fun))
+        values_list = [self, factor, (res_values_size, typecode)]
+        res = self.runChunks(factorOpTask, values_list, res_values_size, args)
+        if res is None:
+            return Factor.factorOp(self, factor, fun)
 
-        # Get res div
-        res_div = []
-        c_res_div = 1
-        for i in res_rand_vars:
-            res_div.append(c_res_div)
-            c_res_div *= len(i.domain)
+        return self.newSharedFactor(res_rand_vars, res[1])
 
-        # Calculate resulting size of factor
-        res_values_size = self.getValuesListSize(res_rand_vars)
+    def scalar(self, scalar_value, fun):
+        """
+        Same as scalar() in Factor class, but the function is mapped in
+        parallel, if it can be pickled
+        """
 
-        # Calculate resulting factor
-        res_values = self.calcResFactor(
-            mult,
-            div,
-            dim,
-            res_div,
-            factor.rand_vars,
-            factor.values,
-            res_rand_vars,
-            res_values_size,
-            fun,
-            indexes=(0, 0, res_values_size),
-        )
-        return ParFactor(rand_vars=res_rand_vars, values=res_values)
+        fun = resolveOperation(fun)
+        if not self.useWorkers(len(self.values), fun):
+            return Factor.scalar(self, scalar_value, fun)
 
-    def getAuxLists(self, factor_rand_vars, res_rand_vars):
+        fun = functools.partial(scalarOp, fun=sendable(fun), scalar_value=scalar_value)
+        return self.map(fun)
+
+    def writeValues(self, values):
         """
-        Only used internally with factorOp.
+        Same as writeValues() in Factor class, and drops the segment of the
+        values
         """
 
-        # Calculate mult list
-        mult = []
-        c_mult = 1
+        self.shared = None
+        return Factor.writeValues(self, values)
 
-        for i in factor_rand_vars:
-            mult.append(c_mult)
-            c_mult *= len(i.domain)
+    def assign(self, factor):
+        """
+        Same as assign() in Factor class, and drops the segment of the values
+        """
+
+        self.shared = None
+        return Factor.assign(self, factor)
 
-        # Calculate div list
-        div = []
+    def factorOpInPlace(self, factor, fun):
+        """
+        Same as factorOpInPlace() in Factor class, but the result is
+        calculated in parallel and then written in the values of self
+        """
 
-        for i in factor_rand_vars:
-            c_div = 1
+        if not self.useWorkers(len(self.values), fun):
+            return Factor.factorOpInPlace(self, factor, fun)
 
-            for j in res_rand_vars:
-                if i.name == j.name:
-                    break
+        res = self.factorOp(factor, fun)
+        if res.var_ids != self.var_ids:
+            return self.assign(res)
 
-                c_div *= len(j.domain)
+        return self.writeValues(res.values)
 
-            div.append(c_div)
+    def euclideanDist(self, factor):
+        """
+        Same as euclideanDist() in Factor class, but the squared differences
+        and their sum are calculated in parallel
+        """
 
-        # Calculate dim list
-        dim = []
+        if not self.sameVariables(factor):
+            return None
 
-        for i in factor_rand_vars:
-            dim.append(len(i.domain))
+        diff = self.factorOp(factor, sqDiff)
+        return math.sqrt(diff.sumValues())
 
-        return mult, div, dim
+    """
+    Map Stuff
+    """
 
-    def calcResFactor(
-        self,
-        mult,
-        div,
-        dim,
-        res_div,
-        factor_rand_vars,
-        factor_values,
-        res_rand_vars,
-        res_values_size,
-        fun,
-        arg_queue=None,
-        indexes=(0, 0, -1),
-        depth=0,
-    ):
+    def map(self, fun):
         """
-        Only used internally with factorOp.
-        """
-
-        if depth <= self.max_depth and (depth + 1) <= len(div):
-            top_var = res_rand_vars[-(depth + 1)]
-            top_var_div = res_div[-(depth + 1)]
-
-            # Generate a process for each value of the top variable
-            queue = Queue()
-            procs = []
-            for i, _ in enumerate(top_var.domain):
-                work_begin = i * top_var_div + indexes[1]
-                work_end = work_begin + top_var_div
-
-                p = Process(
-                    target=ParFactor.calcResFactor,
-                    args=(
-                        self,
-                        mult,
-                        div,
-                        dim,
-                        res_div,
-                        factor_rand_vars,
-                        factor_values,
-                        res_rand_vars,
-                        res_values_size,
-                        fun,
-                        queue,
-                        (i, work_begin, work_end),
-                        depth + 1,
-                    ),
-                )
-                p.start()
-                procs.append(p)
-
-            # Get results from processes
-            ret_res_values = [0] * (indexes[2] - indexes[1])
-            for i, _ in enumerate(top_var.domain):
-                sub_res = queue.get()
-
-                res_index = sub_res[0]
-                res_list = sub_res[1]
-
-                # Place sub list resulting from parallel processing into values
-                # to return
-                ret_res_values = (
-                    ret_res_values[: res_index * top_var_div]
-                    + res_list
-                    + ret_res_values[res_index * top_var_div + top_var_div :]
-                )
-
-            # If this is the top process, return results, if not, put results
-            # in queue
-            if depth > 0:
-                arg_queue.put((indexes[0], ret_res_values))
-            else:
-                return ret_res_values
+        Same as map() in Factor class, but the values are divided in chunks,
+        which are mapped by the workers of the pool
 
-        else:
-            res_values = []
-            len_values = len(self.values)
+        :param fun: Function used in the mapping, or the name of a registered
+                    operation
+        :returns:   Result of applying fun to the factors values
+        """
+
+        fun = resolveOperation(fun)
 
-            final_index = indexes[0]
-            work_begin = indexes[1]
-            work_end = indexes[2] if indexes[2] != -1 else len(factor_values)
+        size = len(self.values)
+        if not self.useWorkers(size, fun):
+            return Factor.map(self, fun)
 
-            index1 = 0
-            for i in range(work_begin, work_end):
-                # Get index 1
-                index1 = i % len_values
+        # The type of the values of the result is the type of the first one
+        typecode = valueTypecode(fun(self.values[0]))
+        if typecode is not None:
+            values_list = [self, (size, typecode)]
+            res = self.runChunks(mapTask, values_list, size, (sendable(fun),))
+            if res is not None:
+                return self.newSharedFactor(self.rand_vars, res[1])
 
-                # Get index 2
-                index2 = 0
-                for j, _ in enumerate(factor_rand_vars):
-                    index2 += (int(i / div[j]) % dim[j]) * mult[j]
+        return Factor.map(self, fun)
+
+    def mapInPlace(self, fun):
+        """
+        Same as mapInPlace() in Factor class, but the values are mapped in
+        parallel and then written in the values of self
+        """
 
-                # Calculate value
-                res_values.append(fun(self.values[index1], factor_values[index2]))
+        if not self.useWorkers(len(self.values), fun):
+            return Factor.mapInPlace(self, fun)
 
-            # Put result in queue
-            arg_queue.put((final_index, res_values))
+        return self.writeValues(self.map(fun).values)
+
+    def log(self, base):
+        """
+        Same as log() in Factor class, mapped in parallel
+        """
+
+        if self.getStorage() == "numpy":
+            return Factor.log(self, base)
+
+        return self.map(functools.partial(logValue, base=base))
+
+    def pow(self, p):
+        """
+        Same as pow() in Factor class, mapped in parallel
+        """
+
+        return self.map(functools.partial(powValue, p=p))
+
+    def exp(self, base=None):
+        """
+        Same as exp() in Factor class, mapped in parallel
+        """
+
+        if self.getStorage() == "numpy":
+            return Factor.exp(self, base)
+
+        return self.map(functools.partial(expValue, base=base))
 
     """
     Marginal Stuff
@@ -258,16 +919,14 @@ class ParFactor(Factor):
 
     def marginal(self, arg_rand_vars):
         """
-        Same as marginal() in Factor class, but implemented using Python's
-        multiprocessing library
+        Same as marginal() in Factor class, but the values of the result are
+        divided in chunks, which are summed by the workers of the pool
 
         :param arg_rand_vars: List of random variables that will make up the
                               returning factor
         :returns:             Marginal factor
         """
 
-        res_rand_vars = []
-
         # If the argument is a single variable
         if type(arg_rand_vars) != list:
             rand_vars = [arg_rand_vars]
@@ -275,114 +934,576 @@ class ParFactor(Factor):
             rand_vars = arg_rand_vars
 
         # Get resulting variables
-        for i in self.rand_vars:
-            var_in_self = False
+        ids = {i.id for i in rand_vars}
+        res_rand_vars = [i for i in self.rand_vars if i.id in ids]
 
-            for j in rand_vars:
-                if i.name == j.name:
-                    var_in_self = True
-                    break
-
-            if var_in_self:
-                res_rand_vars.append(i)
+        # Small operations are faster without the workers
+        if not self.useWorkers(len(self.values)):
+            return Factor.marginal(self, res_rand_vars)
 
         # Calculate resulting size of factor
         res_values_size = self.getValuesListSize(res_rand_vars)
 
         res_values = self.marginalPar(res_values_size, res_rand_vars)
+        if res_values is None:
+            return Factor.marginal(self, res_rand_vars)
 
         # Make Factor object and return
-        return ParFactor(rand_vars=res_rand_vars, values=res_values)
+        return self.newFactor(res_rand_vars, res_values)
 
-    def marginalPar(
-        self,
-        res_values_size,
-        res_rand_vars,
-        arg_queue=None,
-        indexes=(0, 0, -1),
-        depth=0,
-    ):
+    def marginalPar(self, res_values_size, res_rand_vars):
         """
-        Only used internally for marginal.
+        Only used internally for marginal. The values of the result are
+        divided in chunks, each summed by a task. If the result has fewer
+        values than the number of chunks, the values summed for each value of
+        the result are divided as well, and each task writes its partial sums
+        in a row of the sums, which are then added
         """
 
-        if depth <= 1:
-            # Divide the work through processes
-            queue = Queue()
+        pool = self.getPool()
+
+        # The values of the factor summed for a value of the result are the
+        # value with the index of the result in the variables of the result,
+        # with the variables not in the result at 0, plus the indexes of the
+        # variables not in the result
+        ids = {i.id for i in res_rand_vars}
+        strides = layoutStrides(self.rand_vars)
+        sum_rand_vars = [i for i in self.rand_vars if i.id not in ids]
+        kind = marginalKind(self.var_ids, [i.id for i in res_rand_vars])
+
+        res_dims = [len(i.domain) for i in res_rand_vars]
+        res_strides = [strides[i.id] for i in res_rand_vars]
+        sum_dims = [len(i.domain) for i in sum_rand_vars]
+        sum_strides = [strides[i.id] for i in sum_rand_vars]
+        sum_size = self.getValuesListSize(sum_rand_vars)
+
+        chunks = pool.numChunks(len(self.values))
+        res_chunks = min(chunks, res_values_size)
+        sum_chunks = min(-(-chunks // res_chunks), sum_size)
+
+        values_list = [self, (res_values_size * sum_chunks, None)]
+        shared = self.shareValues(values_list)
+        if shared is None:
+            return None
+
+        shared, made = shared
+        with made[0]:
+            tasks = []
+            for i, sum_range in enumerate(splitRange(sum_size, sum_chunks)):
+                for res_range in splitRange(res_values_size, res_chunks):
+                    args = (shared, kind, res_dims, res_strides, res_range)
+                    args += (sum_dims, sum_strides, sum_range)
+                    tasks.append(args + (i * res_values_size,))
+
+            # Sums of integers that don't fit in 64 bits are not written
+            if not all(pool.starmap(marginalTask, tasks)):
+                return None
+
+            sums = shared[1].tolist()
+
+        # Add the rows of the sums
+        res_values = sums[:res_values_size]
+        for i in range(1, sum_chunks):
+            row = sums[i * res_values_size : (i + 1) * res_values_size]
+            res_values = list(map(operator.add, res_values, row))
+
+        return res_values
+
+    def multMarginal(self, factor, arg_rand_vars):
+        """
+        Same as multMarginal() in Factor class, but the product is made and
+        marginalized in parallel. Unlike in Factor, the full product is made
+        """
 
-            if indexes[2] == -1:
-                len_values = len(self.values)
-            else:
-                len_values = indexes[2] - indexes[1]
-
-            begin_work = indexes[1]
-            mid_index = indexes[1] + len_values // 2
-            end_index = indexes[2] if indexes[2] != -1 else len_values
-
-            p1 = Process(
-                target=ParFactor.marginalPar,
-                args=(
-                    self,
-                    res_values_size,
-                    res_rand_vars,
-                    queue,
-                    (0, begin_work, mid_index),
-                    depth + 1,
-                ),
-            )
+        if type(factor) == int or type(factor) == float or factor.isSparse():
+            return Factor.multMarginal(self, factor, arg_rand_vars)
 
-            p2 = Process(
-                target=ParFactor.marginalPar,
-                args=(
-                    self,
-                    res_values_size,
-                    res_rand_vars,
-                    queue,
-                    (1, mid_index, end_index),
-                    depth + 1,
-                ),
-            )
+        layout = factor_op_layouts.get(self.rand_vars, factor.rand_vars)
+        if not self.useWorkers(layout.res_size):
+            return Factor.multMarginal(self, factor, arg_rand_vars)
 
-            p1.start()
-            p2.start()
+        return self.mult(factor).marginal(arg_rand_vars)
 
-            # Get results from processes
-            res1 = queue.get()
-            res2 = queue.get()
+    def sumValues(self):
+        """
+        Returns the sum of the values of the factor, calculated in parallel
+        """
 
-            final_res = []
-            for i, _ in enumerate(res1[1]):
-                final_res.append(res1[1][i] + res2[1][i])
+        return self.marginal([]).values[0]
 
-            if depth > 0:
-                arg_queue.put((indexes[0], final_res))
+    def expectedValue(self, fun):
+        """
+        Same as expectedValue() in Factor class, but the product and its sum
+        are calculated in parallel
+        """
+
+        # Check if self and the function factor have the same variables
+        if not self.sameVariables(fun):
+            return None
+
+        return self.mult(fun).sumValues()
+
+    """
+    Gather Stuff
+    """
+
+    def gatherValues(self, rand_vars, strides, offset):
+        """
+        Only used internally. Makes a factor with the variables rand_vars and
+        the values of self at offset plus the strided indexes of the
+        variables, gathered by the workers of the pool
+
+        :param rand_vars: Variables of the result
+        :param strides:   Stride of each variable in the values of self
+        :param offset:    Index in the values of self of the first value
+        :returns:         New factor, or None if the values can't be shared
+        """
+
+        dims = [len(i.domain) for i in rand_vars]
+        size = self.getValuesListSize(rand_vars)
+
+        args = (gatherStep(dims, strides), dims, strides, offset)
+        res = self.runChunks(gatherTask, [self, (size, None)], size, args)
+        if res is None:
+            return None
+
+        return self.newSharedFactor(rand_vars, res[1])
+
+    def instVarMany(self, pairs):
+        """
+        Same as instVarMany() in Factor class, but the values of the result
+        are gathered in parallel
+        """
+
+        insts = self.instIndexes(pairs)
+        if not insts:
+            return Factor.instVarMany(self, pairs)
+
+        # Offset of the instantiated values, and stride of each variable left
+        offset = 0
+        strides = layoutStrides(self.rand_vars)
+        res_rand_vars = []
+        for i, rand_var in enumerate(self.rand_vars):
+            if i in insts:
+                offset += insts[i] * strides[rand_var.id]
             else:
-                return final_res
+                res_rand_vars.append(rand_var)
+
+        if self.useWorkers(self.getValuesListSize(res_rand_vars)):
+            res_strides = [strides[i.id] for i in res_rand_vars]
+            res = self.gatherValues(res_rand_vars, res_strides, offset)
+            if res is not None:
+                return res
+
+        return Factor.instVarMany(self, pairs)
+
+    def reorder(self, rand_vars):
+        """
+        Same as reorder() in Factor class, but the values of the result are
+        gathered in parallel
+        """
+
+        ids = tuple(i.id for i in rand_vars)
+        if ids == self.var_ids or not self.useWorkers(len(self.values)):
+            return Factor.reorder(self, rand_vars)
+
+        if len(ids) != len(self.var_ids) or set(ids) != set(self.var_ids):
+            raise FactorRandVarsEx(rand_vars)
+
+        strides = layoutStrides(self.rand_vars)
+        res = self.gatherValues(rand_vars, [strides[i] for i in ids], 0)
+        if res is None:
+            return Factor.reorder(self, rand_vars)
+
+        return res
+
+    """
+    Max and Min Stuff
+    """
+
+    def reduceIndex(self, fun, better):
+        """
+        Only used internally. Finds the index of the first value of self
+        chosen by fun, max or min, with each chunk of the values searched by
+        a worker of the pool
+
+        :param fun:    Builtin max or min
+        :param better: Comparison true if its first argument is chosen over
+                       the second, operator.gt or operator.lt
+        :returns:      Index of the value, or None if the values are not
+                       searched in parallel
+        """
+
+        size = len(self.values)
+        if not self.useWorkers(size):
+            return None
+
+        values_list = [self, (0, None)]
+        res = self.runChunks(reduceTask, values_list, size, (fun,))
+        if res is None:
+            return None
+
+        res[1].close()
+
+        best_value, best_index = res[0][0]
+        for value, index in res[0][1:]:
+            if better(value, best_value):
+                best_value, best_index = value, index
+
+        return best_index
+
+    def max(self):
+        """
+        Same as max() in Factor class, searched in parallel
+        """
+
+        index = self.reduceIndex(max, operator.gt)
+        if index is None:
+            return Factor.max(self)
+
+        return self.values[index]
+
+    def min(self):
+        """
+        Same as min() in Factor class, searched in parallel
+        """
+
+        index = self.reduceIndex(min, operator.lt)
+        if index is None:
+            return Factor.min(self)
+
+        return self.values[index]
+
+    def argmax(self):
+        """
+        Same as argmax() in Factor class, searched in parallel
+        """
+
+        index = self.reduceIndex(max, operator.gt)
+        if index is None:
+            return Factor.argmax(self)
+
+        return self.indexEvent(index)
+
+    def argmin(self):
+        """
+        Same as argmin() in Factor class, searched in parallel
+        """
+
+        index = self.reduceIndex(min, operator.lt)
+        if index is None:
+            return Factor.argmin(self)
 
+        return self.indexEvent(index)
+
+    def __getstate__(self):
+        # The segment of the values belongs to this object
+        state = Factor.__getstate__(self)
+        state["shared"] = None
+        return state
+
+
+def marginalKind(ids, res_ids):
+    """
+    Classifies a marginal, like the kind of a FactorOpLayout, so the common
+    cases don't need the strided indexes of the values:
+        "same":    Nothing is summed
+        "prefix":  The variables of the result are the first variables, so
+                   each value of the result sums values at a regular step
+        "suffix":  The variables of the result are the last variables, so
+                   each value of the result sums a contiguous slice
+        "general": Any other case
+
+    :param ids:     Ids of the variables of the factor
+    :param res_ids: Ids of the variables of the result, in the same order
+    :returns:       "same", "prefix", "suffix" or "general"
+    """
+
+    ids = list(ids)
+    if res_ids == ids:
+        return "same"
+    elif res_ids == ids[: len(res_ids)]:
+        return "prefix"
+    elif res_ids == ids[len(ids) - len(res_ids) :]:
+        return "suffix"
+
+    return "general"
+
+
+def gatherStep(dims, strides):
+    """
+    Returns the step of a gather whose indexes are a regular progression,
+    which happens when each stride is the previous one times its dimension,
+    or None for other gathers
+
+    :param dims:    Size of each dimension of the result
+    :param strides: Stride of each dimension in the values
+    :returns:       Step between the gathered indexes, or None
+    """
+
+    step = strides[0] if strides else 1
+    expected = step
+    for dim, stride in zip(dims, strides):
+        if stride != expected:
+            return None
+        expected *= dim
+
+    return step
+
+
+def cycleSlice(values, begin, end):
+    """
+    Values from begin to end of the values repeated, found without going
+    through the values before begin
+
+    :param values: Memoryview of values
+    :returns:      Slice of values, or iterable with the values
+    """
+
+    start = begin % len(values)
+    if start + end - begin <= len(values):
+        return values[start : start + end - begin]
+
+    values = itertools.chain(values[start:], itertools.cycle(values))
+    return itertools.islice(values, end - begin)
+
+
+def splitRange(size, parts):
+    """
+    Divides range(size) in consecutive ranges with about the same size
+
+    :param size:  Size of the range
+    :param parts: Number of ranges
+    :returns:     List of pairs with the begin and end of each range
+
+    Examples:
+        >>> splitRange(10, 3)
+        [(0, 3), (3, 6), (6, 10)]
+    """
+
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def warmUpTask(i):
+    """
+    Task that does nothing, used to wait for the workers of a pool
+    """
+
+    return i
+
+
+def factorOpTask(shared, kind, dims, strides, fun, begin, end):
+    """
+    Task of ParFactor.factorOp, calculates the values of the result from
+    begin to end and writes them in the result segment
+
+    :param shared: SharedValues of the values of both factors and of the
+                   result, where the values are written
+    :param kind:   Kind of the FactorOpLayout of the operation
+    :param fun:    Function of the operation, or its name
+    :returns:      False if the values can't be kept exactly in the result
+    """
+
+    shared1, shared2, res_shared = shared
+    fun = resolveOperation(fun)
+
+    with shared1.view() as values1, shared2.view() as values2:
+        res_values = factorOpValues(
+            values1, values2, kind, dims, strides, fun, begin, end
+        )
+
+    written = res_shared.writeExact(begin, res_values)
+
+    for i in shared:
+        i.close()
+
+    return written
+
+
+def factorOpValues(values1, values2, kind, dims, strides, fun, begin, end):
+    """
+    Values of the result of factorOpTask from begin to end. The values are
+    combined like in Factor.combineValues. Otherwise the index in the first
+    values is the index in the result modulo their size, and the indexes in
+    the second values are the strided indexes of dims
+
+    :returns: List with the values
+    """
+
+    if kind == "same":
+        res_values = map(fun, values1[begin:end], values2[begin:end])
+    elif kind == "prefix":
+        res_values = map(fun, values1[begin:end], cycleSlice(values2, begin, end))
+    elif kind == "extend":
+        res_values = map(fun, cycleSlice(values1, begin, end), values2[begin:end])
+    else:
+        gather = stridedSlice(dims, strides, begin, end)
+        values2 = map(values2.__getitem__, gather)
+        res_values = map(fun, cycleSlice(values1, begin, end), values2)
+
+    # The slices of the views are released when this function returns
+    return list(res_values)
+
+
+def marginalTask(
+    shared,
+    kind,
+    res_dims,
+    res_strides,
+    res_range,
+    sum_dims,
+    sum_strides,
+    sum_range,
+    row,
+):
+    """
+    Task of ParFactor.marginal, sums the values of the factor for the values
+    of the result in res_range, using the indexes of the summed variables in
+    sum_range, and writes the sums in the sums segment, starting at row
+
+    :param shared: SharedValues of the values of the factor and of the sums
+    :param kind:   Kind of the marginal, see marginalKind
+    :returns:      False if the sums can't be kept exactly
+    """
+
+    values, sums = shared
+
+    with values.view() as view:
+        if kind == "same":
+            res_values = view[res_range[0] : res_range[1]].tolist()
+        elif kind == "prefix":
+            # Value i of the result sums the values at i plus a multiple of
+            # the size of the result
+            step = math.prod(res_dims)
+            begin, end = sum_range[0] * step, sum_range[1] * step
+            res_values = [sum(view[begin + i : end : step]) for i in range(*res_range)]
+        elif kind == "suffix":
+            # Value i of the result sums a slice of size of the summed values
+            step = math.prod(sum_dims)
+            begin, end = sum_range
+            res_values = [
+                sum(view[i * step + begin : i * step + end]) for i in range(*res_range)
+            ]
+        else:
+            bases = stridedSlice(res_dims, res_strides, *res_range)
+            offsets = stridedSlice(sum_dims, sum_strides, *sum_range)
+            res_values = [
+                sum(map(view.__getitem__, map(i.__add__, offsets))) for i in bases
+            ]
+
+    written = sums.writeExact(row + res_range[0], res_values)
+
+    for i in shared:
+        i.close()
+
+    return written
+
+
+def mapTask(shared, fun, begin, end):
+    """
+    Task of ParFactor.map, applies fun to the values from begin to end and
+    writes the results in the result segment
+
+    :param shared: SharedValues of the values of the factor and of the result
+    :param fun:    Function used in the mapping, or its name
+    :returns:      False if the values can't be kept exactly in the result
+    """
+
+    values, res_shared = shared
+    fun = resolveOperation(fun)
+
+    with values.view() as view:
+        part = view[begin:end]
+        written = res_shared.writeExact(begin, map(fun, part))
+        part.release()
+
+    for i in shared:
+        i.close()
+
+    return written
+
+
+def gatherTask(shared, step, dims, strides, offset, begin, end):
+    """
+    Task of ParFactor.gatherValues, writes the values of the result from
+    begin to end, which are the values of the factor at offset plus the
+    strided indexes of dims
+
+    :param shared: SharedValues of the values of the factor and of the result
+    :param step:   Step between the indexes if they are a regular
+                   progression, see gatherStep, or None
+    """
+
+    values, res_shared = shared
+
+    with values.view() as view, res_shared.view() as res_view:
+        if step:
+            begin_index = offset + begin * step
+            part = view[begin_index : begin_index + (end - begin) * step : step]
+            res_view[begin:end] = part
+            part.release()
         else:
-            final_index = indexes[0]
-            begin = indexes[1]
-            end = indexes[2]
-
-            # Calculate marginal
-            res_values = [0] * res_values_size
-            for pre_i, value in enumerate(self.values[begin:end]):
-                i = pre_i + begin
-                index = 0
-                div = 1
-                mult = 1
-                k = 0
-
-                for j in self.rand_vars:
-                    if k < len(res_rand_vars) and j.name == res_rand_vars[k].name:
-                        rv_len = len(res_rand_vars[k].domain)
-                        index += (int(i / div) % rv_len) * mult
-                        mult *= len(res_rand_vars[k].domain)
-                        k += 1
-
-                    div *= len(j.domain)
-
-                res_values[index] += value
-
-            # Put results in queue
-            arg_queue.put((final_index, res_values))
+            indexes = stridedSlice(dims, strides, begin, end)
+            res_view[begin:end] = array.array(
+                res_shared.typecode,
+                map(view.__getitem__, map(offset.__add__, indexes)),
+            )
+
+    for i in shared:
+        i.close()
+
+
+def reduceTask(shared, fun, begin, end):
+    """
+    Task of ParFactor.reduceIndex, finds the first value from begin to end
+    chosen by fun, max or min
+
+    :param shared: SharedValues of the values of the factor and an unused one
+    :returns:      Pair with the value and its index
+    """
+
+    values = shared[0]
+
+    with values.view() as view:
+        index = fun(range(begin, end), key=view.__getitem__)
+        value = view[index]
+
+    for i in shared:
+        i.close()
+
+    return value, index
+
+
+def scalarOp(x, fun, scalar_value):
+    """
+    Function mapped by ParFactor.scalar, fun may be the name of an operation
+    """
+
+    return resolveOperation(fun)(x, scalar_value)
+
+
+def logValue(x, base):
+    """
+    Function mapped by ParFactor.log
+    """
+
+    return math.log(x, base)
+
+
+def powValue(x, p):
+    """
+    Function mapped by ParFactor.pow
+    """
+
+    return x ** p
+
+
+def expValue(x, base):
+    """
+    Function mapped by ParFactor.exp
+    """
+
+    if base is None:
+        return math.exp(x)
+    return base ** x
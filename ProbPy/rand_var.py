@@ -7,6 +7,70 @@ import copy
 import math
 
 
+# Ids of the names of the variables
+rand_var_ids = {}
+
+
+def randVarId(name):
+    """
+    Returns the id of a name of a variable. Each name gets a small integer,
+    the first time it is used, which stays the same for the rest of the
+    program
+
+    :param name: Name of a variable
+    :returns:    Integer id of the name
+    """
+
+    var_id = rand_var_ids.get(name)
+    if var_id is None:
+        var_id = len(rand_var_ids)
+        rand_var_ids[name] = var_id
+
+    return var_id
+
+
+def slotsState(obj):
+    """
+    Returns the state of an object whose classes use __slots__, used to copy
+    and pickle it. Each slot is read with its own descriptor, so a property of
+    a subclass with the same name, like the values of a SparseFactor, doesn't
+    hide it
+
+    :param obj: Object with __slots__
+    :returns:   Dictionary from the name of each slot that is set, and of each
+                attribute in the __dict__ of the object, if any, to its value
+    """
+
+    state = dict(getattr(obj, "__dict__", {}))
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            try:
+                state[name] = cls.__dict__[name].__get__(obj, cls)
+            except AttributeError:
+                pass
+
+    return state
+
+
+def setSlotsState(obj, state):
+    """
+    Sets the state returned by slotsState in an object
+
+    :param obj:   Object with __slots__
+    :param state: Dictionary from the name of each attribute to its value
+    """
+
+    state = dict(state)
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if name in state:
+                cls.__dict__[name].__set__(obj, state.pop(name))
+
+    # Attributes that are not in slots
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
 class RandVar:
     """
     Represents a Random Variable in a probability distribution. Each variable
@@ -40,8 +104,29 @@ class RandVar:
     To create an anonymous the following two methods are valid:
         >>> Anon1 = RandVar("_anonymous", [True, False])
         >>> Anon2 = RandVar(domain=[True, False])
+
+    Every variable has an integer id, which is the same for every variable
+    with the same name. Factors use the ids to find their variables, instead
+    of comparing the names:
+        >>> RandVar("X").id == RandVar("X", 3).id
+        True
+
+    The domain is frozen, it is kept in a tuple which can't be changed or
+    replaced, and the index of each of its values is precomputed, so finding
+    the position of a value doesn't go through the domain:
+        >>> ball.domain
+        ('Red', 'Green', 'Blue')
+        >>> ball.index("Blue")
+        2
+        >>> ball.indices(["Blue", "Red"])
+        [2, 0]
+
+    Variables are made in great numbers in big networks, so their attributes
+    are kept in __slots__ instead of a __dict__ for each variable.
     """
 
+    __slots__ = ("name", "id", "frozen_domain", "domain_index")
+
     def __init__(self, name="_", domain=None):
         # Check the name
         if type(name) not in [str, int]:
@@ -64,7 +149,58 @@ class RandVar:
 
         # Store the attributes
         self.name = name
-        self.domain = domain
+        self.id = randVarId(name)
+        self.frozen_domain = tuple(domain)
+
+        # Index of each value of the domain. If a value is repeated, the first
+        # index is used
+        self.domain_index = {}
+        for i, value in enumerate(self.frozen_domain):
+            self.domain_index.setdefault(value, i)
+
+    @property
+    def domain(self):
+        """
+        Tuple with the values of the domain of the variable
+        """
+
+        return self.frozen_domain
+
+    def index(self, value):
+        """
+        Returns the position of a value in the domain of the variable
+
+        :param value: Value of the domain
+        :returns:     Index of value in the domain
+
+        Examples:
+            >>> X = RandVar("X", ["a", "b", "c"])
+            >>> X.index("c")
+            2
+        """
+
+        try:
+            return self.domain_index[value]
+        except (KeyError, TypeError):
+            raise RandVarValueEx(self, value)
+
+    def indices(self, values):
+        """
+        Returns the positions of many values in the domain of the variable
+
+        :param values: Iterable with values of the domain
+        :returns:      List with the index of each value
+
+        Examples:
+            >>> X = RandVar("X", ["a", "b", "c"])
+            >>> X.indices(["c", "a", "c"])
+            [2, 0, 2]
+        """
+
+        try:
+            return list(map(self.domain_index.__getitem__, values))
+        except KeyError as ex:
+            raise RandVarValueEx(self, ex.args[0])
 
     def equal(self, var):
         """
@@ -106,6 +242,14 @@ class RandVar:
     def __hash__(self):
         return self.name.__hash__()
 
+    def __getstate__(self):
+        return slotsState(self)
+
+    def __setstate__(self, state):
+        # Ids are only valid in the process that made them
+        setSlotsState(self, state)
+        self.id = randVarId(self.name)
+
 
 class RandVarNameEx(Exception):
     """Exception use for a bad Random Variable name"""
@@ -117,6 +261,20 @@ class RandVarNameEx(Exception):
         return "Bad Random Variable name: %s" % repr(self.bad_name)
 
 
+class RandVarValueEx(Exception):
+    """Exception use for a value that is not in the domain of a Variable"""
+
+    def __init__(self, rand_var, bad_value):
+        self.rand_var = rand_var
+        self.bad_value = bad_value
+
+    def __str__(self):
+        return "Value %s not in the domain of %s" % (
+            repr(self.bad_value),
+            str(self.rand_var),
+        )
+
+
 class RandVarDomainEx(Exception):
     """Exception use for a bad domain for a Variable"""
 
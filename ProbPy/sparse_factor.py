@@ -0,0 +1,552 @@
+"""
+Implements the Sparse Factor class, a factor that only stores its non zero
+values.
+"""
+
+
+from ProbPy import Factor
+from ProbPy.factor import FactorRandVarsEx, FactorValuesEx
+from ProbPy.layout import factor_op_layouts, layoutStrides, stridedIndexes
+
+import copy
+import sys
+
+
+class SparseFactor(Factor):
+    """
+    Factor that only stores its non zero values, in a dictionary from the
+    index of each value to the value. Deterministic and near deterministic
+    distributions have most of their values equal to zero, and with this
+    class the memory and the time of their operations depend on the number
+    of non zero values instead of the size of the factor.
+
+    :param rand_vars: List of Random Variables of this factor, or single
+                      variable
+    :param values:    Values of the factor, like in Factor. Only the non zero
+                      values are stored
+    :param factor:    Dense factor. The new factor will have the same values
+    :param entries:   Dictionary from the index of each non zero value to the
+                      value. Used instead of values
+    :param threshold: Maximum density, the number of non zero values over the
+                      size of the factor, of results of operations that are
+                      kept sparse. Results with a bigger density are dense
+                      Factor objects. If None, default_threshold is used.
+                      The switch only goes from sparse to dense, results of
+                      operations on dense factors are never made sparse
+
+    Examples:
+        >>> # Assuming X and Y are variables with domain of size 3
+        >>> XY_sparse = SparseFactor([X, Y], [1, 0, 0, 0, 1, 0, 0, 0, 1])
+        >>> XY_sparse = SparseFactor([X, Y], entries={0: 1, 4: 1, 8: 1})
+        >>> XY_sparse = SparseFactor(factor=XY_factor)
+
+    The values attribute of a SparseFactor is a dense list made every time it
+    is used. The operations mult, div, marginal, multMarginal, instVar,
+    normalize, argmax and argmin only go through the non zero values. Other
+    operations are done with the dense values. When a dense Factor is
+    multiplied by a SparseFactor only the non zero values of both are used.
+
+    Since only non zero values are used, dividing a zero value by zero gives
+    zero, instead of raising an exception like in Factor.
+
+    Only the results of operations of a SparseFactor are checked against the
+    threshold. Dense factors stay dense however many of their values are
+    zero, and are made sparse explicitly:
+
+        >>> XY_sparse = SparseFactor(factor=XY_factor * XZ_factor)
+    """
+
+    # Default maximum density of sparse results
+    default_threshold = 0.25
+
+    __slots__ = ("entries", "threshold")
+
+    def __init__(
+        self, rand_vars=None, values=None, factor=None, entries=None, threshold=None
+    ):
+        if factor is not None:
+            rand_vars = factor.rand_vars[:]
+            values = factor.values
+
+        # Use the Factor constructor to check the variables and values
+        if entries is None:
+            dense = Factor(rand_vars, values)
+            rand_vars = dense.rand_vars
+            entries = {i: j for i, j in enumerate(dense.values) if j != 0}
+
+        elif type(rand_vars) != list:
+            rand_vars = [rand_vars]
+
+        self.rand_vars = rand_vars
+        self.indexRandVars()
+        self.entries = entries
+        self.threshold = self.default_threshold if threshold is None else threshold
+
+        # Check the entries
+        size = self.getValuesListSize(rand_vars)
+        for i in entries:
+            if type(i) != int or i < 0 or i >= size:
+                raise FactorValuesEx(rand_vars)
+
+    @property
+    def values(self):
+        """
+        Dense list with every value of the factor
+        """
+
+        res = [0] * self.getValuesListSize(self.rand_vars)
+        for i, val in self.entries.items():
+            res[i] = val
+
+        return res
+
+    def isSparse(self):
+        return True
+
+    def getStorage(self):
+        return "sparse"
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes used by the dictionary of non zero values, counting
+        the indexes and the value objects
+        """
+
+        objects = {id(i): i for i in self.entries}
+        objects.update((id(i), i) for i in self.entries.values())
+        return sys.getsizeof(self.entries) + sum(
+            sys.getsizeof(i) for i in objects.values()
+        )
+
+    def density(self):
+        """
+        Returns the number of non zero values over the size of the factor
+        """
+
+        return len(self.entries) / self.getValuesListSize(self.rand_vars)
+
+    def toFactor(self):
+        """
+        Returns a dense Factor with the same values
+        """
+
+        return Factor.fromTrusted(self.rand_vars, self.values)
+
+    def toStorage(self, storage):
+        return self.toFactor().toStorage(storage)
+
+    def newFactor(self, rand_vars, values):
+        return self.makeResult(
+            rand_vars, {i: j for i, j in enumerate(values) if j != 0}
+        )
+
+    def makeResult(self, rand_vars, entries):
+        """
+        Makes the result of an operation, which is sparse if its density is at
+        most the threshold of self, and dense otherwise. This is the only
+        place where the representation switches, from sparse to dense
+
+        :param rand_vars: Variables of the result
+        :param entries:   Dictionary with the non zero values of the result
+        :returns:         SparseFactor or Factor
+        """
+
+        size = self.getValuesListSize(rand_vars)
+        if len(entries) > self.threshold * size:
+            values = [0] * size
+            for i, val in entries.items():
+                values[i] = val
+            return Factor.fromTrusted(rand_vars, values)
+
+        return SparseFactor(rand_vars, entries=entries, threshold=self.threshold)
+
+    """
+    Operations that only use the non zero values
+    """
+
+    def mult(self, factor):
+        """
+        Multiplication of self and factor, which may be sparse or dense. Only
+        the non zero values of both are used
+
+        :param factor: Other factor in operation
+        :returns:      Result of operation
+        """
+
+        if type(factor) == int or type(factor) == float:
+            return self.scalarMult(factor)
+
+        self.checkSpace(factor)
+        return self.joinMult(self, factor)
+
+    def rmult(self, factor):
+        """
+        Multiplication of factor and self, used when a dense factor is
+        multiplied by a sparse one. The variables of the result are in the
+        same order as in factor * self
+
+        :param factor: Dense factor in operation
+        :returns:      Result of operation
+        """
+
+        return self.joinMult(factor, self)
+
+    def scalarMult(self, scalar):
+        """
+        Multiplication by a scalar
+        """
+
+        entries = {i: j * scalar for i, j in self.entries.items()}
+        return self.makeResult(
+            self.rand_vars, {i: j for i, j in entries.items() if j != 0}
+        )
+
+    def joinMult(self, fac1, fac2):
+        """
+        Product of two factors, where at least one of them is sparse. The non
+        zero values of fac2 are grouped by the values of the variables shared
+        with fac1, and each non zero value of fac1 is multiplied by the values
+        of its group
+
+        :param fac1: First factor of the product
+        :param fac2: Second factor of the product
+        :returns:    Product with the variables of fac1 followed by the other
+                     variables of fac2
+        """
+
+        layout = factor_op_layouts.get(fac1.rand_vars, fac2.rand_vars)
+        res_rand_vars = layout.resRandVars(fac1.rand_vars, fac2.rand_vars)
+
+        shared = [i for i in fac2.rand_vars if i.id in fac1.var_pos]
+        extra = [fac2.rand_vars[i] for i in layout.extra]
+
+        # Key of the shared variables, with weights of a mixed radix number
+        key_weights = layoutStrides(shared)
+        extra_weights = layoutStrides(extra)
+
+        coords1 = self.coordinates(fac1.rand_vars, key_weights)
+        coords2_key = self.coordinates(fac2.rand_vars, key_weights)
+        coords2_extra = self.coordinates(fac2.rand_vars, extra_weights)
+
+        # Group the values of fac2
+        groups = {}
+        for i, val in nonZeroValues(fac2):
+            key = projectIndex(i, coords2_key)
+            groups.setdefault(key, []).append((projectIndex(i, coords2_extra), val))
+
+        # Join with the values of fac1
+        size1 = fac1.getValuesListSize(fac1.rand_vars)
+        entries = {}
+        for i, val1 in nonZeroValues(fac1):
+            for extra_index, val2 in groups.get(projectIndex(i, coords1), []):
+                res = val1 * val2
+                if res != 0:
+                    entries[i + size1 * extra_index] = res
+
+        return self.makeResult(res_rand_vars, entries)
+
+    def div(self, factor):
+        """
+        Division of self by factor. Only the non zero values of self are
+        divided, since the others stay zero
+
+        :param factor: Other factor in operation
+        :returns:      Result of operation
+        """
+
+        if type(factor) == int or type(factor) == float:
+            return self.scalarMult(1 / factor)
+
+        layout = factor_op_layouts.get(self.rand_vars, factor.rand_vars)
+        res_rand_vars = layout.resRandVars(self.rand_vars, factor.rand_vars)
+
+        # Index in factor of the variables of self, and offsets of the
+        # variables that are only in factor
+        strides2 = layoutStrides(factor.rand_vars)
+        coords = self.coordinates(self.rand_vars, strides2)
+
+        extra = [factor.rand_vars[i] for i in layout.extra]
+        offsets = stridedIndexes(
+            [len(i.domain) for i in extra], [strides2[i.id] for i in extra]
+        )
+
+        if factor.isSparse():
+            get = lambda i: factor.entries.get(i, 0)
+        else:
+            get = factor.convertValues(factor.values, "list").__getitem__
+
+        size1 = self.getValuesListSize(self.rand_vars)
+        entries = {}
+        for i, val in self.entries.items():
+            base = projectIndex(i, coords)
+            for extra_index, offset in enumerate(offsets):
+                entries[i + size1 * extra_index] = val / get(base + offset)
+
+        return self.makeResult(res_rand_vars, entries)
+
+    def marginal(self, arg_rand_vars):
+        """
+        Marginal of the factor, adding only the non zero values
+
+        :param arg_rand_vars: List of random variables that will make up the
+                              returning factor
+        :returns:             Marginal factor
+        """
+
+        # If the argument is a single variable
+        if type(arg_rand_vars) != list:
+            rand_vars = [arg_rand_vars]
+        else:
+            rand_vars = arg_rand_vars
+
+        ids = {i.id for i in rand_vars}
+        res_rand_vars = [i for i in self.rand_vars if i.id in ids]
+
+        coords = self.coordinates(self.rand_vars, layoutStrides(res_rand_vars))
+
+        entries = {}
+        for i, val in self.entries.items():
+            index = projectIndex(i, coords)
+            entries[index] = entries.get(index, 0) + val
+
+        return self.makeResult(
+            res_rand_vars, {i: j for i, j in entries.items() if j != 0}
+        )
+
+    def multMarginal(self, factor, arg_rand_vars):
+        """
+        Marginal of the product of self and factor. The sparse product is
+        small, so it is calculated before the marginal
+
+        :param factor:        The other factor of the product
+        :param arg_rand_vars: List of random variables that will make up the
+                              returning factor
+        :returns:             Marginal of the product
+        """
+
+        return self.mult(factor).marginal(arg_rand_vars)
+
+    def instVarMany(self, pairs):
+        """
+        Instantiates many variables, going only once through the non zero
+        values. See Factor.instVarMany
+
+        :param pairs: Iterable of pairs between a variable and its value
+        :returns:     Factor with the variables instantiated
+        """
+
+        insts = self.instIndexes(pairs)
+        if insts is None:
+            return None
+        elif not insts:
+            return self.copy()
+
+        res_rand_vars = [j for i, j in enumerate(self.rand_vars) if i not in insts]
+        res_strides = layoutStrides(res_rand_vars)
+
+        # Stride, dimension, instantiated index and stride in the result of
+        # each variable
+        coords = []
+        stride = 1
+        for i, var in enumerate(self.rand_vars):
+            dim = len(var.domain)
+            coords.append((stride, dim, insts.get(i), res_strides.get(var.id)))
+            stride *= dim
+
+        entries = {}
+        for index, val in self.entries.items():
+            res_index = 0
+            for stride, dim, inst, res_stride in coords:
+                coord = index // stride % dim
+                if inst is None:
+                    res_index += coord * res_stride
+                elif coord != inst:
+                    break
+            else:
+                entries[res_index] = val
+
+        return self.makeResult(res_rand_vars, entries)
+
+    def reorder(self, rand_vars):
+        """
+        Returns a factor equal to self but with the variables in the order of
+        rand_vars. See Factor.reorder
+        """
+
+        ids = tuple(i.id for i in rand_vars)
+        if ids == self.var_ids:
+            return self.copy()
+
+        if len(ids) != len(self.var_ids) or set(ids) != set(self.var_ids):
+            raise FactorRandVarsEx(rand_vars)
+
+        coords = self.coordinates(self.rand_vars, layoutStrides(rand_vars))
+        entries = {projectIndex(i, coords): j for i, j in self.entries.items()}
+        return SparseFactor(rand_vars, entries=entries, threshold=self.threshold)
+
+    def expectedValue(self, fun):
+        """
+        Expected value, see Factor.expectedValue
+        """
+
+        if not self.sameVariables(fun):
+            return None
+
+        return sum(self.mult(fun).values)
+
+    def max(self):
+        """
+        Returns maximum values in factor
+        """
+
+        return self.values[self.argIndex(max)]
+
+    def min(self):
+        """
+        Returns minimum values in factor
+        """
+
+        return self.values[self.argIndex(min)]
+
+    def argmax(self):
+        """
+        Returns event with the greatest value
+        """
+
+        return self.indexEvent(self.argIndex(max))
+
+    def argmin(self):
+        """
+        Returns event with the lesser value
+        """
+
+        return self.indexEvent(self.argIndex(min))
+
+    def argIndex(self, fun):
+        """
+        Index of the value selected by fun, either max or min, going through
+        the non zero values and the first zero value, if there is one. Ties
+        are broken by the smallest index, like in Factor
+        """
+
+        candidates = sorted(self.entries.items())
+
+        # Index of the first zero value
+        for i in range(self.getValuesListSize(self.rand_vars)):
+            if i not in self.entries:
+                candidates.append((i, 0))
+                break
+
+        best = fun(candidates, key=lambda i: (i[1], -i[0] if fun is max else i[0]))
+        return best[0]
+
+    def valueAt(self, assignment):
+        """
+        Value of an assignment of every variable, see Factor.valueAt
+        """
+
+        return self.entries.get(self.valueIndex(assignment), 0)
+
+    def valuesAt(self, assignments):
+        """
+        Values of a batch of assignments, see Factor.valuesAt
+        """
+
+        return [self.entries.get(i, 0) for i in self.valueIndexes(assignments)]
+
+    """
+    In place operations. The results are made like in the other operations
+    and self takes their variables and non zero values, staying sparse
+    """
+
+    def assign(self, factor):
+        self.rand_vars = factor.rand_vars
+        self.indexRandVars()
+
+        if factor.isSparse():
+            self.entries = factor.entries
+        else:
+            self.entries = dict(nonZeroValues(factor))
+
+        return self
+
+    def copy(self):
+        res = copy.copy(self)
+        res.entries = dict(self.entries)
+        return res
+
+    def factorOpInPlace(self, factor, fun):
+        return self.assign(self.factorOp(factor, fun))
+
+    def mapInPlace(self, fun):
+        return self.assign(self.map(fun))
+
+    def __imul__(self, other):
+        return self.assign(self.mult(other))
+
+    def __itruediv__(self, other):
+        return self.assign(self.div(other))
+
+    """
+    Operations done with the dense values
+    """
+
+    def factorOp(self, factor, fun):
+        res = self.toFactor().factorOp(factor, fun)
+        return self.newFactor(res.rand_vars, res.values)
+
+    def map(self, fun):
+        res = self.toFactor().map(fun)
+        return self.newFactor(res.rand_vars, res.values)
+
+    def coordinates(self, rand_vars, weights):
+        """
+        Makes the list used by projectIndex() to calculate, from the index of a
+        value in a factor with rand_vars, an index made of the values of the
+        variables in weights, each multiplied by its weight
+
+        :param rand_vars: Variables of the factor
+        :param weights:   Dictionary from ids of variables to weights
+        :returns:         List of tuples (stride, dim, weight)
+        """
+
+        res = []
+        stride = 1
+        for i in rand_vars:
+            if i.id in weights:
+                res.append((stride, len(i.domain), weights[i.id]))
+            stride *= len(i.domain)
+
+        return res
+
+    def __repr__(self):
+        return "{SparseFactor %s, %s}" % (
+            [i.name for i in self.rand_vars],
+            self.entries,
+        )
+
+
+def projectIndex(index, coords):
+    """
+    Calculates an index from another using the list from
+    SparseFactor.coordinates()
+    """
+
+    res = 0
+    for stride, dim, weight in coords:
+        res += ((index // stride) % dim) * weight
+
+    return res
+
+
+def nonZeroValues(factor):
+    """
+    Iterator over the pairs (index, value) of the non zero values of a factor
+    """
+
+    if factor.isSparse():
+        return iter(factor.entries.items())
+
+    values = factor.convertValues(factor.values, "list")
+    return ((i, j) for i, j in enumerate(values) if j != 0)
@@ -43,6 +43,7 @@ class TreeMarkovNetwork(MarkovNetwork):
         # Get messages to this node
         res = self.factorToVar(root_node.neighbors[0], root_node)
         root_node.messages[0] = res
+        res = res.copy()
 
         for i, neighbor in enumerate(root_node.neighbors[1:]):
             msg = self.factorToVar(neighbor, root_node)
@@ -85,20 +86,18 @@ class TreeMarkovNetwork(MarkovNetwork):
                 msg = self.varToFactor(neighbor, node)
                 if msg is not None:
                     if res is None:
-                        res = msg
+                        res = msg.copy()
                     else:
                         res *= msg
 
                 node.messages[i] = msg
 
         # Calculate the product between this factor and the product of the
-        # calculated messages
+        # calculated messages, summing out every variable but prev_var
         if res is None:
-            res = node.factor
-        else:
-            res *= node.factor
+            return node.factor.marginal(prev_var.var)
 
-        return res.marginal(prev_var.var)
+        return res.multMarginal(node.factor, prev_var.var)
 
     def varToFactor(self, node, prev_factor):
         """
@@ -118,7 +117,7 @@ class TreeMarkovNetwork(MarkovNetwork):
                 msg = self.factorToVar(neighbor, node)
                 if msg is not None:
                     if res is None:
-                        res = msg
+                        res = msg.copy()
                     else:
                         res *= msg
 
@@ -126,7 +125,7 @@ class TreeMarkovNetwork(MarkovNetwork):
 
         if len(node.obs_factors) > 0:
             if res is None:
-                res = node.obs_factors[0]
+                res = node.obs_factors[0].copy()
             else:
                 res *= node.obs_factors[0]
 
@@ -150,14 +149,14 @@ class TreeMarkovNetwork(MarkovNetwork):
 
         # Propagate this message to other nodes
         for i, neighbor in enumerate(node.neighbors):
-            new_msg = msg
+            new_msg = msg.copy()
 
             for j, nn in enumerate(node.neighbors):
                 if i != j and node.messages[j] is not None:
                     new_msg *= node.messages[j]
 
             if neighbor.var != prev_var.var:
-                new_msg = (node.factor * new_msg).marginal(neighbor.var)
+                new_msg = node.factor.multMarginal(new_msg, neighbor.var)
                 self.progMsgFactorToVar(neighbor, node, new_msg)
 
     def progMsgFactorToVar(self, node, prev_factor, msg):
@@ -172,7 +171,7 @@ class TreeMarkovNetwork(MarkovNetwork):
         :param msg:         Message from previous nodes to this one.
         """
 
-        marginal = msg
+        marginal = msg.copy()
         for i, neighbor in enumerate(node.neighbors):
             if node.messages[i] is not None:
                 marginal *= node.messages[i]
@@ -184,7 +183,7 @@ class TreeMarkovNetwork(MarkovNetwork):
 
         # Propagate this message to other nodes
         for i, neighbor in enumerate(node.neighbors):
-            new_msg = msg
+            new_msg = msg.copy()
 
             for j, nn in enumerate(node.neighbors):
                 if i != j and node.messages[j] is not None:
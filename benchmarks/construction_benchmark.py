@@ -0,0 +1,106 @@
+"""
+Benchmark for the construction of the factors returned by operations. The
+results of the operations are made with Factor.fromTrusted, which doesn't
+check the variables and every value like the constructor does. For factors of
+binary variables with sizes from 2^12 to 2^22 values, this benchmark compares
+the time of both ways of making a factor, and the time of a product and of a
+marginal when their results are made with each of them.
+
+Execute from the parent directory, like the examples:
+
+    python3 benchmarks/construction_benchmark.py
+    python3 benchmarks/construction_benchmark.py --min 10 --max 16
+"""
+
+# Not needed if library is installed
+from os import sys, path
+
+sys.path.insert(0, path.join("..", "ProbPy"))
+
+# Import ProbPy modules
+from ProbPy import RandVar, Factor
+
+import argparse
+import random
+import time
+
+
+class CheckedFactor(Factor):
+    """
+    Factor whose results are made with the constructor, which checks the
+    variables and the values, like before Factor.fromTrusted
+    """
+
+    def newFactor(self, rand_vars, values):
+        return Factor(rand_vars, self.keepStorage(values))
+
+
+def timeIt(fun):
+    """
+    Returns the time, in seconds, that fun takes to execute
+    """
+
+    begin = time.perf_counter()
+    fun()
+    return time.perf_counter() - begin
+
+
+def formatSpeedup(checked_time, trusted_time):
+    """
+    Formats the speedup of the trusted construction
+    """
+
+    return "%.1fx" % (checked_time / trusted_time)
+
+
+def benchmark(min_exp, max_exp):
+    row = "%-6s %-10s %10s %10s %10s"
+    print(row % ("Size", "Operation", "Checked", "Trusted", "Speedup"))
+
+    for exp in range(min_exp, max_exp + 1):
+        rand_vars = [RandVar("V%d" % i, [0, 1]) for i in range(exp)]
+        values = [random.random() for i in range(2 ** exp)]
+
+        fac = Factor(rand_vars, values)
+        checked_fac = CheckedFactor(rand_vars, values)
+        other = Factor(rand_vars[-1], [0.5, 0.5])
+
+        operations = [
+            (
+                "init",
+                lambda: Factor(rand_vars, values),
+                lambda: Factor.fromTrusted(rand_vars, values),
+            ),
+            ("mult", lambda: checked_fac * other, lambda: fac * other),
+            (
+                "marginal",
+                lambda: checked_fac.marginal(rand_vars[1:]),
+                lambda: fac.marginal(rand_vars[1:]),
+            ),
+        ]
+
+        for name, checked, trusted in operations:
+            checked_time = timeIt(checked)
+            trusted_time = timeIt(trusted)
+
+            print(
+                row
+                % (
+                    "2^%d" % exp,
+                    name,
+                    "%.4f" % checked_time,
+                    "%.4f" % trusted_time,
+                    formatSpeedup(checked_time, trusted_time),
+                )
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the construction of the results of operations"
+    )
+    parser.add_argument("--min", type=int, default=12, help="Smallest exponent")
+    parser.add_argument("--max", type=int, default=22, help="Biggest exponent")
+    args = parser.parse_args()
+
+    benchmark(args.min, args.max)
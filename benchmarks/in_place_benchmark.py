@@ -0,0 +1,116 @@
+"""
+Benchmark for the in place operations of factors. A factor is multiplied by
+a list of factors of some of its variables, like the messages multiplied in
+belief propagation or the factors of the Markov blanket in Gibbs sampling,
+first making a new factor for each product and then with *=, which writes the
+products in the values of the first factor.
+
+For each size, the number of factors made, the peak memory used and the time
+are shown for both. Execute from the parent directory, like the examples:
+
+    python3 benchmarks/in_place_benchmark.py
+    python3 benchmarks/in_place_benchmark.py --min 10 --max 16 --factors 50
+"""
+
+# Not needed if library is installed
+from os import sys, path
+
+sys.path.insert(0, path.join("..", "ProbPy"))
+
+# Import ProbPy modules
+from ProbPy import RandVar, Factor
+
+import argparse
+import random
+import time
+import tracemalloc
+
+
+# Number of factors made
+made_factors = 0
+
+
+def countingNew(cls, *args, **kwargs):
+    """
+    Replaces Factor.__new__ to count the factors made
+    """
+
+    global made_factors
+    made_factors += 1
+    return object.__new__(cls)
+
+
+def measure(fun):
+    """
+    Executes fun and returns the number of factors made, the peak memory used
+    in bytes and the time in seconds
+    """
+
+    global made_factors
+    made_factors = 0
+
+    tracemalloc.start()
+    begin = time.perf_counter()
+    fun()
+    seconds = time.perf_counter() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return made_factors, peak, seconds
+
+
+def accumulate(fac, factors):
+    """
+    Multiplies fac by every factor, making a new factor for each product
+    """
+
+    for i in factors:
+        fac = fac * i
+    return fac
+
+
+def accumulateInPlace(fac, factors):
+    """
+    Multiplies fac by every factor in place
+    """
+
+    fac = fac.copy()
+    for i in factors:
+        fac *= i
+    return fac
+
+
+def benchmark(min_exp, max_exp, num_factors):
+    row = "%-6s %-9s %10s %12s %10s"
+    print(row % ("Size", "Mode", "Factors", "Peak bytes", "Time"))
+
+    Factor.__new__ = countingNew
+
+    for exp in range(min_exp, max_exp + 1):
+        rand_vars = [RandVar("V%d" % i, [0, 1]) for i in range(exp)]
+        fac = Factor(rand_vars, [random.random() for i in range(2 ** exp)])
+
+        # Factors of up to 3 variables of fac
+        factors = []
+        for i in range(num_factors):
+            sub = random.sample(rand_vars, min(3, exp))
+            sub.sort(key=rand_vars.index)
+            factors.append(Factor(sub, [random.random() for j in range(2 ** len(sub))]))
+
+        for name, fun in [("new", accumulate), ("in place", accumulateInPlace)]:
+            count, peak, seconds = measure(lambda: fun(fac, factors))
+            print(row % ("2^%d" % exp, name, count, peak, "%.4f" % seconds))
+
+    del Factor.__new__
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark in place operations")
+    parser.add_argument("--min", type=int, default=12, help="Smallest exponent")
+    parser.add_argument("--max", type=int, default=18, help="Biggest exponent")
+    parser.add_argument(
+        "--factors", type=int, default=20, help="Number of factors multiplied"
+    )
+    args = parser.parse_args()
+
+    benchmark(args.min, args.max, args.factors)
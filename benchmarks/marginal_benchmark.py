@@ -0,0 +1,132 @@
+"""
+Benchmark for the marginal operation of factors. A factor of binary variables
+is created for sizes from 2^16 to 2^24 values and every other variable is
+summed out of it. The times of the current list and NumPy implementations are
+compared with the previous implementation, which computed the index of every
+value with a division and a modulo for each variable.
+
+Execute from the parent directory, like the examples:
+
+    python3 benchmarks/marginal_benchmark.py
+    python3 benchmarks/marginal_benchmark.py --min 16 --max 20 --legacy-max 18
+"""
+
+# Not needed if library is installed
+from os import sys, path
+
+sys.path.insert(0, path.join("..", "ProbPy"))
+
+# Import ProbPy modules
+from ProbPy import RandVar, Factor
+from ProbPy.factor import numpy
+
+import argparse
+import random
+import time
+
+
+def legacyMarginal(factor, res_rand_vars):
+    """
+    Previous implementation of the marginal, used as reference
+
+    :param factor:        Factor to marginalize
+    :param res_rand_vars: Variables of the resulting factor
+    :returns:             List with the values of the marginal
+    """
+
+    res_values = [0] * factor.getValuesListSize(res_rand_vars)
+
+    for i, value in enumerate(factor.values):
+        index = 0
+        div = 1
+        mult = 1
+        k = 0
+
+        for j in factor.rand_vars:
+            if k < len(res_rand_vars) and j.name == res_rand_vars[k].name:
+                index += (int(i / div) % len(res_rand_vars[k].domain)) * mult
+                mult *= len(res_rand_vars[k].domain)
+                k += 1
+
+            div *= len(j.domain)
+
+        res_values[index] += value
+
+    return res_values
+
+
+def timeIt(fun):
+    """
+    Returns the time, in seconds, that fun takes to execute
+    """
+
+    begin = time.perf_counter()
+    fun()
+    return time.perf_counter() - begin
+
+
+def formatTime(seconds):
+    """
+    Formats a time for the benchmark table, or "-" if it was not measured
+    """
+
+    return "-" if seconds is None else "%.4f" % seconds
+
+
+def formatSpeedup(legacy_time, seconds):
+    """
+    Formats the speedup over the legacy implementation
+    """
+
+    if legacy_time is None or seconds is None:
+        return "-"
+    return "%.1fx" % (legacy_time / seconds)
+
+
+def benchmark(min_exp, max_exp, legacy_max):
+    row = "%-6s %10s %10s %10s %10s %10s"
+    print(row % ("Size", "Legacy", "List", "NumPy", "List x", "NumPy x"))
+
+    for exp in range(min_exp, max_exp + 1):
+        rand_vars = [RandVar("V%d" % i, [0, 1]) for i in range(exp)]
+        res_rand_vars = rand_vars[::2]
+
+        fac = Factor(rand_vars, [random.random() for i in range(2 ** exp)])
+
+        legacy_time = None
+        if exp <= legacy_max:
+            legacy_time = timeIt(lambda: legacyMarginal(fac, res_rand_vars))
+
+        list_time = timeIt(lambda: fac.marginal(res_rand_vars))
+
+        numpy_time = None
+        if numpy is not None:
+            np_fac = fac.toStorage("numpy")
+            numpy_time = timeIt(lambda: np_fac.marginal(res_rand_vars))
+
+        print(
+            row
+            % (
+                "2^%d" % exp,
+                formatTime(legacy_time),
+                formatTime(list_time),
+                formatTime(numpy_time),
+                formatSpeedup(legacy_time, list_time),
+                formatSpeedup(legacy_time, numpy_time),
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Factor.marginal")
+    parser.add_argument("--min", type=int, default=16, help="Smallest exponent")
+    parser.add_argument("--max", type=int, default=24, help="Biggest exponent")
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=20,
+        help="Biggest exponent for which the legacy implementation is timed",
+    )
+    args = parser.parse_args()
+
+    benchmark(args.min, args.max, args.legacy_max)
@@ -0,0 +1,89 @@
+"""
+Benchmark for the operations of ParFactor. Two factors with some variables in
+common are multiplied, and the product is marginalized, with Factor and with
+ParFactor, whose operations are sent to the workers of a pool. The workers are
+started and warmed up before the operations, so their time isn't counted.
+
+For each size, the time of each operation is shown for both. Execute from the
+parent directory, like the examples:
+
+    python3 benchmarks/par_benchmark.py
+    python3 benchmarks/par_benchmark.py --min 10 --max 16 --processes 8
+"""
+
+# Not needed if library is installed
+from os import sys, path
+
+sys.path.insert(0, path.join("..", "ProbPy"))
+
+# Import ProbPy modules
+from ProbPy import RandVar, Factor, ParFactor, ParPool
+
+import argparse
+import random
+import time
+
+
+def measure(fun, repeat):
+    """
+    Returns the best time of repeat executions of fun, in seconds
+    """
+
+    best = None
+    for i in range(repeat):
+        begin = time.perf_counter()
+        fun()
+        seconds = time.perf_counter() - begin
+        best = seconds if best is None else min(best, seconds)
+
+    return best
+
+
+def benchmark(min_exp, max_exp, processes, repeat):
+    row = "%-6s %-9s %10s %10s"
+    print(row % ("Size", "Op", "Factor", "ParFactor"))
+
+    with ParPool(processes=processes, min_size=0) as pool:
+        pool.warmUp()
+
+        for exp in range(min_exp, max_exp + 1):
+            rand_vars = [RandVar("V%d" % i, [0, 1]) for i in range(exp)]
+
+            # The product has every variable
+            half = exp // 2 + 1
+            vars1 = rand_vars[:half]
+            vars2 = rand_vars[half - 1 :]
+            fac1 = Factor(vars1, [random.random() for i in range(2 ** len(vars1))])
+            fac2 = Factor(vars2, [random.random() for i in range(2 ** len(vars2))])
+            par1 = ParFactor(factor=fac1, pool=pool)
+            par2 = ParFactor(factor=fac2, pool=pool)
+
+            prod = fac1 * fac2
+            par_prod = ParFactor(factor=prod, pool=pool)
+
+            for name, fun, par_fun in [
+                ("mult", lambda: fac1 * fac2, lambda: par1 * par2),
+                (
+                    "marginal",
+                    lambda: prod.marginal(vars1),
+                    lambda: par_prod.marginal(vars1),
+                ),
+            ]:
+                seconds = measure(fun, repeat)
+                par_seconds = measure(par_fun, repeat)
+                print(
+                    row % ("2^%d" % exp, name, "%.4f" % seconds, "%.4f" % par_seconds)
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ParFactor")
+    parser.add_argument("--min", type=int, default=12, help="Smallest exponent")
+    parser.add_argument("--max", type=int, default=18, help="Biggest exponent")
+    parser.add_argument(
+        "--processes", type=int, default=None, help="Number of worker processes"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Executions of each")
+    args = parser.parse_args()
+
+    benchmark(args.min, args.max, args.processes, args.repeat)
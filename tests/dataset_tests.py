@@ -0,0 +1,132 @@
+from nose.tools import with_setup, nottest
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, Event, Dataset, DatasetEx, BayesianNetwork
+from ProbPy.factor import numpy
+
+
+class TestDataset(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.data = Dataset([self.X, self.Y], [[0, 1, 1, 0], [0, 0, 1, 0]])
+
+    def dataset_test_0(self):
+        """
+        Assignments are appended and made into events only when needed
+        """
+
+        data = Dataset.fromEvents(
+            [self.X, self.Y],
+            [Event([(self.X, "T"), (self.Y, "T")]), [(self.Y, "T"), (self.X, "F")]],
+        )
+        data.append([(self.X, "F"), (self.Y, "F"), (self.Z, "T")])
+        data.appendIndexes([0, 0])
+
+        assert len(data) == 4
+        assert list(data.column(self.X)) == [0, 1, 1, 0]
+        assert list(data.column(self.Y)) == [0, 0, 1, 0]
+
+        events = list(data)
+        assert events[2].value(self.X) == "F" and events[2].value(self.Y) == "F"
+        assert data[1].value(self.X) == "F" and data[1].value(self.Y) == "T"
+
+    def dataset_test_1(self):
+        """
+        Filter by evidence and count into factors
+        """
+
+        assert self.data.count().values == [2, 1, 0, 1]
+        assert self.data.count(self.X).values == [2, 2]
+        assert self.data.count([self.Y, self.X]).values == [2, 0, 1, 1]
+
+        res = self.data.filter([(self.X, "F")])
+        assert len(res) == 2
+        assert res.count(self.Y).values == [1, 1]
+
+        res = self.data.filter(Event([(self.X, "T"), (self.Y, "F")]))
+        assert len(res) == 0
+        assert res.count().values == [0, 0, 0, 0]
+
+        # Variables not in the dataset are ignored
+        assert len(self.data.filter([(self.Z, "T")])) == 4
+
+    def dataset_test_2(self):
+        """
+        Bad columns and variables raise exceptions
+        """
+
+        bad = [
+            lambda: Dataset([self.X, self.Y], [[0, 1]]),
+            lambda: Dataset([self.X, self.Y], [[0, 1], [0]]),
+            lambda: self.data.append([(self.X, "T")]),
+            lambda: self.data.column(self.Z),
+        ]
+
+        for fun in bad:
+            try:
+                fun()
+                assert False
+            except DatasetEx:
+                pass
+
+    def dataset_test_3(self):
+        """
+        NumPy columns
+        """
+
+        if numpy is None:
+            return
+
+        data = Dataset(
+            [self.X, self.Y], [numpy.array([0, 1, 1]), numpy.array([0, 0, 1])]
+        )
+        assert data.count().values == [1, 1, 0, 1]
+        assert data.filter([(self.Y, "F")]).count(self.X).values == [0, 1]
+
+    def dataset_test_4(self):
+        """
+        Samples of a Bayesian Network, where Y is always equal to X
+        """
+
+        network = [
+            (self.X, Factor(self.X, [0.5, 0.5])),
+            (self.Y, Factor([self.Y, self.X], [1.0, 0.0, 0.0, 1.0])),
+        ]
+        BN = BayesianNetwork(network)
+
+        data = BN.sampleDataset(200)
+        assert len(data) == 200
+        assert data.count([self.X, self.Y]).values[1:3] == [0, 0]
+
+        data = BN.sampleDataset(10, Event(var=self.X, val="F"))
+        assert data.count(self.Y).values == [0, 10]
+
+        sample = BN.sample()
+        assert sample.value(self.X) == sample.value(self.Y)
+
+    def dataset_test_5(self):
+        """
+        Single samples read factors where the variable of the node is not the
+        first one, and rejection sampling adds up the counts of each chunk
+        """
+
+        network = [
+            (self.X, Factor(self.X, [0.5, 0.5])),
+            (self.Y, Factor([self.X, self.Y], [0.0, 1.0, 1.0, 0.0])),
+        ]
+        BN = BayesianNetwork(network)
+
+        for i in range(20):
+            sample = BN.sample()
+            assert sample.value(self.X) != sample.value(self.Y)
+
+        sample = BN.sample([(self.X, "T")])
+        assert sample.value(self.X) == "T" and sample.value(self.Y) == "F"
+
+        BN.sample_chunk = 3
+        res = BN.rejectionSample(self.Y, [(self.X, "F")], 10)
+        assert res.values == [1.0, 0.0]
+
+        res = BN.rejectionSample(self.X, [], 10)
+        assert sum(res.values) == 1.0
@@ -0,0 +1,139 @@
+from nose.tools import with_setup, nottest, assert_raises, assert_almost_equal
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, LogFactor
+from ProbPy.factor import FactorStorageEx
+
+import array
+
+
+class TestFactorArray(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.factors = [
+            self.scalarf,
+            self.X_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.XYZ_factor,
+            self.XKW_factor,
+            self.TKW_factor,
+        ]
+
+    def checkValues(self, res, factor, storage):
+        """
+        Checks that res has the storage, variables and values of factor
+        """
+
+        assert res.getStorage() == storage
+        assert res.rand_vars == factor.rand_vars
+        for i, val in enumerate(res.values):
+            assert_almost_equal(val, factor.values[i], places=5)
+
+    def array_test_0(self):
+        """
+        Storage of values
+        """
+
+        res = Factor([self.X, self.Y], [1, 2, 3, 4], storage="array")
+        assert res.getStorage() == "array"
+        assert res.values == array.array("d", [1, 2, 3, 4])
+
+        res = res.toStorage("array32")
+        assert res.getStorage() == "array32"
+        assert res.values.typecode == "f"
+
+        res = res.toStorage("list")
+        assert res.getStorage() == "list"
+        assert res.values == [1, 2, 3, 4]
+
+        res = Factor(self.X, array.array("d", [1, 2]))
+        assert res.getStorage() == "array"
+
+        assert_raises(FactorStorageEx, Factor, self.X, [1, 2], storage="array16")
+
+    def array_test_1(self):
+        """
+        Operations keep the storage
+        """
+
+        ops = [Factor.mult, Factor.div, Factor.add, Factor.sub]
+
+        for storage in ["array", "array32"]:
+            for op in ops:
+                for fac1 in self.factors:
+                    for fac2 in self.factors:
+                        res = op(fac1.toStorage(storage), fac2)
+                        self.checkValues(res, op(fac1, fac2), storage)
+
+            for fac in self.factors:
+                arr_fac = fac.toStorage(storage)
+                num = len(fac.rand_vars)
+
+                self.checkValues(arr_fac * self.scalar, fac * self.scalar, storage)
+                self.checkValues(arr_fac.pow(2), fac.pow(2), storage)
+
+                for mask in range(2 ** num):
+                    sub = [k for j, k in enumerate(fac.rand_vars) if mask & (1 << j)]
+
+                    res = arr_fac.marginal(sub)
+                    self.checkValues(res, fac.marginal(sub), storage)
+
+                    res = arr_fac.normalize(sub)
+                    self.checkValues(res, fac.normalize(sub), storage)
+
+                    res = arr_fac.multMarginal(self.XY_factor, sub)
+                    self.checkValues(
+                        res, fac.multMarginal(self.XY_factor, sub), storage
+                    )
+
+                for var in fac.rand_vars:
+                    res = arr_fac.instVar(var, "F")
+                    self.checkValues(res, fac.instVar(var, "F"), storage)
+
+                res = arr_fac.reorder(fac.rand_vars[::-1])
+                self.checkValues(res, fac.reorder(fac.rand_vars[::-1]), storage)
+
+                assert arr_fac.argmax() == fac.argmax()
+                assert arr_fac == fac
+
+    def array_test_2(self):
+        """
+        Default storage
+        """
+
+        try:
+            Factor.default_storage = "array"
+
+            res = Factor([self.X, self.Y], [1, 2, 3, 4])
+            assert res.getStorage() == "array"
+            assert (res * res).getStorage() == "array"
+
+            res = Factor([self.X, self.Y], [1, 2, 3, 4], storage="list")
+            assert res.getStorage() == "list"
+
+            res = LogFactor(factor=self.XY_factor)
+            assert res.getStorage() == "array"
+            assert res.marginal(self.X).getStorage() == "array"
+
+        finally:
+            Factor.default_storage = None
+
+    def array_test_3(self):
+        """
+        Number of bytes used by the values
+        """
+
+        values = [i / 7 for i in range(1000)]
+
+        list_fac = Factor(self.X, values[:2])
+        assert list_fac.nbytes > 2 * 8
+
+        res = Factor([RandVar("A", list(range(1000)))], values)
+        list_size = res.nbytes
+        double_size = res.toStorage("array").nbytes
+        float_size = res.toStorage("array32").nbytes
+
+        assert 1000 * 8 <= double_size < list_size
+        assert 1000 * 4 <= float_size < double_size
@@ -0,0 +1,71 @@
+from nose.tools import with_setup, nottest, assert_almost_equal
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, Event, Dataset
+from ProbPy.factor import FactorValuesEx, FactorRandVarsEx, numpy
+
+
+class TestFactorFromCounts(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.A = RandVar("A", ["a0", "a1", "a2"])
+        self.columns = [[0, 1, 1, 0, 1], [0, 0, 1, 0, 2]]
+
+    def fromCounts_test_0(self):
+        """
+        Joint counts, with pseudo counts and weights
+        """
+
+        res = Factor.fromCounts([self.X, self.A], self.columns)
+        assert res.rand_vars == [self.X, self.A]
+        assert res.values == [2, 1, 0, 1, 0, 1]
+
+        res = Factor.fromCounts(self.A, self.columns[1:], pseudo_count=1)
+        assert res.values == [4, 2, 2]
+
+        weights = [0.5, 1, 2, 0.25, 3]
+        res = Factor.fromCounts([self.X, self.A], self.columns, weights=weights)
+        for i, j in zip(res.values, [0.75, 1, 0, 2, 0, 3]):
+            assert_almost_equal(i, j)
+
+        res = Factor.fromCounts([self.X], [[]])
+        assert res.values == [0, 0]
+
+        if numpy is not None:
+            res = Factor.fromCounts(self.A, self.columns[1:], storage="numpy")
+            assert res.getStorage() == "numpy"
+            assert res.values.tolist() == [3, 1, 1]
+
+    def fromCounts_test_1(self):
+        """
+        Counts of a Dataset and of events are the same
+        """
+
+        data = Dataset([self.X, self.A], self.columns)
+        res1 = Factor.fromSamples([self.A, self.X], data)
+        res2 = Factor.fromSamples([self.A, self.X], list(data), pseudo_count=2)
+
+        assert res1.values == [2, 0, 0, 1, 1, 1]
+        assert res2.values == [4, 2, 2, 3, 3, 3]
+
+    def fromCounts_test_2(self):
+        """
+        Indexes out of the domains, missing variables and weights of the
+        wrong length raise exceptions
+        """
+
+        bad = [
+            lambda: Factor.fromCounts(self.X, [[0, 2]]),
+            lambda: Factor.fromCounts(self.X, [[-1]]),
+            lambda: Factor.fromSamples([self.X, self.Y], [[(self.X, "T")]]),
+            lambda: Factor.fromCounts(self.X, [[0, 1]], weights=[1, 2, 3]),
+            lambda: Factor.fromCounts(self.X, [[0, 1]], weights=[1]),
+        ]
+
+        for fun in bad:
+            try:
+                fun()
+                assert False
+            except (FactorValuesEx, FactorRandVarsEx):
+                pass
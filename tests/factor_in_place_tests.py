@@ -0,0 +1,141 @@
+from nose.tools import with_setup, nottest, assert_almost_equal
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, LogFactor, SparseFactor
+from ProbPy.factor import numpy
+
+import operator
+
+
+class TestFactorInPlace(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        # Float values, so NumPy arrays can hold the results
+        factors = [
+            self.scalarf,
+            self.X_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.XYZ_factor,
+            self.XKW_factor,
+        ]
+        self.factors = [i.map(float) for i in factors]
+
+        self.storages = ["list", "array"]
+        if numpy is not None:
+            self.storages.append("numpy")
+
+    def checkValues(self, res, factor):
+        """
+        Checks that res has the same variables and values as factor
+        """
+
+        assert res.rand_vars == factor.rand_vars
+        for i, val in enumerate(res.values):
+            assert_almost_equal(val, factor.values[i])
+
+    def in_place_test_0(self):
+        """
+        In place operations between every pair of factors
+        """
+
+        ops = [
+            (operator.imul, Factor.mult),
+            (operator.itruediv, Factor.div),
+            (operator.iadd, Factor.add),
+            (operator.isub, Factor.sub),
+        ]
+
+        for storage in self.storages:
+            for in_place_op, op in ops:
+                for fac1 in self.factors:
+                    for fac2 in self.factors + [self.scalar]:
+                        res = fac1.toStorage(storage)
+                        values = res.values
+
+                        fits = type(fac2) == int or all(
+                            fac1.varInFactor(i) for i in fac2.rand_vars
+                        )
+
+                        assert in_place_op(res, fac2) is res
+                        self.checkValues(res, op(fac1, fac2))
+                        assert res.getStorage() == storage
+                        assert (res.values is values) == fits
+
+    def in_place_test_1(self):
+        """
+        In place map and normalize
+        """
+
+        for storage in self.storages:
+            for fac in self.factors:
+                res = fac.toStorage(storage)
+                values = res.values
+
+                assert res.mapInPlace(lambda x: x * 2 + 1) is res
+                self.checkValues(res, fac.map(lambda x: x * 2 + 1))
+
+                assert res.normalizeInPlace(fac.rand_vars[:1]) is res
+                norm = fac.map(lambda x: x * 2 + 1).normalize(fac.rand_vars[:1])
+                self.checkValues(res, norm)
+                assert res.values is values
+
+    def in_place_test_2(self):
+        """
+        Copies are not changed by in place operations
+        """
+
+        for storage in self.storages:
+            fac = self.XY_factor.toStorage(storage)
+            res = fac.copy()
+            res *= self.X_factor
+
+            self.checkValues(fac, self.XY_factor)
+            self.checkValues(res, self.XY_factor * self.X_factor)
+
+    def in_place_test_3(self):
+        """
+        In place operations of subclasses
+        """
+
+        log_fac = LogFactor(factor=self.XY_factor)
+        res = log_fac.copy()
+        res *= LogFactor(factor=self.X_factor)
+        res += log_fac
+        res /= 2
+        self.checkValues(
+            res.toFactor(), (self.XY_factor * self.X_factor + self.XY_factor) / 2
+        )
+
+        res = log_fac.copy()
+        res.normalizeInPlace(self.X)
+        self.checkValues(res.toFactor(), self.XY_factor.normalize(self.X))
+
+        fac = Factor([self.X, self.Y], [0, 1, 0, 3])
+        res = SparseFactor(factor=fac)
+        res *= self.XZ_factor
+        assert res.isSparse()
+        self.checkValues(res, fac * self.XZ_factor)
+
+        res.normalizeInPlace(self.X)
+        assert res.isSparse()
+        self.checkValues(res, (fac * self.XZ_factor).normalize(self.X))
+
+    def in_place_test_4(self):
+        """
+        Values of NumPy factors that can't hold the result are replaced
+        """
+
+        if numpy is None:
+            return
+
+        res = Factor(self.X, [1, 2], storage="numpy")
+        res /= 2
+        assert res.values.tolist() == [0.5, 1]
+
+        res = Factor(self.X, [1.5, 2.5], storage="numpy")
+        values = res.values
+        res *= Factor(self.X, [2, 2], storage="numpy")
+        assert res.values is values
+        assert res.values.tolist() == [3, 5]
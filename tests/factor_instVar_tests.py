@@ -1,6 +1,10 @@
 from nose.tools import with_setup, nottest
 
 from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, SparseFactor
+from ProbPy.factor import numpy
+
+import itertools
 
 
 class TestFactorInstVar(TestBase):
@@ -161,3 +165,93 @@ class TestFactorInstVar(TestBase):
 
         res = self.X_factor.instVar(self.X, "n")
         assert res is None
+
+    def index(self, rand_vars, values):
+        """
+        Index of the value of a factor with rand_vars for the given values of
+        each variable
+        """
+
+        res = 0
+        stride = 1
+        for i in rand_vars:
+            res += i.domain.index(values[i]) * stride
+            stride *= len(i.domain)
+        return res
+
+    def instVar_test_12(self):
+        """
+        Every combination of instantiated variables, in every storage, compared
+        with the value of each instantiation
+        """
+
+        A = RandVar("A", ["a0", "a1"])
+        B = RandVar("B", ["b0", "b1", "b2"])
+        C = RandVar("C", ["c0", "c1"])
+        D = RandVar("D", ["d0", "d1", "d2", "d3"])
+        rand_vars = [A, B, C, D]
+        fac = Factor(rand_vars, [i * (i % 3) for i in range(48)])
+
+        storages = ["list", "array"]
+        if numpy is not None:
+            storages.append("numpy")
+        factors = [fac.toStorage(i) for i in storages] + [SparseFactor(factor=fac)]
+
+        for mask in range(1, 16):
+            inst_vars = [j for i, j in enumerate(rand_vars) if mask & (1 << i)]
+            left = [i for i in rand_vars if i not in inst_vars]
+
+            for insts in itertools.product(*[i.domain for i in inst_vars]):
+                pairs = list(zip(inst_vars, insts))
+
+                # Values of the variables left, with the first changing faster
+                expected = []
+                domains = [i.domain for i in reversed(left)]
+                for i in itertools.product(*domains):
+                    values = dict(pairs + list(zip(reversed(left), i)))
+                    expected.append(fac.values[self.index(rand_vars, values)])
+
+                for i in factors:
+                    res = i.instVar(pairs)
+                    assert res.rand_vars == left
+                    assert list(res.values) == expected
+
+    def instVar_test_13(self):
+        """
+        Values of NumPy results are read only views, and in place operations
+        don't change the instantiated factor
+        """
+
+        if numpy is None:
+            return
+
+        fac = self.XYZ_factor.toStorage("numpy")
+        res = fac.instVar([(self.Z, "F")])
+        assert numpy.shares_memory(res.values, fac.values)
+
+        res *= 2
+        assert res.values.tolist() == [10, 12, 14, 16]
+        assert fac.values.tolist() == self.XYZ_domain
+
+    def instVar_test_14(self):
+        """
+        Instantiating no variable of the factor returns a copy, and in place
+        operations on it don't change the factor
+        """
+
+        factors = [
+            self.XY_factor.copy(),
+            self.XY_factor.toStorage("array"),
+            SparseFactor(factor=self.XY_factor),
+        ]
+
+        for fac in factors:
+            values = list(fac.toFactor().values) if fac.isSparse() else list(fac.values)
+            for res in [fac.instVar([]), fac.instVar([(self.Z, "T")])]:
+                assert res is not fac
+                res *= 10
+                res.mapInPlace(abs)
+                assert res.rand_vars == fac.rand_vars
+
+            fac_values = fac.toFactor().values if fac.isSparse() else fac.values
+            assert list(fac_values) == values
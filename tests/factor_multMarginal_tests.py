@@ -0,0 +1,74 @@
+from nose.tools import with_setup, nottest
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor
+from ProbPy.factor import numpy
+
+
+class TestFactorMultMarginal(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.factors = [
+            self.scalarf,
+            self.X_factor,
+            self.Y_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.ZW_factor,
+            self.XYZ_factor,
+            self.XYW_factor,
+            self.XKW_factor,
+            self.TKW_factor,
+        ]
+
+    def checkMultMarginal(self, fac1, fac2):
+        """
+        Compares multMarginal with the marginal of the product for every
+        subset of the variables of the product
+        """
+
+        prod = fac1 * fac2
+        num = len(prod.rand_vars)
+
+        for mask in range(2 ** num):
+            sub = [j for i, j in enumerate(prod.rand_vars) if mask & (1 << i)]
+
+            res = prod.marginal(sub)
+            fused = fac1.multMarginal(fac2, sub)
+
+            assert fused.rand_vars == res.rand_vars
+            assert fused.toStorage("list").values == res.toStorage("list").values
+
+    def multMarginal_test_0(self):
+        """
+        Every pair of factors
+        """
+
+        for fac1 in self.factors:
+            for fac2 in self.factors:
+                self.checkMultMarginal(fac1, fac2)
+
+    def multMarginal_test_1(self):
+        """
+        Single variable and scalar
+        """
+
+        res = self.XY_factor.multMarginal(self.Y_factor, self.X)
+        assert res.rand_vars == [self.X] and res.values == [15, 22]
+
+        res = self.XY_factor.multMarginal(self.scalar, self.Y)
+        assert res.rand_vars == [self.Y] and res.values == [30, 70]
+
+    def multMarginal_test_2(self):
+        """
+        NumPy storage
+        """
+
+        if numpy is None:
+            return
+
+        for fac1 in self.factors:
+            for fac2 in self.factors:
+                self.checkMultMarginal(fac1.toStorage("numpy"), fac2)
+                self.checkMultMarginal(fac1, fac2.toStorage("numpy"))
@@ -1,6 +1,7 @@
 from nose.tools import with_setup, nottest
 
 from tests.test_base import TestBase
+from ProbPy import Factor
 
 
 class TestFactorMult(TestBase):
@@ -221,3 +222,17 @@ class TestFactorMult(TestBase):
                               32, 64, 96, 128,
                               160, 192, 224, 256]
         # fmt: on
+
+    def mult_test_15(self):
+        """
+        Results are made without the checks of the constructor
+        """
+
+        res = Factor.fromTrusted([self.X, self.Y], [1, 2, 3, 4])
+        assert res == self.XY_factor
+        assert res.var_ids == (self.X.id, self.Y.id)
+
+        res = self.XY_factor * self.XZ_factor
+        assert type(res) == Factor
+        assert res.var_ids == (self.X.id, self.Y.id, self.Z.id)
+        assert res.values == [5, 12, 15, 24, 7, 16, 21, 32]
@@ -0,0 +1,139 @@
+from nose.tools import with_setup, nottest
+from nose.plugins.skip import SkipTest
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor
+
+try:
+    import numpy
+except ImportError:
+    raise SkipTest("NumPy is not installed")
+
+
+class TestFactorNumpy(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.factors = [
+            self.scalarf,
+            self.X_factor,
+            self.Y_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.ZW_factor,
+            self.XYZ_factor,
+            self.XYW_factor,
+            self.XKW_factor,
+            self.TKW_factor,
+        ]
+
+        self.np_factors = [i.toStorage("numpy") for i in self.factors]
+
+    def numpy_test_0(self):
+        """
+        Storage of values
+        """
+
+        for i, fac in enumerate(self.np_factors):
+            assert fac.getStorage() == "numpy"
+            assert type(fac.values) == numpy.ndarray
+            assert fac.values.tolist() == self.factors[i].values
+            assert self.factors[i].getStorage() == "list"
+
+            res = fac.toStorage("list")
+            assert res.getStorage() == "list"
+            assert res.values == self.factors[i].values
+
+    def numpy_test_1(self):
+        """
+        Factor with ndarray values
+        """
+
+        values = numpy.array([[1, 2], [3, 4]])
+        res = Factor([self.X, self.Y], values)
+
+        assert res.getStorage() == "numpy"
+        assert res.values.tolist() == [1, 2, 3, 4]
+
+        res = Factor([self.X, self.Y], [1, 2, 3, 4], storage="numpy")
+        assert res.getStorage() == "numpy"
+        assert res.values.tolist() == [1, 2, 3, 4]
+
+    def numpy_test_2(self):
+        """
+        mult, div, add and sub between every pair of factors
+        """
+
+        ops = [Factor.mult, Factor.div, Factor.add, Factor.sub]
+
+        for op in ops:
+            for i, fac1 in enumerate(self.factors):
+                for j, fac2 in enumerate(self.factors):
+                    res = op(fac1, fac2)
+                    np_res = op(self.np_factors[i], self.np_factors[j])
+                    mixed_res = op(fac1, self.np_factors[j])
+
+                    for k in [np_res, mixed_res]:
+                        assert k.getStorage() == "numpy"
+                        assert k.rand_vars == res.rand_vars
+                        assert k.values.tolist() == res.values
+
+    def numpy_test_3(self):
+        """
+        Scalar operations and maps
+        """
+
+        np_XY = self.XY_factor.toStorage("numpy")
+
+        res = np_XY * self.scalar
+        assert res.getStorage() == "numpy"
+        assert res.values.tolist() == [10, 20, 30, 40]
+
+        res = np_XY.pow(2)
+        assert res.values.tolist() == [1, 4, 9, 16]
+
+        res = np_XY.log(2).exp(2)
+        assert res.getStorage() == "numpy"
+        for i, val in enumerate(res.values):
+            assert abs(val - self.XY_factor.values[i]) < 1e-9
+
+    def numpy_test_4(self):
+        """
+        Other operations keep the storage
+        """
+
+        np_XYZ = self.XYZ_factor.toStorage("numpy")
+
+        res = np_XYZ.marginal([self.X, self.Z])
+        assert res.getStorage() == "numpy"
+        assert res.values.tolist() == self.XYZ_factor.marginal([self.X, self.Z]).values
+
+        res = np_XYZ.instVar(self.Y, "F")
+        assert res.getStorage() == "numpy"
+        assert res.values.tolist() == self.XYZ_factor.instVar(self.Y, "F").values
+
+        assert np_XYZ == self.XYZ_factor
+
+    def numpy_test_5(self):
+        """
+        Marginal and normalize for every subset of variables
+        """
+
+        for fac in self.factors:
+            np_fac = fac.toStorage("numpy")
+            num = len(fac.rand_vars)
+
+            for mask in range(2 ** num):
+                sub = [j for i, j in enumerate(fac.rand_vars) if mask & (1 << i)]
+
+                res = fac.marginal(sub)
+                np_res = np_fac.marginal(sub)
+                assert np_res.getStorage() == "numpy"
+                assert np_res.rand_vars == res.rand_vars
+                assert np_res.values.tolist() == res.values
+
+                res = fac.normalize(sub)
+                np_res = np_fac.normalize(sub)
+                assert np_res.rand_vars == res.rand_vars
+                for i, val in enumerate(np_res.values):
+                    assert abs(val - res.values[i]) < 1e-9
@@ -0,0 +1,120 @@
+from nose.tools import with_setup, nottest, assert_raises
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, SparseFactor, ContractionPlan, ContractionPlanEx
+
+
+class TestFactorProduct(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.factor_lists = [
+            [self.X_factor],
+            [self.XY_factor, self.XZ_factor],
+            [self.Z_factor, self.XY_factor, self.ZW_factor],
+            [self.XYZ_factor, self.XKW_factor, self.TKW_factor, self.Y_factor],
+            [self.scalarf, self.XYW_factor, self.ZW_factor, self.XZ_factor],
+        ]
+
+    def checkProduct(self, factors, optimize):
+        """
+        Compares the product with the product from left to right, followed by
+        the marginal, for every subset of the variables
+        """
+
+        prod = factors[0]
+        for i in factors[1:]:
+            prod = prod * i
+
+        num = len(prod.rand_vars)
+        for mask in range(2 ** num):
+            keep = [j for i, j in enumerate(prod.rand_vars) if mask & (1 << i)]
+
+            res = Factor.product(factors, keep=keep, optimize=optimize)
+            marg = prod.marginal(keep)
+
+            assert res.rand_vars == marg.rand_vars
+            assert res.values == marg.values
+
+        res = Factor.product(factors, optimize=optimize)
+        assert res.rand_vars == prod.rand_vars and res.values == prod.values
+
+    def product_test_0(self):
+        """
+        Greedy plans
+        """
+
+        for i in self.factor_lists:
+            self.checkProduct(i, "greedy")
+
+    def product_test_1(self):
+        """
+        Optimal plans
+        """
+
+        for i in self.factor_lists:
+            self.checkProduct(i, "optimal")
+
+    def product_test_2(self):
+        """
+        The plan avoids the big intermediate of the left to right order
+        """
+
+        A = RandVar("A", 10)
+        B = RandVar("B", 10)
+        C = RandVar("C", 10)
+        D = RandVar("D", 10)
+
+        factors = [Factor([A, B]), Factor([C, D]), Factor([B, C])]
+
+        for optimize in ["greedy", "optimal"]:
+            plan = ContractionPlan(factors, keep=[A, D], optimize=optimize)
+            assert plan.max_size == 100
+            assert plan.flops == 4000
+            assert len(plan.steps) == 2
+
+        plan = ContractionPlan(factors, optimize="greedy")
+        assert plan.max_size == 10000
+
+        assert_raises(ContractionPlanEx, ContractionPlan, factors, None, "other")
+
+    def product_test_3(self):
+        """
+        Plans use the ids of the variables, the product of no factors is the
+        unit factor, and the product of one factor is a copy of it
+        """
+
+        factors = [self.XY_factor, self.XZ_factor]
+        plan = ContractionPlan(factors, keep=self.Z)
+        assert plan.steps[-1][2] == frozenset([self.Z.id])
+        assert set(plan.sizes) == {self.X.id, self.Y.id, self.Z.id}
+
+        res = Factor.product([])
+        assert res.rand_vars == [] and res.values == [1]
+        res = Factor.product([], keep=self.X)
+        assert res.rand_vars == [] and res.values == [1]
+
+        res = Factor.product([self.XY_factor])
+        assert res is not self.XY_factor
+        res *= 10
+        assert self.XY_factor.values == self.XY_domain
+
+    def reorder_test_0(self):
+        """
+        Reorder the variables of f(X, Y, Z)
+        """
+
+        res = self.XYZ_factor.reorder([self.Z, self.X, self.Y])
+        assert res.rand_vars == [self.Z, self.X, self.Y]
+        assert res.values == [1, 5, 2, 6, 3, 7, 4, 8]
+
+        res = res.reorder([self.X, self.Y, self.Z])
+        assert res.values == self.XYZ_factor.values
+
+        # The same order gives a copy, and in place operations on it don't
+        # change the factor
+        for fac in [self.XYZ_factor, SparseFactor(factor=self.XYZ_factor)]:
+            res = fac.reorder(fac.rand_vars)
+            assert res is not fac
+            res *= 10
+            assert fac.values == self.XYZ_domain
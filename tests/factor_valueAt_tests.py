@@ -0,0 +1,89 @@
+from nose.tools import with_setup, nottest
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, SparseFactor, Event, RandVarValueEx
+from ProbPy.factor import FactorRandVarsEx, numpy
+
+import itertools
+
+
+class TestFactorValueAt(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.A = RandVar("A", ["a0", "a1"])
+        self.B = RandVar("B", ["b0", "b1", "b2"])
+        self.C = RandVar("C", ["c0", "c1", "c2", "c3"])
+        self.ABC_factor = Factor([self.A, self.B, self.C], list(range(24)))
+
+    def assignments(self, factor):
+        """
+        Every assignment of the variables of factor, in the order of the
+        values
+        """
+
+        domains = [i.domain for i in reversed(factor.rand_vars)]
+        return [tuple(reversed(i)) for i in itertools.product(*domains)]
+
+    def valueAt_test_0(self):
+        """
+        Value of every assignment, with tuples, events and lists of pairs
+        """
+
+        factors = [self.ABC_factor, SparseFactor(factor=self.ABC_factor)]
+        if numpy is not None:
+            factors.append(self.ABC_factor.toStorage("numpy"))
+
+        for fac in factors:
+            for i, inst in enumerate(self.assignments(fac)):
+                pairs = list(zip(fac.rand_vars, inst))
+
+                assert fac[inst] == i
+                assert fac.valueAt(inst) == i
+                assert fac.valueAt(Event(pairs)) == i
+                assert fac.valueAt(list(reversed(pairs)) + [(self.W, "T")]) == i
+
+    def valueAt_test_1(self):
+        """
+        Values of a batch of assignments
+        """
+
+        assignments = self.assignments(self.ABC_factor)
+        batch = assignments[::-1] + assignments[:5]
+        expected = list(range(24))[::-1] + list(range(5))
+
+        assert self.ABC_factor.valuesAt(batch) == expected
+        assert SparseFactor(factor=self.ABC_factor).valuesAt(batch) == expected
+        assert self.ABC_factor.valuesAt([]) == []
+        assert self.scalarf.valuesAt([(), ()]) == [10, 10]
+
+        if numpy is not None:
+            res = self.ABC_factor.toStorage("numpy").valuesAt(batch)
+            assert res.tolist() == expected
+
+    def valueAt_test_2(self):
+        """
+        Missing variables and values not in the domain raise exceptions
+        """
+
+        bad = [
+            ("a0", "b0"),
+            [(self.A, "a0"), (self.B, "b0")],
+            ("a0", "b0", "c9"),
+        ]
+
+        for inst in bad:
+            try:
+                self.ABC_factor.valueAt(inst)
+                assert False
+            except (FactorRandVarsEx, RandVarValueEx):
+                pass
+
+        try:
+            self.ABC_factor.valuesAt([("a0", "b0")])
+            assert False
+        except FactorRandVarsEx:
+            pass
+
+        # Integers are still flat indexes
+        assert self.ABC_factor[5] == 5
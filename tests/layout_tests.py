@@ -0,0 +1,206 @@
+from nose.tools import with_setup, nottest
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor
+from ProbPy.layout import LayoutCache, factor_op_layouts, layoutSignature
+from ProbPy.layout import stridedIndexes, stridedSlice
+from ProbPy.layout import VarLayout, VarLayoutEx, VarLayoutLengthEx
+from ProbPy.factor import numpy
+
+
+class TestLayout(TestBase):
+    def __init__(self):
+        super().__init__()
+
+    def size(self, rand_vars):
+        """
+        Number of values of a factor with the variables rand_vars
+        """
+
+        res = 1
+        for i in rand_vars:
+            res *= len(i.domain)
+        return res
+
+    def layout_test_0(self):
+        """
+        Layout of f(X, Y) f(X, Z)
+        """
+
+        cache = LayoutCache()
+        layout = cache.get(self.XY_factor.rand_vars, self.XZ_factor.rand_vars)
+
+        res = layout.resRandVars(self.XY_factor.rand_vars, self.XZ_factor.rand_vars)
+        assert res == [self.X, self.Y, self.Z]
+        assert layout.res_size == 8
+        assert layout.getGather() == [0, 1, 0, 1, 2, 3, 2, 3]
+
+    def layout_test_1(self):
+        """
+        Layouts are reused and the least recently used one is removed
+        """
+
+        cache = LayoutCache(max_size=2)
+
+        l1 = cache.get([self.X], [self.Y])
+        l2 = cache.get([self.X], [self.Z])
+        assert cache.get([self.X], [self.Y]) is l1
+
+        cache.get([self.Y], [self.Z])
+        assert len(cache) == 2
+        assert cache.get([self.X], [self.Y]) is l1
+        assert cache.get([self.X], [self.Z]) is not l2
+
+        cache.setMaxSize(1)
+        assert len(cache) == 1
+
+        cache.clear()
+        assert len(cache) == 0
+
+    def layout_test_6(self):
+        """
+        The gather indexes kept by the cache stay under max_gather_total, and
+        the ones of the least recently used layouts are dropped
+        """
+
+        cache = LayoutCache(max_gather_size=64, max_gather_total=100)
+        A = RandVar("A8", 8)
+        C = RandVar("C16", 16)
+
+        # Results with 32 values, each gathered once
+        layouts = []
+        for i in range(5):
+            var = RandVar("V%d" % i, 4)
+            layout = cache.get([A, var], [var])
+            layouts.append(layout)
+
+            assert cache.getGather(layout) == layout.getGather()
+            assert cache.gatherTotal() <= 100
+            assert layout.gather is not None
+
+        assert cache.gatherTotal() == 96
+        assert layouts[1].gather is None and layouts[2].gather is not None
+
+        # Results bigger than max_gather_size are not kept
+        layout = cache.get([A, C], [C])
+        assert len(cache.getGather(layout)) == 128
+        assert layout.gather is None and cache.gatherTotal() == 96
+
+    def layout_test_2(self):
+        """
+        Cached layouts only depend on names and domain sizes
+        """
+
+        X = RandVar("X", ["a", "b"])
+        Y = RandVar("Y", ["a", "b"])
+        Y3 = RandVar("Y", ["a", "b", "c"])
+
+        assert layoutSignature([X, Y]) == layoutSignature([self.X, self.Y])
+        assert layoutSignature([X, Y]) != layoutSignature([X, Y3])
+
+        factor_op_layouts.clear()
+        res1 = self.XY_factor * self.XZ_factor
+        res2 = Factor([X, Y], self.XY_domain) * self.XZ_factor
+        res3 = Factor([X, Y3], list(range(6))) * self.XZ_factor
+
+        assert res1.values == res2.values
+        assert res2.rand_vars[0] is X and res2.rand_vars[1] is Y
+        assert res3.values == [0, 6, 10, 18, 20, 30, 0, 8, 14, 24, 28, 40]
+
+    def layout_test_3(self):
+        """
+        Kinds of layouts, and operations of every kind with different domain
+        sizes, compared with the gather indexes
+        """
+
+        X = self.X
+        Y = RandVar("Y3", ["a", "b", "c"])
+        Z = RandVar("Z4", ["a", "b", "c", "d"])
+
+        kinds = [
+            ([X, Y], [X, Y], "same"),
+            ([X, Y, Z], [X, Y], "prefix"),
+            ([X], [X, Y, Z], "extend"),
+            ([X, Y], [Z], "disjoint"),
+            ([Z], [X, Y], "disjoint"),
+            ([X, Y], [Y, X], "general"),
+            ([X, Y, Z], [Y], "general"),
+        ]
+
+        cache = LayoutCache()
+        for rand_vars1, rand_vars2, kind in kinds:
+            layout = cache.get(rand_vars1, rand_vars2)
+            assert layout.kind == kind
+
+            size1 = self.size(rand_vars1)
+            fac1 = Factor(rand_vars1, list(range(1, size1 + 1)))
+            fac2 = Factor(rand_vars2, list(range(2, self.size(rand_vars2) + 2)))
+
+            gather = layout.getGather()
+            expected = [
+                fac1.values[i % len(fac1.values)] * fac2.values[j]
+                for i, j in enumerate(gather)
+            ]
+            assert (fac1 * fac2).values == expected
+
+    def layout_test_4(self):
+        """
+        Encoding and decoding of batches of assignments
+        """
+
+        Y = RandVar("Y3", ["a", "b", "c"])
+        Z = RandVar("Z4", ["a", "b", "c", "d"])
+        layout = VarLayout([self.X, Y, Z])
+
+        indexes = list(range(layout.size))
+        columns = layout.decode(indexes)
+        assert columns[0] == [i % 2 for i in indexes]
+        assert columns[1] == [i // 2 % 3 for i in indexes]
+        assert columns[2] == [i // 6 for i in indexes]
+        assert layout.encode(columns) == indexes
+
+        values = layout.decodeValues([0, 23, 7])
+        assert values == [["T", "F", "F"], ["a", "c", "a"], ["a", "d", "b"]]
+        assert layout.encodeValues(values) == [0, 23, 7]
+
+        assert VarLayout([]).encode([], 3) == [0, 0, 0]
+
+        try:
+            layout.encode(columns[:2])
+            assert False
+        except VarLayoutEx:
+            pass
+
+        # Columns of different lengths
+        for short in [columns[:2] + [columns[2][:-1]], [columns[0][:5]] + columns[1:]]:
+            try:
+                layout.encode(short)
+                assert False
+            except VarLayoutLengthEx:
+                pass
+
+        if numpy is not None:
+            columns = layout.decode(numpy.array(indexes))
+            assert columns[1].tolist() == [i // 2 % 3 for i in indexes]
+            assert layout.encode(columns).tolist() == indexes
+
+            try:
+                layout.encode([columns[0], columns[1][:-1], columns[2]])
+                assert False
+            except VarLayoutLengthEx:
+                pass
+
+    def layout_test_5(self):
+        """
+        Slices of strided indexes
+        """
+
+        dims = [2, 3, 4]
+        for strides in [[1, 2, 6], [12, 0, 3], [0, 0, 0]]:
+            indexes = stridedIndexes(dims, strides)
+            for begin in range(len(indexes) + 1):
+                for end in range(begin, len(indexes) + 1):
+                    res = stridedSlice(dims, strides, begin, end)
+                    assert res == indexes[begin:end]
+
+        assert stridedSlice([], [], 0, 1) == [0]
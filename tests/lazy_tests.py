@@ -0,0 +1,115 @@
+from nose.tools import with_setup, nottest, assert_almost_equal
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, LazyFactor, LogFactor
+from ProbPy.factor import numpy
+
+
+class TestLazyFactor(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.factors = [
+            self.scalarf,
+            self.X_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.XYZ_factor,
+            self.XKW_factor,
+        ]
+
+    def checkValues(self, res, factor):
+        """
+        Checks that res has the same variables and values as factor
+        """
+
+        assert res.rand_vars == factor.rand_vars
+        for i, val in enumerate(res.values):
+            assert_almost_equal(val, factor.values[i])
+
+    def lazy_test_0(self):
+        """
+        Element wise operations between every pair of factors
+        """
+
+        for fac1 in self.factors:
+            for fac2 in self.factors:
+                lazy = LazyFactor(fac1)
+
+                self.checkValues((lazy * fac2).evaluate(), fac1 * fac2)
+                self.checkValues((lazy / fac2).evaluate(), fac1 / fac2)
+                self.checkValues((lazy + fac2).evaluate(), fac1 + fac2)
+                self.checkValues((lazy - fac2).evaluate(), fac1 - fac2)
+
+                res = ((lazy * fac2).log(2) + 1).pow(0.5).exp(2).exp()
+                self.checkValues(
+                    res.evaluate(), ((fac1 * fac2).log(2) + 1).pow(0.5).exp(2).exp()
+                )
+
+                res = (lazy - LazyFactor(fac2) * fac1).map(abs)
+                self.checkValues(res.evaluate(), (fac1 - fac2 * fac1).map(abs))
+
+    def lazy_test_1(self):
+        """
+        Marginal and normalize of products
+        """
+
+        for fac1 in self.factors:
+            for fac2 in self.factors:
+                prod = fac1 * fac2
+                num = len(prod.rand_vars)
+
+                for mask in range(2 ** num):
+                    sub = [k for j, k in enumerate(prod.rand_vars) if mask & (1 << j)]
+
+                    res = (LazyFactor(fac1) * fac2).marginal(sub).pow(2)
+                    self.checkValues(res.evaluate(), prod.marginal(sub).pow(2))
+
+                    res = (LazyFactor(fac1) * fac2).normalize(sub)
+                    self.checkValues(res.evaluate(), prod.normalize(sub))
+
+    def lazy_test_2(self):
+        """
+        Chains are fused, without making the intermediate factors
+        """
+
+        mult = Factor.mult
+        marginal = Factor.marginal
+
+        def fail(*args):
+            raise AssertionError("Intermediate factor")
+
+        expr = (LazyFactor(self.XY_factor) * self.XZ_factor).log(2).marginal(self.X)
+        expr = expr.exp(2) / (LazyFactor(self.X_factor) + 1)
+
+        try:
+            Factor.mult = fail
+            Factor.marginal = fail
+            res = expr.evaluate()
+        finally:
+            Factor.mult = mult
+            Factor.marginal = marginal
+
+        fac = (self.XY_factor * self.XZ_factor).log(2).marginal(self.X)
+        self.checkValues(res, fac.exp(2) / (self.X_factor + 1))
+
+    def lazy_test_3(self):
+        """
+        Storage and class of the operands are kept
+        """
+
+        fac = self.XY_factor.toStorage("array")
+        res = (LazyFactor(fac) * self.XZ_factor).marginal(self.X).evaluate()
+        assert res.getStorage() == "array"
+        self.checkValues(res, (self.XY_factor * self.XZ_factor).marginal(self.X))
+
+        log_fac = LogFactor(factor=self.XY_factor)
+        res = (LazyFactor(log_fac) * log_fac).marginal(self.X).evaluate()
+        assert isinstance(res, LogFactor)
+        self.checkValues(res, (log_fac * log_fac).marginal(self.X))
+
+        if numpy is not None:
+            fac = self.XY_factor.toStorage("numpy")
+            res = (LazyFactor(fac) * self.XZ_factor).normalize(self.X).evaluate()
+            assert res.getStorage() == "numpy"
+            self.checkValues(res, (self.XY_factor * self.XZ_factor).normalize(self.X))
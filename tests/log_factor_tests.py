@@ -0,0 +1,151 @@
+from nose.tools import with_setup, nottest, assert_raises, assert_almost_equal
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, LogFactor, LogFactorEx, SparseFactor, ParFactor
+from ProbPy.factor import numpy
+
+import math
+
+
+class TestLogFactor(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.factors = [
+            self.X_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.XYZ_factor,
+            self.XKW_factor,
+        ]
+
+        self.storages = ["list"] if numpy is None else ["list", "numpy"]
+
+    def checkValues(self, log_factor, factor):
+        """
+        Checks that log_factor represents factor
+        """
+
+        res = log_factor.toFactor()
+        assert res.rand_vars == factor.rand_vars
+
+        for i, val in enumerate(res.values):
+            assert_almost_equal(val, factor.values[i])
+
+    def log_factor_test_0(self):
+        """
+        Conversion to and from log space
+        """
+
+        for storage in self.storages:
+            fac = self.XY_factor.toStorage(storage)
+            log_fac = LogFactor(factor=fac)
+
+            assert isinstance(log_fac, LogFactor)
+            assert log_fac.getStorage() == storage
+            assert_almost_equal(log_fac.values[2], math.log(3))
+            self.checkValues(log_fac, self.XY_factor)
+
+            zero = LogFactor(factor=Factor(self.X, [0, 1]).toStorage(storage))
+            assert zero.values[0] == -math.inf
+            assert list(zero.toFactor().values) == [0, 1]
+
+    def log_factor_test_1(self):
+        """
+        mult, div, add, sub and scalars
+        """
+
+        for storage in self.storages:
+            for fac1 in self.factors:
+                for fac2 in self.factors:
+                    log1 = LogFactor(factor=fac1.toStorage(storage))
+                    log2 = LogFactor(factor=fac2)
+
+                    self.checkValues(log1 * log2, fac1 * fac2)
+                    self.checkValues(log1 / log2, fac1 / fac2)
+                    self.checkValues(log1 + log2, fac1 + fac2)
+
+                    res = log1 * log2 * 3
+                    assert isinstance(res, LogFactor)
+                    self.checkValues(res, fac1 * fac2 * 3)
+
+            log_fac = LogFactor(factor=Factor(self.X, [5, 3]).toStorage(storage))
+            self.checkValues(
+                log_fac - LogFactor(factor=self.X_factor), Factor(self.X, [4, 1])
+            )
+            self.checkValues(log_fac - log_fac, Factor(self.X, [0, 0]))
+
+    def log_factor_test_2(self):
+        """
+        marginal, normalize, instVar and pow
+        """
+
+        for storage in self.storages:
+            log_fac = LogFactor(factor=self.XYZ_factor.toStorage(storage))
+
+            for sub in [[], [self.X], [self.Y, self.Z], [self.X, self.Z]]:
+                res = log_fac.marginal(sub)
+                assert isinstance(res, LogFactor)
+                self.checkValues(res, self.XYZ_factor.marginal(sub))
+
+                res = log_fac.normalize(sub)
+                self.checkValues(res, self.XYZ_factor.normalize(sub))
+
+            res = log_fac.instVar(self.Y, "F")
+            assert isinstance(res, LogFactor)
+            self.checkValues(res, self.XYZ_factor.instVar(self.Y, "F"))
+
+            self.checkValues(log_fac.pow(2), self.XYZ_factor.pow(2))
+
+            res = log_fac.multMarginal(LogFactor(factor=self.XY_factor), self.Z)
+            self.checkValues(res, self.XYZ_factor.multMarginal(self.XY_factor, self.Z))
+
+    def log_factor_test_3(self):
+        """
+        Long products don't underflow
+        """
+
+        fac = Factor(self.X, [1e-200, 2e-200])
+        log_fac = LogFactor(factor=fac)
+
+        lin = fac
+        log_res = log_fac
+        for i in range(5):
+            lin = lin * fac
+            log_res = log_res * log_fac
+
+        assert lin.values == [0.0, 0.0]
+
+        res = log_res.normalize().toFactor()
+        assert_almost_equal(res.values[0], 1 / 65)
+        assert_almost_equal(res.values[1], 64 / 65)
+
+        res = log_res.marginal([])
+        assert_almost_equal(res.values[0], math.log(65) - 1200 * math.log(10))
+
+    def log_factor_test_4(self):
+        """
+        LogFactors and Factors can't be mixed
+        """
+
+        log_fac = LogFactor(factor=self.X_factor)
+        assert_raises(LogFactorEx, log_fac.mult, self.X_factor)
+
+    def log_factor_test_5(self):
+        """
+        Factors in linear space can't be used with a LogFactor either
+        """
+
+        log_fac = LogFactor(factor=self.X_factor)
+        fac = self.XY_factor.copy()
+
+        assert_raises(LogFactorEx, fac.mult, log_fac)
+        assert_raises(LogFactorEx, fac.__mul__, log_fac)
+        assert_raises(LogFactorEx, fac.div, log_fac)
+        assert_raises(LogFactorEx, fac.multMarginal, log_fac, self.X)
+        assert_raises(LogFactorEx, fac.__imul__, log_fac)
+        assert fac.values == self.XY_factor.values
+
+        sparse = SparseFactor(factor=self.XY_factor)
+        assert_raises(LogFactorEx, sparse.mult, log_fac)
+        assert_raises(LogFactorEx, ParFactor(factor=fac).mult, log_fac)
@@ -0,0 +1,125 @@
+from nose.tools import with_setup, nottest
+
+from tests.par_test_base import ParTestBase, test_pool
+from ProbPy import RandVar, Factor, ParFactor
+
+import math
+
+
+class TestParFactorOps(ParTestBase):
+    def __init__(self):
+        super().__init__()
+
+        self.XYZ_par_factor.setMaxDepth(2)
+
+    def check(self, res, par_res):
+        """
+        Compares the result of an operation on Factor objects with the result
+        on ParFactor objects, which should keep the settings of the operands
+        """
+
+        assert type(par_res) == ParFactor
+        assert par_res.pool is test_pool and par_res.max_depth == 2
+        assert res.rand_vars == par_res.rand_vars
+        for i, j in zip(res.values, par_res.values):
+            assert math.isclose(i, j)
+
+    def par_ops_test_0(self):
+        """
+        Operations with factors and scalars
+        """
+
+        fac = self.XYZ_factor
+        par = self.XYZ_par_factor
+
+        self.check(fac * self.XKW_factor, par * self.XKW_par_factor)
+        self.check(fac / self.XKW_factor, par / self.XKW_par_factor)
+        self.check(fac * self.scalar, par * self.scalar)
+        self.check(fac - self.scalarf, par - self.par_scalarf)
+        self.check(fac * self.XKW_factor * fac, par * self.XKW_par_factor * par)
+
+    def par_ops_test_1(self):
+        """
+        Map, log, exp and pow
+        """
+
+        fac = self.XYZ_factor
+        par = self.XYZ_par_factor
+
+        self.check(fac.log(2), par.log(2))
+        self.check(fac.exp(), par.exp())
+        self.check(fac.exp(2), par.exp(2))
+        self.check(fac.pow(3), par.pow(3))
+        self.check(fac.map(abs), par.map(abs))
+        self.check(fac.map(lambda x: -x), par.map(lambda x: -x))
+
+    def par_ops_test_2(self):
+        """
+        Normalize, marginal and multMarginal
+        """
+
+        fac = self.XYZ_factor
+        par = self.XYZ_par_factor
+
+        self.check(fac.normalize(), par.normalize())
+        self.check(fac.normalize(self.Y), par.normalize(self.Y))
+        self.check(fac.marginal([self.X, self.Z]), par.marginal([self.X, self.Z]))
+
+        res = fac.multMarginal(self.XKW_factor, [self.Y, self.K])
+        par_res = par.multMarginal(self.XKW_par_factor, [self.Y, self.K])
+        self.check(res, par_res)
+
+    def par_ops_test_3(self):
+        """
+        Instantiation and reordering of variables
+        """
+
+        fac = self.XYZ_factor
+        par = self.XYZ_par_factor
+
+        self.check(fac.instVar(self.Y, "F"), par.instVar(self.Y, "F"))
+        self.check(
+            fac.instVar([(self.X, "F"), (self.Z, "T")]),
+            par.instVar([(self.X, "F"), (self.Z, "T")]),
+        )
+        self.check(fac, par.instVar(self.W, "T"))
+        assert par.instVar(self.Y, "Maybe") is None
+
+        self.check(
+            fac.reorder([self.Z, self.X, self.Y]), par.reorder([self.Z, self.X, self.Y])
+        )
+
+    def par_ops_test_4(self):
+        """
+        Max, min, argmax, argmin, expected value and euclidean distance
+        """
+
+        values = [3, 9, 1, 9, 0, 5, 0, 2]
+        fac = Factor([self.X, self.Y, self.Z], values)
+        par = ParFactor(factor=fac, pool=test_pool)
+
+        assert par.max() == 9 and par.min() == 0
+        assert par.argmax() == fac.argmax()
+        assert par.argmin() == fac.argmin()
+
+        par_xy = ParFactor(factor=self.XY_dist, pool=test_pool)
+        res = self.XY_dist.expectedValue(self.xy_ev)
+        assert math.isclose(par_xy.expectedValue(self.xy_ev), res)
+
+        res = fac.euclideanDist(self.XYZ_factor)
+        assert math.isclose(par.euclideanDist(self.XYZ_factor), res)
+
+    def par_ops_test_5(self):
+        """
+        In place operations write the results in the values of the factor
+        """
+
+        par = self.XYZ_par_factor.copy()
+        values = par.values
+
+        par *= self.XZ_par_factor
+        par.mapInPlace(abs)
+        par.normalizeInPlace()
+
+        assert par.values is values
+        self.check(self.XYZ_factor.mult(self.XZ_factor).normalize(), par)
@@ -1,7 +1,22 @@
 from nose.tools import with_setup, nottest
 
-from tests.par_test_base import ParTestBase
-from ProbPy import RandVar, Factor, ParFactor
+from tests.par_test_base import ParTestBase, test_pool
+from ProbPy import RandVar, Factor, ParFactor, ParPool, SharedValues
+from ProbPy import registerOperation, getOperation, OperationEx
+from ProbPy.par_factor import splitRange
+from ProbPy import par_factor
+
+import math
+import operator
+import pickle
+
+
+def hellingerTerm(x, y):
+    return (math.sqrt(x) - math.sqrt(y)) ** 2
+
+
+def registerNeg():
+    registerOperation("test_neg", lambda x: -x)
 
 
 class TestFactorMult(ParTestBase):
@@ -242,3 +257,264 @@ class TestFactorMult(ParTestBase):
             res = self.XYZ_factor.mult(self.TKW_factor)
             par_res = self.XYZ_par_factor.mult(self.TKW_par_factor)
             assert res.rand_vars == par_res.rand_vars and res.values == par_res.values
+
+    def par_test_15(self):
+        """
+        Pool started by a context manager, used by many operations, shut down
+        and started again when needed
+        """
+
+        with ParPool(processes=2, min_size=0) as pool:
+            pool.warmUp()
+            assert pool.running()
+
+            fac = ParFactor(factor=self.XYZ_factor, max_depth=1, pool=pool)
+            for i in range(3):
+                res = fac.mult(self.XKW_par_factor)
+                assert res.values == self.XYZ_factor.mult(self.XKW_factor).values
+
+        assert not pool.running()
+
+        res = fac.marginal(self.X)
+        assert res.values == self.XYZ_factor.marginal(self.X).values
+        assert pool.running()
+        pool.shutdown()
+
+    def par_test_16(self):
+        """
+        Operations done without the workers, because the result is small or
+        the function can't be pickled
+        """
+
+        pool = ParPool(processes=2)
+        fac = ParFactor(factor=self.XYZ_factor, pool=pool)
+
+        res = fac.mult(self.XKW_par_factor)
+        assert res.values == self.XYZ_factor.mult(self.XKW_factor).values
+        assert type(res) == ParFactor
+
+        pool.min_size = 0
+        res = fac.factorOp(self.XKW_par_factor, lambda x, y: x * y)
+        assert res.values == self.XYZ_factor.mult(self.XKW_factor).values
+        assert not pool.running()
+
+    def par_test_17(self):
+        """
+        Shared values are mapped by unpickled copies, without copying the
+        values, and removed when closed
+        """
+
+        with SharedValues.fromValues([0.25, 1, 2.5]) as shared:
+            copy = pickle.loads(pickle.dumps(shared))
+            copy.write(1, [4])
+            assert shared.tolist() == [0.25, 4.0, 2.5]
+            copy.close()
+
+            assert len(pickle.dumps(shared)) < 200
+
+        try:
+            SharedValues(3, shared.shm.name)
+            assert False
+        except FileNotFoundError:
+            pass
+
+    def par_test_18(self):
+        """
+        Values that can't be kept in shared memory are calculated without the
+        workers
+        """
+
+        big = 10 ** 400
+        fac = ParFactor(self.X, [big, 1], pool=test_pool)
+        res = fac.factorOp(self.X_factor, operator.add)
+        assert res.values == [
+            big + self.X_factor.values[0],
+            1 + self.X_factor.values[1],
+        ]
+
+        res = ParFactor(factor=self.XY_factor.mult(big), pool=test_pool).marginal(
+            self.X
+        )
+        assert res.values == self.XY_factor.mult(big).marginal(self.X).values
+
+    def par_test_19(self):
+        """
+        Values divided in chunks by the number of workers and the size of the
+        chunks, not by the domains of the variables
+        """
+
+        pool = ParPool(processes=4, chunk_size=100)
+        assert pool.numChunks(10) == 4
+        assert pool.numChunks(1000) == 10
+        assert pool.numChunks(1001) == 11
+        assert pool.numChunks(2) == 2
+        assert splitRange(10, 3) == [(0, 3), (3, 6), (6, 10)]
+
+        # Marginals with fewer values than chunks also divide the sums
+        for rand_vars in [[], [self.Y], [self.X, self.Z]]:
+            res = self.XYZ_par_factor.marginal(rand_vars)
+            assert res.values == self.XYZ_factor.marginal(rand_vars).values
+
+    def par_test_20(self):
+        """
+        Operations given by the name under which they are registered
+        """
+
+        assert getOperation("mul") is operator.mul
+        try:
+            getOperation("no_such_operation")
+            assert False
+        except OperationEx:
+            pass
+
+        res = self.XY_par_factor.factorOp(self.XZ_par_factor, "mul")
+        assert res.values == self.XY_factor.mult(self.XZ_factor).values
+        assert self.XY_factor.factorOp(self.XZ_factor, "mul").values == res.values
+
+        # Registering an operation restarts the workers, so they have it
+        test_pool.start()
+        workers = test_pool.pool
+        registerOperation("test_hellinger", hellingerTerm)
+        res = self.XY_par_factor.factorOp(self.XZ_par_factor, "test_hellinger")
+        assert test_pool.pool is not workers
+        assert (
+            res.values == self.XY_factor.factorOp(self.XZ_factor, hellingerTerm).values
+        )
+
+    def par_test_21(self):
+        """
+        Operations with workers started by spawn and forkserver, with a lambda
+        registered by the initializer of the pool
+        """
+
+        registerNeg()
+        registerOperation("test_hellinger", hellingerTerm)
+        fac = self.XYZ_factor
+
+        for context in ["spawn", "forkserver"]:
+            pool = ParPool(2, 0, 3, context=context, initializer=registerNeg)
+            with pool:
+                par = ParFactor(factor=fac, pool=pool)
+                par_xz = ParFactor(factor=self.XZ_factor, pool=pool)
+
+                assert par.useWorkers(len(fac.values), lambda x: x) is False
+                assert par.useWorkers(len(fac.values), getOperation("test_neg"))
+
+                assert (par * par_xz).values == (fac * self.XZ_factor).values
+                assert (par - 1).values == (fac - 1).values
+                assert par.map("test_neg").values == [-i for i in fac.values]
+
+                res = par.factorOp(par_xz, "test_hellinger")
+                assert res.values == fac.factorOp(self.XZ_factor, hellingerTerm).values
+
+    def par_test_22(self):
+        """
+        Without shared memory, before Python 3.8, operations are done in the
+        calling process
+        """
+
+        shared_memory = par_factor.shared_memory
+        par_factor.shared_memory = None
+
+        try:
+            par = self.XYZ_par_factor
+            assert not par.useWorkers(len(par.values))
+            assert par.shareValues([par]) is None
+
+            res = par.mult(self.XKW_par_factor).marginal([self.X, self.K])
+            fac = self.XYZ_factor.mult(self.XKW_factor).marginal([self.X, self.K])
+            assert type(res) == ParFactor
+            assert res.values == fac.values
+        finally:
+            par_factor.shared_memory = shared_memory
+
+    def par_test_23(self):
+        """
+        Integer values keep their type, and big integers are not rounded
+        """
+
+        res = self.XY_par_factor * self.XZ_par_factor
+        assert res.values == (self.XY_factor * self.XZ_factor).values
+        assert all(type(i) == int for i in res.values)
+
+        res = self.XYZ_par_factor.marginal(self.X)
+        assert all(type(i) == int for i in res.values)
+        assert all(type(i) == float for i in (self.XY_par_factor / 2).values)
+
+        # Integers of more than 53 bits, which doubles can't keep, and of
+        # more than 64 bits, which are calculated without the workers
+        for big in [2 ** 60 + 1, 2 ** 70 + 1]:
+            fac = ParFactor(self.X, [big, 3], pool=test_pool)
+            assert fac.mult(self.X_par_factor).values == [big, 6]
+            assert fac.add(1).values == [big + 1, 4]
+            assert fac.marginal([]).values == [big + 3]
+            assert fac.max() == big and fac.min() == 3
+
+        # Floats mixed with integers of more than 53 bits
+        fac = ParFactor(self.X, [2 ** 60 + 1, 0.5], pool=test_pool)
+        assert fac.mult(self.X_par_factor).values == [2 ** 60 + 1, 1.0]
+
+    def par_test_24(self):
+        """
+        Without fork, registered operations that can't be pickled and that
+        the initializer doesn't register are done in the calling process
+        """
+
+        registerNeg()
+        registerOperation("test_rsub", lambda x, y: y - x)
+        fac = self.XYZ_factor
+
+        with ParPool(2, 0, 3, context="spawn") as pool:
+            par = ParFactor(factor=fac, pool=pool)
+            assert not pool.hasOperation("test_neg")
+            assert pool.hasOperation("mul")
+            assert par.useWorkers(len(fac.values), getOperation("test_neg")) is False
+
+            assert par.map("test_neg").values == [-i for i in fac.values]
+            assert par.scalar(10, "test_rsub").values == [10 - i for i in fac.values]
+            res = par.factorOp(par, "test_rsub")
+            assert res.values == [0] * len(fac.values)
+            assert (par * 2).values == (fac * 2).values
+
+    def par_test_25(self):
+        """
+        Each factor keeps its values in its own segment, which the results of
+        the operations keep too, and which the in place operations drop
+        """
+
+        par = ParFactor(factor=self.XYZ_factor, pool=test_pool)
+        fac = self.XYZ_factor
+
+        shared = par.sharedValues()
+        res = par * self.XY_par_factor
+        assert par.sharedValues() is shared
+        assert res.shared[0] is res.values and res.shared[1] is not None
+        assert pickle.loads(pickle.dumps(res)).shared is None
+
+        # Layouts where the values of a factor are repeated, or the same
+        for other in [self.XY_factor, fac, self.XYW_factor]:
+            other_par = ParFactor(factor=other, pool=test_pool)
+            assert (par * other_par).values == (fac * other).values
+            assert (other_par * par).values == (other * fac).values
+
+        # Marginals whose variables are the first, the last, or others
+        for rand_vars in [[self.X, self.Y], [self.Y, self.Z], [self.X, self.Z], []]:
+            assert par.marginal(rand_vars).values == fac.marginal(rand_vars).values
+
+        # Gathers whose indexes are a regular progression, or not
+        assert par.instVar(self.X, "F").values == fac.instVar(self.X, "F").values
+        assert par.instVar(self.Z, "T").values == fac.instVar(self.Z, "T").values
+        order = [self.Z, self.X, self.Y]
+        assert par.reorder(order).values == fac.reorder(order).values
+
+        # In place operations drop the segment, and values that are replaced
+        # are shared again
+        par *= self.XY_par_factor
+        assert par.shared is None
+        assert (
+            par.marginal(self.X).values
+            == (fac * self.XY_factor).marginal(self.X).values
+        )
+
+        par.values = [1] * len(fac.values)
+        assert par.marginal([]).values == [len(fac.values)]
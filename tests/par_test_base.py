@@ -1,25 +1,30 @@
-from ProbPy import RandVar, ParFactor
+from ProbPy import RandVar, ParFactor, ParPool
 
 from tests.test_base import TestBase
 
 
+# Pool shared by the tests, which sends every operation to the workers, in
+# small chunks
+test_pool = ParPool(processes=2, min_size=0, chunk_size=3)
+
+
 class ParTestBase(TestBase):
     def __init__(self):
         super().__init__()
 
         # Scalars
-        self.par_scalarf = ParFactor(factor=self.scalarf)
+        self.par_scalarf = ParFactor(factor=self.scalarf, pool=test_pool)
 
         # Factors
-        self.X_par_factor = ParFactor(factor=self.X_factor)
-        self.Y_par_factor = ParFactor(factor=self.Y_factor)
-        self.Z_par_factor = ParFactor(factor=self.Z_factor)
-
-        self.XY_par_factor = ParFactor(factor=self.XY_factor)
-        self.XZ_par_factor = ParFactor(factor=self.XZ_factor)
-        self.ZW_par_factor = ParFactor(factor=self.ZW_factor)
-
-        self.XYZ_par_factor = ParFactor(factor=self.XYZ_factor)
-        self.XYW_par_factor = ParFactor(factor=self.XYW_factor)
-        self.XKW_par_factor = ParFactor(factor=self.XKW_factor)
-        self.TKW_par_factor = ParFactor(factor=self.TKW_factor)
+        self.X_par_factor = ParFactor(factor=self.X_factor, pool=test_pool)
+        self.Y_par_factor = ParFactor(factor=self.Y_factor, pool=test_pool)
+        self.Z_par_factor = ParFactor(factor=self.Z_factor, pool=test_pool)
+
+        self.XY_par_factor = ParFactor(factor=self.XY_factor, pool=test_pool)
+        self.XZ_par_factor = ParFactor(factor=self.XZ_factor, pool=test_pool)
+        self.ZW_par_factor = ParFactor(factor=self.ZW_factor, pool=test_pool)
+
+        self.XYZ_par_factor = ParFactor(factor=self.XYZ_factor, pool=test_pool)
+        self.XYW_par_factor = ParFactor(factor=self.XYW_factor, pool=test_pool)
+        self.XKW_par_factor = ParFactor(factor=self.XKW_factor, pool=test_pool)
+        self.TKW_par_factor = ParFactor(factor=self.TKW_factor, pool=test_pool)
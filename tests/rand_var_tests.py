@@ -0,0 +1,103 @@
+from nose.tools import with_setup, nottest
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, RandVarValueEx, Factor, Event
+from ProbPy import SparseFactor, ParFactor, LogFactor, BPMsg
+
+import copy
+import pickle
+
+
+class TestRandVar(TestBase):
+    def __init__(self):
+        super().__init__()
+
+    def rand_var_test_0(self):
+        """
+        Variables with the same name have the same id
+        """
+
+        assert self.X.id == RandVar("X", [1, 2, 3]).id
+        assert self.X.id != self.Y.id
+        assert RandVar(1).id != RandVar("1").id
+        assert type(self.X.id) == int
+
+    def rand_var_test_1(self):
+        """
+        Ids and positions of the variables of a factor
+        """
+
+        assert self.XYZ_factor.var_ids == (self.X.id, self.Y.id, self.Z.id)
+        assert self.XYZ_factor.var_pos[self.Z.id] == 2
+        assert self.XYZ_factor.varInFactor(RandVar("Y", ["T", "F"]))
+        assert not self.XYZ_factor.varInFactor(self.W)
+
+        res = self.XYZ_factor.instVar(self.Y, "T")
+        assert res.var_ids == (self.X.id, self.Z.id)
+
+        assert self.XY_factor.sameVariables(self.XYZ_factor)
+        assert not self.XY_factor.sameVariables(self.XZ_factor)
+
+    def rand_var_test_2(self):
+        """
+        Ids are kept valid when variables and factors are unpickled
+        """
+
+        var = pickle.loads(pickle.dumps(self.X))
+        assert var.id == self.X.id
+
+        res = pickle.loads(pickle.dumps(self.XY_factor))
+        assert res.var_ids == self.XY_factor.var_ids
+        assert res == self.XY_factor
+
+    def rand_var_test_3(self):
+        """
+        Frozen domain and the index of its values
+        """
+
+        var = RandVar("Big", 5000)
+        assert var.domain == tuple(range(5000))
+        assert var.index(4321) == 4321
+        assert var.indices([3, 4999, 0]) == [3, 4999, 0]
+
+        var = RandVar("Ball", ["Red", "Green", "Blue"])
+        assert var.index("Blue") == 2
+        assert var.indices(["Blue", "Red"]) == [2, 0]
+
+        for fun, arg in [(var.index, "Black"), (var.indices, ["Red", "Black"])]:
+            try:
+                fun(arg)
+                assert False
+            except RandVarValueEx as ex:
+                assert ex.bad_value == "Black"
+
+        try:
+            var.domain = ["Red"]
+            assert False
+        except AttributeError:
+            pass
+
+    def rand_var_test_4(self):
+        """
+        Objects use __slots__ and are still copied and pickled with every
+        attribute
+        """
+
+        objects = [self.X, self.XY_factor, Event(var=self.X, val="T")]
+        objects.append(BPMsg(self.X_factor, 0, 1))
+        for i in objects:
+            assert not hasattr(i, "__dict__")
+
+        sparse = SparseFactor([self.X, self.Y], [1, 0, 0, 2], threshold=0.5)
+        par = ParFactor([self.X], [1, 2], max_depth=2)
+        log = LogFactor(factor=self.XY_factor)
+
+        for fac in [sparse, par, log]:
+            for res in [copy.copy(fac), pickle.loads(pickle.dumps(fac))]:
+                assert type(res) == type(fac)
+                assert res.var_ids == fac.var_ids
+                assert res.values == fac.values
+
+        assert pickle.loads(pickle.dumps(sparse)).entries == {0: 1, 3: 2}
+        assert pickle.loads(pickle.dumps(sparse)).threshold == 0.5
+        assert pickle.loads(pickle.dumps(par)).max_depth == 2
@@ -0,0 +1,161 @@
+from nose.tools import with_setup, nottest, assert_raises, assert_almost_equal
+
+from tests.test_base import TestBase
+from ProbPy import RandVar, Factor, SparseFactor
+from ProbPy.factor import FactorValuesEx
+
+
+class TestSparseFactor(TestBase):
+    def __init__(self):
+        super().__init__()
+
+        factors = [
+            self.X_factor,
+            self.XY_factor,
+            self.XZ_factor,
+            self.ZW_factor,
+            self.XYZ_factor,
+            self.XKW_factor,
+            self.TKW_factor,
+        ]
+
+        # Factors with most of their values set to zero
+        self.factors = []
+        for fac in factors:
+            values = [j if i % 3 == 0 else 0 for i, j in enumerate(fac.values)]
+            self.factors.append(Factor(fac.rand_vars, values))
+
+        self.sparse = [SparseFactor(factor=i, threshold=1) for i in self.factors]
+
+    def checkValues(self, res, factor):
+        """
+        Checks that res has the same variables and values as factor
+        """
+
+        assert res.rand_vars == factor.rand_vars
+        for i, val in enumerate(res.values):
+            assert_almost_equal(val, factor.values[i])
+
+    def sparse_factor_test_0(self):
+        """
+        Construction and values
+        """
+
+        res = SparseFactor([self.X, self.Y], [1, 0, 0, 2])
+        assert res.entries == {0: 1, 3: 2}
+        assert res.values == [1, 0, 0, 2]
+        assert res.density() == 0.5
+        assert res.isSparse()
+        assert res.getStorage() == "sparse"
+
+        res = SparseFactor([self.X, self.Y], entries={1: 5})
+        assert res.values == [0, 5, 0, 0]
+        assert res.toFactor() == Factor([self.X, self.Y], [0, 5, 0, 0])
+
+        assert_raises(FactorValuesEx, SparseFactor, self.X, entries={2: 1})
+        assert_raises(FactorValuesEx, SparseFactor, self.X, [1, 2, 3])
+
+    def sparse_factor_test_1(self):
+        """
+        mult and div between sparse and dense factors
+        """
+
+        for i, fac1 in enumerate(self.factors):
+            for j, fac2 in enumerate(self.factors):
+                res = fac1 * fac2
+                self.checkValues(self.sparse[i] * self.sparse[j], res)
+                self.checkValues(self.sparse[i] * fac2, res)
+                self.checkValues(fac1 * self.sparse[j], res)
+
+                dense = fac1 * (fac2 + 1)
+                self.checkValues(self.sparse[i] * (fac2 + 1), dense)
+                self.checkValues((fac2 + 1) * self.sparse[i], (fac2 + 1) * fac1)
+
+                res = fac1 / (fac2 + 1)
+                self.checkValues(self.sparse[i] / (fac2 + 1), res)
+
+        res = self.sparse[1] * self.scalar
+        self.checkValues(res, self.factors[1] * self.scalar)
+
+        res = self.sparse[1] * self.scalarf
+        self.checkValues(res, self.factors[1] * self.scalarf)
+
+    def sparse_factor_test_2(self):
+        """
+        marginal, multMarginal and normalize
+        """
+
+        for i, fac in enumerate(self.factors):
+            num = len(fac.rand_vars)
+
+            for mask in range(2 ** num):
+                sub = [k for j, k in enumerate(fac.rand_vars) if mask & (1 << j)]
+
+                self.checkValues(self.sparse[i].marginal(sub), fac.marginal(sub))
+
+                res = self.sparse[i].multMarginal(self.XY_factor, sub)
+                self.checkValues(res, (fac * self.XY_factor).marginal(sub))
+
+                res = self.XY_factor.multMarginal(self.sparse[i], sub)
+                self.checkValues(res, (self.XY_factor * fac).marginal(sub))
+
+        # Zero values stay zero when normalized
+        fac = Factor([self.X, self.Y], [0, 0, 1, 3])
+        res = SparseFactor(factor=fac).normalize(self.X)
+        assert res.values == [0, 0, 0.25, 0.75]
+
+    def sparse_factor_test_3(self):
+        """
+        instVar and reorder
+        """
+
+        for i, fac in enumerate(self.factors):
+            for var in fac.rand_vars:
+                for val in var.domain:
+                    res = self.sparse[i].instVar(var, val)
+                    self.checkValues(res, fac.instVar(var, val))
+
+            res = self.sparse[i].reorder(fac.rand_vars[::-1])
+            self.checkValues(res, fac.reorder(fac.rand_vars[::-1]))
+
+    def sparse_factor_test_4(self):
+        """
+        argmax, argmin, max and min
+        """
+
+        for i, fac in enumerate(self.factors):
+            assert self.sparse[i].argmax() == fac.argmax()
+            assert self.sparse[i].argmin() == fac.argmin()
+            assert self.sparse[i].max() == fac.max()
+            assert self.sparse[i].min() == fac.min()
+
+        fac = Factor([self.X, self.Y], [-1, 0, -2, 0])
+        res = SparseFactor(factor=fac)
+        assert res.argmax() == fac.argmax()
+        assert res.argmin() == fac.argmin()
+
+    def sparse_factor_test_5(self):
+        """
+        Results switch to dense factors when their density is above the
+        threshold
+        """
+
+        fac = SparseFactor([self.X, self.Y], [1, 0, 0, 0], threshold=0.5)
+        assert fac.mult(fac).isSparse()
+
+        res = fac.add(Factor([self.X, self.Y], [1, 1, 1, 0]))
+        assert not res.isSparse()
+        assert res.values == [2, 1, 1, 0]
+
+        res = fac.marginal([])
+        assert not res.isSparse()
+        assert res.values == [1]
+
+        res = SparseFactor(factor=self.XY_factor).mult(self.X_factor)
+        assert not res.isSparse()
+        assert res == self.XY_factor * self.X_factor
+
+        # Dense operations with zero results are made sparse
+        res = fac.sub(Factor([self.X, self.Y], [1, 0, 0, 0]))
+        assert res.isSparse()
+        assert res.entries == {}